@@ -0,0 +1,134 @@
+"""
+Count the Bot API requests an add-track session costs with per-track replies and with a progress message.
+
+Usage:
+    python benchmarks/bench_add_track_progress.py [--tracks 50] [--rate 10] [--interval 2]
+
+A user picks a playlist and forwards `--tracks` audio files at `--rate` per second, every tenth one a duplicate of
+the previous file, then lets the session end. Runs once per ADD_TRACK_REPLIES mode against the local fake Bot API
+(flood limits disabled) and reports sendMessage / editMessageText requests and the time the session took.
+The progress mode must save at least 90% of the requests, and its final status must show the right counts.
+Exit code 1 if not.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from common import prepare_environment
+
+prepare_environment()
+os.environ["ADD_TRACK_TIME_WINDOW"] = "1"
+os.environ["ADD_TRACK_TIMER_TICK"] = "0.1"
+os.environ["OUTBOUND_CHAT_RATE"] = "1000000"
+os.environ["OUTBOUND_CHAT_BURST"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_RATE"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_BURST"] = "1000000"
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+
+
+def make_update(update_id: int, user_id: int, **message) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            **message,
+        },
+    }
+
+
+def audio(file_id: str) -> dict:
+    return {"file_id": file_id, "file_unique_id": file_id, "duration": 180, "title": f"Track {file_id}"}
+
+
+async def run_session(app, dp, fake: FakeBotAPI, user_id: int, args) -> tuple[dict, float, str]:
+    from services.sessions import add_track_sessions
+
+    update_id = user_id * 1000
+    setup = [make_update(update_id, user_id, text="/start"), make_update(update_id + 1, user_id, text="🆕 New Playlist"),
+             make_update(update_id + 2, user_id, text="Road trip"), make_update(update_id + 3, user_id, text="Road trip")]
+    for update in setup:
+        await dp.feed_raw_update(app.bot, update)
+    before = dict(fake.requests)
+
+    started = time.monotonic()
+    for n in range(args.tracks):
+        file_id = f"{user_id}-{n - 1 if n % 10 == 9 else n}"
+        await dp.feed_raw_update(app.bot, make_update(update_id + 10 + n, user_id, audio=audio(file_id)))
+        await asyncio.sleep(max(0.0, started + (n + 1) / args.rate - time.monotonic()))
+    # The session ends with a summary once its window passed
+    while add_track_sessions.get(user_id) is not None or not fake.delivered[user_id][-1].startswith("sendMessage:⏰"):
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+    requests = {method: fake.requests[method] - before.get(method, 0) for method in ("sendMessage", "editMessageText")}
+    return requests, elapsed, fake.delivered[user_id][-2] if len(fake.delivered[user_id]) > 1 else ""
+
+
+async def run(args) -> int:
+    fake = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9)
+    os.environ["TELEGRAM_API_URL"] = await fake.start()
+
+    import bot as app
+    from config import app_config
+    from database.db import init_db
+
+    app_config.ADD_TRACK_PROGRESS_INTERVAL = args.interval
+    init_db()
+    dp = app.create_dispatcher(app.bot_info)
+    await app.bot_info.refresh()
+    await dp.emit_startup(bot=app.bot, dispatcher=dp, bots=[app.bot], **dp.workflow_data)
+
+    duplicates = args.tracks // 10
+    print(f"{args.tracks} tracks ({duplicates} duplicates) forwarded at {args.rate}/s, progress edits every {args.interval}s")
+    counts = {}
+    final_status = ""
+    for user_id, mode in ((101, "message"), (102, "progress")):
+        app_config.ADD_TRACK_REPLIES = mode
+        requests, elapsed, last = await run_session(app, dp, fake, user_id, args)
+        counts[mode] = sum(requests.values())
+        if mode == "progress":
+            final_status = last
+        print(f"{mode:<9} {counts[mode]:>4} requests (sendMessage {requests['sendMessage']}, editMessageText {requests['editMessageText']}) "
+              f"| session took {elapsed:.1f}s")
+
+    failed = False
+    saved = 1 - counts["progress"] / counts["message"]
+    expected = (f"Added: {args.tracks - duplicates}", f"Already in playlist: {duplicates}", "Failed: 0")
+    if not all(part in final_status for part in expected):
+        print(f"!! final progress status is {final_status!r}")
+        failed = True
+    print(f"requests saved: {saved:.0%}")
+    failed = failed or saved < 0.9
+
+    from services.sessions import add_track_sessions
+    await add_track_sessions.stop()
+    await dp.emit_shutdown(bot=app.bot, dispatcher=dp, bots=[app.bot], **dp.workflow_data)
+    await app.bot_info.stop()
+    await app.outbound.stop()
+    await app.bot.session.close()
+    await fake.stop()
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10, help="forwarded tracks per second")
+    parser.add_argument("--interval", type=float, default=2, help="ADD_TRACK_PROGRESS_INTERVAL")
+    args = parser.parse_args()
+    try:
+        return asyncio.run(run(args))
+    finally:
+        from database.db import pool
+        from database.executor import db_executor
+        db_executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
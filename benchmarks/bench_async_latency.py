@@ -0,0 +1,105 @@
+"""
+Measure handler-level tail latency and event-loop stalls under concurrent load.
+
+Usage:
+    python benchmarks/bench_async_latency.py [--users 200] [--rounds 20] [--users-in-db 100000]
+
+Every simulated user runs the "Show Musics" sequence (lookup_user_id, get_tracks, lookup_playlist_id,
+get_cover_image_by_playlist_id) followed by an insert_track write, `--rounds` times, all users concurrently on one
+event loop. A probe task sleeps 1 ms in a loop and records how late it wakes up, which is how long the loop was
+blocked. Two modes are compared:
+    - blocking: service functions are called synchronously inside the coroutines (the old behaviour).
+    - async:    service functions are awaited and run on the database executor threads.
+"""
+import argparse
+import asyncio
+import time
+
+from common import prepare_environment, percentiles
+
+DB_PATH = prepare_environment()
+
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+
+def populate(users: int, tracks_per_playlist: int = 50) -> None:
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO users (id, telegram_id) VALUES (?, ?)", ((i, 10_000_000 + i) for i in range(1, users + 1)))
+        conn.executemany("INSERT INTO playlists (id, user_id, name) VALUES (?, ?, ?)", ((i, i, f"playlist-{i}") for i in range(1, users + 1)))
+        conn.executemany(
+            "INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)",
+            ((p, f"file-{p}-{t}", (t + 1) * ps.TRACK_POSITION_GAP) for p in range(1, 1001) for t in range(tracks_per_playlist)),
+        )
+
+
+async def call(func, blocking: bool, *args):
+    if blocking:
+        return func.run_sync(*args)
+    return await func(*args)
+
+
+async def simulated_user(uid: int, rounds: int, blocking: bool, latencies: list[float]) -> None:
+    name = f"playlist-{uid}"
+    for r in range(rounds):
+        started = time.perf_counter()
+        user_id = await call(ps.lookup_user_id, blocking, 10_000_000 + uid)
+        await call(ps.get_tracks, blocking, name, user_id)
+        playlist_id = await call(ps.lookup_playlist_id, blocking, user_id, name)
+        await call(ps.get_cover_image_by_playlist_id, blocking, playlist_id)
+        await call(ps.insert_track, blocking, playlist_id, f"{'b' if blocking else 'a'}-{uid}-{r}")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0)
+
+
+async def loop_lag_probe(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(max(0.0, time.perf_counter() - started - 0.001))
+
+
+async def run_mode(users: int, rounds: int, blocking: bool) -> dict:
+    latencies: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(simulated_user(uid, rounds, blocking, latencies) for uid in range(1, users + 1)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return {
+        "sequences_per_sec": len(latencies) / elapsed,
+        "latency_ms": percentiles(latencies),
+        "loop_lag_ms": percentiles(lags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=20, help="sequences per simulated user")
+    parser.add_argument("--users-in-db", type=int, default=100_000)
+    args = parser.parse_args()
+
+    init_db()
+    populate(args.users_in_db)
+    users = min(args.users, 1000)
+
+    print(f"database: {DB_PATH}, {users} concurrent users x {args.rounds} rounds")
+    for mode, blocking in (("blocking", True), ("async", False)):
+        result = asyncio.run(run_mode(users, args.rounds, blocking))
+        lat, lag = result["latency_ms"], result["loop_lag_ms"]
+        print(
+            f"{mode:<9} {result['sequences_per_sec']:>8.0f} seq/s | "
+            f"latency p50={lat['p50']:.1f}ms p99={lat['p99']:.1f}ms max={lat['max']:.1f}ms | "
+            f"loop lag p50={lag['p50']:.2f}ms p99={lag['p99']:.2f}ms max={lag['max']:.2f}ms"
+        )
+    db_executor.shutdown()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
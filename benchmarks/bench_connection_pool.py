@@ -0,0 +1,116 @@
+"""
+Compare per-call `sqlite3.connect` (the old service layer) with the pooled connections of `database.db.pool`.
+
+Usage:
+    python benchmarks/bench_connection_pool.py [--users 100000] [--iterations 20000]
+
+The database is populated with `--users` users, one playlist each and a few tracks in the first playlists, then
+the same operations are timed through both access paths:
+    - get_user_id: single indexed lookup, the first call of almost every handler.
+    - show_musics: get_user_id + get_tracks + get_playlist_id_by_name + get_cover_image_by_playlist_id,
+      the sequence a "Show Musics" tap used to run.
+    - add_track: insert of a new track (write path, one transaction per call).
+
+Service calls are made with `run_sync` so both paths are timed in the calling thread, without executor hops.
+"""
+import argparse
+import random
+import sqlite3
+
+from common import prepare_environment, ops_per_second
+
+DB_PATH = prepare_environment()
+
+from database.db import init_db, pool, sqlite_db_path  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+
+def populate(users: int, tracks_per_playlist: int = 10, playlists_with_tracks: int = 1000) -> None:
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO users (id, telegram_id) VALUES (?, ?)", ((i, 10_000_000 + i) for i in range(1, users + 1)))
+        conn.executemany("INSERT INTO playlists (id, user_id, name) VALUES (?, ?, ?)", ((i, i, f"playlist-{i}") for i in range(1, users + 1)))
+        conn.executemany(
+            "INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)",
+            ((p, f"file-{p}-{t}", (t + 1) * ps.TRACK_POSITION_GAP) for p in range(1, playlists_with_tracks + 1) for t in range(tracks_per_playlist)),
+        )
+
+
+# The pre-pool implementation: a brand-new connection per query.
+def legacy_get_user_id(telegram_id):
+    with sqlite3.connect(sqlite_db_path) as conn:
+        res = conn.execute("SELECT id FROM users WHERE telegram_id=?", (telegram_id,)).fetchone()
+    return res[0] if res else None
+
+
+def legacy_get_tracks(playlist_name, user_id):
+    with sqlite3.connect(sqlite_db_path) as conn:
+        cur = conn.execute(
+            "SELECT t.file_id FROM tracks t JOIN playlists p ON p.id = t.playlist_id WHERE p.name=? AND p.user_id=?",
+            (playlist_name, user_id),
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def legacy_get_playlist_id_by_name(user_id, name):
+    with sqlite3.connect(sqlite_db_path) as conn:
+        res = conn.execute("SELECT id FROM playlists WHERE user_id=? AND name=?", (user_id, name)).fetchone()
+    return res[0] if res else False
+
+
+def legacy_get_cover(playlist_id):
+    with sqlite3.connect(sqlite_db_path) as conn:
+        res = conn.execute("SELECT cover_file_id FROM playlists WHERE id=?", (playlist_id,)).fetchone()
+    return res[0] if res else None
+
+
+def legacy_add_track(playlist_id, file_id):
+    with sqlite3.connect(sqlite_db_path) as conn:
+        conn.execute("INSERT INTO tracks (playlist_id, file_id) VALUES (?, ?)", (playlist_id, file_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    init_db()
+    populate(args.users)
+    rng = random.Random(42)
+    telegram_ids = [10_000_000 + rng.randint(1, args.users) for _ in range(args.iterations)]
+    showable = [rng.randint(1, min(args.users, 1000)) for _ in range(args.iterations)]
+    writes = max(1, args.iterations // 10)
+
+    def legacy_show(i):
+        user_id = legacy_get_user_id(10_000_000 + showable[i])
+        legacy_get_tracks(f"playlist-{showable[i]}", user_id)
+        playlist_id = legacy_get_playlist_id_by_name(user_id, f"playlist-{showable[i]}")
+        legacy_get_cover(playlist_id)
+
+    def pooled_show(i):
+        user_id = ps.lookup_user_id.run_sync(10_000_000 + showable[i])
+        ps.get_tracks.run_sync(f"playlist-{showable[i]}", user_id)
+        playlist_id = ps.lookup_playlist_id.run_sync(user_id, f"playlist-{showable[i]}")
+        ps.get_cover_image_by_playlist_id.run_sync(playlist_id)
+
+    results = [
+        ("get_user_id", args.iterations,
+         lambda i: legacy_get_user_id(telegram_ids[i]),
+         lambda i: ps.lookup_user_id.run_sync(telegram_ids[i])),
+        ("show_musics", args.iterations // 4, legacy_show, pooled_show),
+        ("add_track", writes,
+         lambda i: legacy_add_track(showable[i], f"legacy-{i}"),
+         lambda i: ps.insert_track.run_sync(showable[i], f"pooled-{i}")),
+    ]
+
+    print(f"database: {DB_PATH} ({args.users} users)")
+    print(f"{'operation':<14}{'before ops/s':>14}{'after ops/s':>14}{'speedup':>10}")
+    for name, iterations, before, after in results:
+        before_ops = ops_per_second(before, iterations)
+        after_ops = ops_per_second(after, iterations)
+        print(f"{name:<14}{before_ops:>14.0f}{after_ops:>14.0f}{after_ops / before_ops:>9.1f}x")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
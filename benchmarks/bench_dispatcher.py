@@ -0,0 +1,276 @@
+"""
+Replay synthetic user sessions through the bot's real Dispatcher, in process, and save the results as JSON.
+
+Usage:
+    python benchmarks/bench_dispatcher.py [--users 200] [--tracks 20] [--output bench_dispatcher.json]
+                                          [--compare baseline.json] [--max-regression 10]
+
+Builds the Dispatcher of bot.py with every router, FSM storage and middleware, on a temporary database, and a Bot
+whose session answers requests in process (RecordingSession: the fake Bot API without HTTP, flood limits off).
+`--users` users run concurrently, each feeding its updates one after another with `dp.feed_update`:
+    /start, New Playlist + name, My Playlists, open the playlist, Add Music + `--tracks` forwarded audios, Show
+    Musics, Share Playlist, the share deep link opened by another user, Delete Track + pick the first track.
+Reported per step and overall: updates/s, handling latency percentiles and Bot API calls per update. Results are
+written to `--output` (with the commit they were measured on); `--compare` prints the change against an earlier
+result file and, with `--max-regression`, fails when throughput dropped or p99 latency rose by more than that
+many percent. Exit code 1 if an update failed, the final state is wrong or a regression is over the limit.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from common import PROJECT_ROOT, prepare_environment, percentiles
+
+prepare_environment()
+os.environ["OUTBOUND_CHAT_RATE"] = "1000000"
+os.environ["OUTBOUND_CHAT_BURST"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_RATE"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_BURST"] = "1000000"
+# Add-track sessions stay open for the whole run
+os.environ["ADD_TRACK_TIME_WINDOW"] = "3600"
+
+import aiogram  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+from fake_bot_api import FakeBotAPI, RecordingSession  # noqa: E402
+from utils.messages import EMOJIS  # noqa: E402
+
+SHARE_LINK = re.compile(r"start=share__(\d+)")
+
+
+class Harness:
+    """
+    Feeds updates to the dispatcher, timing each one and counting the Bot API calls it caused.
+    """
+
+    def __init__(self, dp, bot, api: FakeBotAPI):
+        self.dp = dp
+        self.bot = bot
+        self.api = api
+        self.update_id = 0
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.calls: dict[str, int] = defaultdict(int)
+        # Bot API calls per user, attributed by chat id or by the user encoded in the callback query id
+        self.user_calls: dict[int, int] = defaultdict(int)
+        self.errors: list[str] = []
+
+    def count_call(self, method) -> None:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None and getattr(method, "callback_query_id", None):
+            chat_id = method.callback_query_id.split(":")[0]
+        if chat_id is not None:
+            self.user_calls[int(chat_id)] += 1
+
+    async def feed(self, step: str, user_id: int, event: dict) -> None:
+        self.update_id += 1
+        update = Update.model_validate({"update_id": self.update_id, **event}, context={"bot": self.bot})
+        calls_before = self.user_calls[user_id]
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            self.errors.append(f"{step} of user {user_id}: {e!r}")
+        self.latencies[step].append(time.perf_counter() - started)
+        self.calls[step] += self.user_calls[user_id] - calls_before
+
+    def message(self, user_id: int, **content) -> dict:
+        return {"message": {
+            "message_id": self.update_id + 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}, **content,
+        }}
+
+    def callback(self, user_id: int, message_id: int, data: str) -> dict:
+        text, reply_markup = self.api.messages[(user_id, message_id)]
+        message = {"message_id": message_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}, "text": text}
+        if reply_markup is not None:
+            message["reply_markup"] = json.loads(reply_markup)
+        return {"callback_query": {
+            "id": f"{user_id}:{self.update_id + 1}", "chat_instance": "bench",
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}, "message": message, "data": data,
+        }}
+
+    def last_message_id(self, user_id: int) -> int:
+        return max(message_id for chat_id, message_id in self.api.messages if chat_id == user_id)
+
+
+async def user_session(h: Harness, user_id: int, recipient_id: int, tracks: int) -> None:
+    await h.feed("start", user_id, h.message(user_id, text="/start"))
+    await h.feed("new_playlist", user_id, h.message(user_id, text=f"{EMOJIS.NEW.value} New Playlist"))
+    await h.feed("playlist_name", user_id, h.message(user_id, text="Mix"))
+    await h.feed("my_playlists", user_id, h.message(user_id, text=f"{EMOJIS.HEADPHONE.value} My Playlists"))
+    menu = h.last_message_id(user_id)
+    await h.feed("open_playlist", user_id, h.callback(user_id, menu, "use_playlist:Mix"))
+    await h.feed("add_music", user_id, h.callback(user_id, menu, "add_music:Mix"))
+    for n in range(tracks):
+        audio = {"file_id": f"{user_id}-{n}", "file_unique_id": f"{user_id}-{n}", "duration": 180, "title": f"Track {n}"}
+        await h.feed("audio", user_id, h.message(user_id, audio=audio))
+    await h.feed("show", user_id, h.callback(user_id, menu, "show:Mix"))
+    await h.feed("share", user_id, h.callback(user_id, menu, "share:Mix"))
+    link = SHARE_LINK.search(h.api.messages[(user_id, menu)][0])
+    if link is None:
+        h.errors.append(f"user {user_id} got no share link")
+    else:
+        await h.feed("share_link", recipient_id, h.message(recipient_id, text=f"/start share__{link.group(1)}"))
+    await h.feed("delete_track", user_id, h.callback(user_id, menu, "delete_track:Mix"))
+    reply_markup = h.api.messages[(user_id, menu)][1]
+    if reply_markup is None:
+        h.errors.append(f"user {user_id} got no track to remove")
+        return
+    first_track = json.loads(reply_markup)["inline_keyboard"][0][0]["callback_data"]
+    await h.feed("remove_track", user_id, h.callback(user_id, menu, first_track))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(h: Harness, elapsed: float, args) -> dict:
+    updates = sum(len(samples) for samples in h.latencies.values())
+    calls = sum(h.calls.values())
+    return {
+        "benchmark": "bench_dispatcher",
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "aiogram": aiogram.__version__,
+        "cpus": os.cpu_count(),
+        "args": {"users": args.users, "tracks": args.tracks},
+        "updates": updates,
+        "seconds": elapsed,
+        "updates_per_second": updates / elapsed,
+        "latency_ms": percentiles([sample for samples in h.latencies.values() for sample in samples]),
+        "calls_per_update": calls / updates,
+        "calls": dict(sorted(h.api.requests.items())),
+        "steps": {
+            step: {
+                "updates": len(samples),
+                "latency_ms": percentiles(samples),
+                "calls_per_update": h.calls[step] / len(samples),
+            }
+            for step, samples in h.latencies.items()
+        },
+    }
+
+
+def print_results(results: dict) -> None:
+    print(f"{results['updates']} updates in {results['seconds']:.2f}s: {results['updates_per_second']:.0f} updates/s, "
+          f"{results['calls_per_update']:.2f} Bot API calls/update (commit {results['commit']})")
+    print(f"{'step':<14} {'updates':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'calls/update':>13}")
+    for step, row in {**results["steps"], "all": {**results, "updates": results["updates"]}}.items():
+        lat = row["latency_ms"]
+        print(f"{step:<14} {row['updates']:>8} {lat['p50']:>7.2f}ms {lat['p90']:>7.2f}ms {lat['p99']:>7.2f}ms {row['calls_per_update']:>13.2f}")
+
+
+def compare(results: dict, baseline: dict, max_regression: float | None) -> list[str]:
+    """
+    Print the change of the main numbers against `baseline`; return the regressions over `max_regression` percent.
+    """
+    def change(new: float, old: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+
+    print(f"compared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')}):")
+    throughput = change(results["updates_per_second"], baseline["updates_per_second"])
+    p99 = change(results["latency_ms"]["p99"], baseline["latency_ms"]["p99"])
+    print(f"  updates/s {baseline['updates_per_second']:.0f} -> {results['updates_per_second']:.0f} ({throughput:+.1f}%)")
+    print(f"  p50 {baseline['latency_ms']['p50']:.2f}ms -> {results['latency_ms']['p50']:.2f}ms, "
+          f"p99 {baseline['latency_ms']['p99']:.2f}ms -> {results['latency_ms']['p99']:.2f}ms ({p99:+.1f}%)")
+    print(f"  calls/update {baseline['calls_per_update']:.2f} -> {results['calls_per_update']:.2f}")
+    for step, row in results["steps"].items():
+        old = baseline.get("steps", {}).get(step)
+        if old:
+            print(f"  {step:<14} p50 {change(row['latency_ms']['p50'], old['latency_ms']['p50']):+6.1f}%  "
+                  f"calls/update {old['calls_per_update']:.2f} -> {row['calls_per_update']:.2f}")
+    regressions = []
+    if max_regression is not None:
+        if throughput < -max_regression:
+            regressions.append(f"throughput dropped {-throughput:.1f}%")
+        if p99 > max_regression:
+            regressions.append(f"p99 latency rose {p99:.1f}%")
+    return regressions
+
+
+async def run(args) -> int:
+    import bot as app
+    import services.playlist_service as ps
+    from database.db import init_db
+    from services.bot_info import BotInfoRegistry
+    from services.sessions import add_track_sessions
+
+    init_db()
+    api = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9, latency=args.api_latency)
+    session = RecordingSession(api)
+    bot = app.create_bot(session)
+    bot_info = BotInfoRegistry(bot)
+    await bot_info.refresh()
+    dp = app.create_dispatcher(bot_info)
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+
+    h = Harness(dp, bot, api)
+    original_make_request = session.make_request
+
+    async def counting_make_request(bot, method, timeout=None):
+        h.count_call(method)
+        return await original_make_request(bot, method, timeout)
+
+    session.make_request = counting_make_request
+    print(f"{args.users} users, {args.tracks} tracks each, {os.cpu_count()} CPU cores")
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(h, user_id, user_id + args.users, args.tracks) for user_id in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - started
+
+    for user_id in range(1, args.users + 1):
+        page = await ps.get_playlist_page(user_id=await ps.get_user_id(user_id), playlist_name="Mix", limit=1, with_count=True)
+        if not page or page.track_count != args.tracks - 1:
+            h.errors.append(f"user {user_id} has {page.track_count if page else page} tracks, expected {args.tracks - 1}")
+            break
+
+    await add_track_sessions.stop()
+    await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+    await app.outbound.stop()
+    await bot.session.close()
+
+    results = summarize(h, elapsed, args)
+    print_results(results)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {args.output}")
+
+    failures = list(h.errors)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            failures += compare(results, json.load(file), args.max_regression)
+    for failure in failures[:20]:
+        print(f"!! {failure}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tracks", type=int, default=20, help="audios forwarded per user")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds the fake Bot API takes per request")
+    parser.add_argument("--output", default="bench_dispatcher.json", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    parser.add_argument("--max-regression", type=float, help="percent of throughput drop or p99 rise that fails --compare")
+    args = parser.parse_args()
+    try:
+        return asyncio.run(run(args))
+    finally:
+        from database.db import pool
+        from database.executor import db_executor
+        db_executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Compare aiogram's MemoryStorage with the SQLite-backed FSM storage and check that states survive a restart.
+
+Usage:
+    python benchmarks/bench_fsm_storage.py [--users 5000] [--rounds 20]
+
+Every round looks up the state of every user, like the FSM middleware does for each update, and 10% of the users
+go through a conversation step (set_state + set_data, then clear). Reported per storage: lookups per second and
+p50/p99 lookup latency. The SQLite storage is measured with a cache holding every user (hot) and with one
+holding 10% of them (cold misses read the database). Afterwards a fresh storage instance, as after a restart,
+must read back the states left pending, and a state older than the TTL must read as empty. Exit code 1 if not.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from common import prepare_environment, percentiles
+
+prepare_environment()
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+from database.fsm_storage import SQLiteStorage  # noqa: E402
+
+BOT_ID = 42
+
+
+def storage_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+
+
+async def run_workload(storage, users: int, rounds: int) -> dict:
+    rng = random.Random(1)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for user_id in range(1, users + 1):
+            key = storage_key(user_id)
+            lookup_started = time.perf_counter()
+            state = await storage.get_state(key)
+            latencies.append(time.perf_counter() - lookup_started)
+            if state is not None:
+                await storage.set_state(key, None)
+                await storage.set_data(key, {})
+            elif rng.random() < 0.1:
+                await storage.set_state(key, "PlaylistStates:waiting_for_delete_track")
+                await storage.set_data(key, {"playlist_to_remove_track": f"playlist {user_id}"})
+    elapsed = time.perf_counter() - started
+    return {"lookups_per_sec": len(latencies) / elapsed, "lookup_ms": percentiles(latencies)}
+
+
+async def check_restart(users: int) -> list[str]:
+    errors = []
+    storage = SQLiteStorage(ttl=3600)
+    await storage.set_state(storage_key(1), "PlaylistStates:waiting_for_cover_image")
+    await storage.set_data(storage_key(1), {"playlist_name_to_set_cover": "Road trip 🚗"})
+    await storage.set_state(storage_key(2), "PlaylistStates:waiting_for_add_music")
+    await storage.close()
+
+    restarted = SQLiteStorage(ttl=3600)
+    if await restarted.get_state(storage_key(1)) != "PlaylistStates:waiting_for_cover_image":
+        errors.append("state of user 1 was not persisted")
+    if await restarted.get_data(storage_key(1)) != {"playlist_name_to_set_cover": "Road trip 🚗"}:
+        errors.append("data of user 1 was not persisted")
+
+    # Age user 2's state past the TTL
+    with pool.writer() as conn:
+        conn.execute("UPDATE fsm_states SET updated_at = updated_at - 7200 WHERE key = ?", (restarted.key_builder.build(storage_key(2)),))
+    if await restarted.get_state(storage_key(2)) is not None:
+        errors.append("state of user 2 did not expire")
+    await restarted.close()
+    with pool.reader() as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM fsm_states WHERE key = ?", (restarted.key_builder.build(storage_key(2)),)).fetchone()[0]
+    if rows:
+        errors.append("expired state of user 2 is still stored")
+    return errors
+
+
+async def run(args) -> int:
+    storages = (
+        ("memory", MemoryStorage()),
+        ("sqlite hot", SQLiteStorage(cache_size=args.users)),
+        ("sqlite cold", SQLiteStorage(cache_size=args.users // 10)),
+    )
+    for name, storage in storages:
+        result = await run_workload(storage, args.users, args.rounds)
+        await storage.close()
+        lat = result["lookup_ms"]
+        extra = ""
+        if isinstance(storage, SQLiteStorage):
+            stats = storage.stats()
+            extra = f" | cache hit ratio {stats['cache']['hit_ratio']:.2f}, db reads {stats['loads']}, flushes {stats['flushes']} for {stats['written']} records"
+        print(f"{name:<12} {result['lookups_per_sec']:>9.0f} lookups/s | p50={lat['p50'] * 1000:.1f}us p99={lat['p99'] * 1000:.1f}us{extra}")
+
+    errors = await check_restart(args.users)
+    for error in errors:
+        print(f"!! {error}")
+    print(f"restart and expiry check: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    init_db()
+    print(f"{args.users} users x {args.rounds} rounds")
+    try:
+        return asyncio.run(run(args))
+    finally:
+        db_executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
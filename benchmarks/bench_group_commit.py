@@ -0,0 +1,129 @@
+"""
+Compare one-transaction-per-write with the group-commit write queue on bursty album forwards.
+
+Usage:
+    python benchmarks/bench_group_commit.py [--users 50] [--albums 5] [--album-size 10] [--synchronous NORMAL,FULL]
+
+Every simulated user forwards `--albums` albums of `--album-size` audio files; all tracks of an album arrive at
+the same time, like Telegram delivers a forwarded album, and all users forward concurrently. The last file of
+every album is a duplicate of the first, so each mode must report exactly one False per album.
+    - per-op:  each insert_track runs in its own transaction on the executor threads (no coalescing).
+    - grouped: insert_track is awaited normally and goes through the group-commit write queue.
+    - lone:    one user's writes awaited one after another through the write queue, like interactive renames; their
+               latency must not include the batch window.
+Every mode runs once per `--synchronous` level (PRAGMA synchronous; FULL fsyncs every commit).
+"""
+import argparse
+import asyncio
+import time
+
+from common import prepare_environment, percentiles
+
+DB_PATH = prepare_environment()
+
+from config import app_config  # noqa: E402
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+
+def populate(users: int) -> None:
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO users (id, telegram_id) VALUES (?, ?)", ((i, 10_000_000 + i) for i in range(1, users + 1)))
+        conn.executemany("INSERT INTO playlists (id, user_id, name) VALUES (?, ?, ?)", ((i, i, f"playlist-{i}") for i in range(1, users + 1)))
+
+
+async def insert_track(grouped: bool, *args):
+    if grouped:
+        return await ps.insert_track(*args)
+    return await db_executor.run(ps.insert_track.run_sync, *args)
+
+
+async def forward_albums(uid: int, albums: int, album_size: int, grouped: bool, prefix: str, latencies: list[float]) -> list:
+    results = []
+    for album in range(albums):
+        file_ids = [f"{prefix}-{uid}-{album}-{n}" for n in range(album_size - 1)]
+        file_ids.append(file_ids[0])
+
+        async def timed(file_id):
+            started = time.perf_counter()
+            result = await insert_track(grouped, uid, file_id)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+        results.extend(await asyncio.gather(*(timed(file_id) for file_id in file_ids)))
+    return results
+
+
+async def run_mode(users: int, albums: int, album_size: int, grouped: bool, prefix: str) -> dict:
+    latencies: list[float] = []
+    batches_before = db_executor.write_queue.batches
+    started = time.perf_counter()
+    per_user = await asyncio.gather(*(
+        forward_albums(uid, albums, album_size, grouped, prefix, latencies)
+        for uid in range(1, users + 1)
+    ))
+    elapsed = time.perf_counter() - started
+    results = [r for user_results in per_user for r in user_results]
+    return {
+        "tracks_per_sec": len(results) / elapsed,
+        "added": results.count(True),
+        "duplicates": results.count(False),
+        "errors": results.count(None),
+        "transactions": db_executor.write_queue.batches - batches_before if grouped else len(results),
+        "latency_ms": percentiles(latencies),
+    }
+
+
+async def run_lone(writes: int, prefix: str) -> dict:
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for n in range(writes):
+        before = time.perf_counter()
+        await ps.insert_track(1, f"{prefix}-{n}")
+        latencies.append(time.perf_counter() - before)
+    return {"tracks_per_sec": writes / (time.perf_counter() - started), "latency_ms": percentiles(latencies)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--albums", type=int, default=5)
+    parser.add_argument("--album-size", type=int, default=10)
+    parser.add_argument("--synchronous", default="NORMAL,FULL", help="PRAGMA synchronous levels to run")
+    parser.add_argument("--lone-writes", type=int, default=200, help="writes of the lone mode")
+    args = parser.parse_args()
+
+    init_db()
+    populate(args.users)
+
+    async def run_level(level: str):
+        results = [
+            (mode, await run_mode(args.users, args.albums, args.album_size, grouped, f"{level}-{mode}"))
+            for mode, grouped in (("per-op", False), ("grouped", True))
+        ]
+        return results + [("lone", await run_lone(args.lone_writes, f"{level}-lone"))]
+
+    print(f"database: {DB_PATH}, {args.users} users x {args.albums} albums x {args.album_size} tracks, "
+          f"batch window {app_config.DB_WRITE_BATCH_WINDOW_MS:g}ms")
+    for level in args.synchronous.split(","):
+        # Connections are reopened with the new level
+        app_config.DB_SYNCHRONOUS = level.strip().upper()
+        pool.close()
+        print(f"synchronous={app_config.DB_SYNCHRONOUS}")
+        for mode, result in asyncio.run(run_level(app_config.DB_SYNCHRONOUS)):
+            lat = result["latency_ms"]
+            if mode == "lone":
+                print(f"  {mode:<8} {result['tracks_per_sec']:>8.0f} tracks/s | latency p50={lat['p50']:.2f}ms p99={lat['p99']:.2f}ms")
+                continue
+            print(
+                f"  {mode:<8} {result['tracks_per_sec']:>8.0f} tracks/s in {result['transactions']:>5} transactions | "
+                f"added={result['added']} duplicates={result['duplicates']} errors={result['errors']} | "
+                f"latency p50={lat['p50']:.1f}ms p99={lat['p99']:.1f}ms"
+            )
+    db_executor.shutdown()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
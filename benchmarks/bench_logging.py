@@ -0,0 +1,194 @@
+"""
+Compare logging through the background pipeline with writing log lines on the caller's thread.
+
+Usage:
+    python benchmarks/bench_logging.py [--records 20000] [--slow-ms 2] [--burst 500]
+
+1. Caller cost: `--records` INFO lines written to a file by a synchronous FileHandler (the previous setup) and
+   through LogPipeline, per call on the calling thread. Every line must reach the file, in order, with the level
+   emoji once.
+2. A slow output (`--slow-ms` per line, like a blocked terminal or disk): event loop lag while a handler logs a
+   `--burst` of lines, synchronously and through the pipeline; with a queue smaller than the burst the excess must
+   be dropped and the drop reported, never block.
+3. JSON mode: every line must parse, with the rendered message, level, logger and the traceback of exceptions.
+4. Disabled DEBUG lines: f-string versus lazy %-style arguments.
+Exit code 1 if a check fails.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from common import prepare_environment
+
+prepare_environment()
+
+from utils.logging import LogPipeline, create_formatter  # noqa: E402
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self.delay)
+        self.lines.append(self.format(record))
+
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def caller_cost(records: int, errors: list[str]) -> None:
+    directory = tempfile.mkdtemp(prefix="bilbo-bench-")
+    results = {}
+    for mode in ("direct", "pipeline"):
+        path = os.path.join(directory, f"{mode}.log")
+        output = logging.FileHandler(path, encoding="utf-8")
+        output.setFormatter(create_formatter("text"))
+        pipeline = LogPipeline([output], queue_size=records + 1)
+        if mode == "pipeline":
+            pipeline.start()
+        logger = make_logger(mode, output if mode == "direct" else pipeline.handler)
+        started = time.perf_counter()
+        for n in range(records):
+            logger.info("Added track %s to playlist_id = %s", n, 42)
+        results[mode] = (time.perf_counter() - started) / records
+        pipeline.stop()
+        output.close()
+        with open(path, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        if len(lines) != records or any(f"Added track {n} to" not in line for n, line in enumerate(lines)):
+            errors.append(f"{mode}: {len(lines)} of {records} lines written or out of order")
+        if any(line.count("ℹ️") != 1 for line in lines):
+            errors.append(f"{mode}: level emoji missing or repeated")
+    print(f"caller cost per INFO line to a file: {results['direct'] * 1e6:.1f}us direct, {results['pipeline'] * 1e6:.1f}us through the pipeline")
+
+
+async def loop_lag(logger: logging.Logger, burst: int) -> float:
+    """
+    Log `burst` lines from a task while a ticker measures how late the event loop runs it; return the worst lag.
+    """
+    worst = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not done:
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - expected)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for n in range(burst):
+        logger.info("Update %s handled", n)
+        if n % 50 == 0:
+            await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+    done = True
+    await task
+    return worst
+
+
+def slow_output(slow_ms: float, burst: int, errors: list[str]) -> None:
+    lags = {}
+    for mode, queue_size in (("direct", 0), ("pipeline", burst + 1), ("small queue", burst // 5)):
+        output = SlowHandler(slow_ms / 1000)
+        output.setFormatter(create_formatter("text"))
+        pipeline = LogPipeline([output], queue_size=queue_size)
+        if mode != "direct":
+            pipeline.start()
+        logger = make_logger(mode, output if mode == "direct" else pipeline.handler)
+        lags[mode] = asyncio.run(loop_lag(logger, burst))
+        started = time.perf_counter()
+        pipeline.stop()
+        drained = time.perf_counter() - started
+        written = [line for line in output.lines if "Update" in line]
+        if mode == "small queue":
+            reported = [line for line in output.lines if "log records were dropped" in line]
+            if pipeline.dropped == 0 or not reported or len(written) + pipeline.dropped != burst:
+                errors.append(f"small queue: {len(written)} written, {pipeline.dropped} dropped, {len(reported)} drop reports")
+            print(f"  small queue ({queue_size}): {len(written)} written, {pipeline.dropped} dropped and reported")
+        elif len(written) != burst:
+            errors.append(f"{mode}: {len(written)} of {burst} lines written")
+        if mode == "pipeline":
+            print(f"  pipeline wrote the remaining lines in {drained:.2f}s at stop()")
+    print(f"event loop lag logging {burst} lines to a {slow_ms:g}ms output: " +
+          ", ".join(f"{mode} {lag * 1000:.1f}ms" for mode, lag in lags.items()))
+    if lags["pipeline"] > lags["direct"] / 4:
+        errors.append("the pipeline blocked the event loop")
+
+
+def json_mode(errors: list[str]) -> None:
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(create_formatter("json"))
+    pipeline = LogPipeline([output])
+    pipeline.start()
+    logger = make_logger("json", pipeline.handler)
+    logger.info("Playlist %s renamed to %s", "Old", "New ✨")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.error("Failed to rename playlist", exc_info=True)
+    pipeline.stop()
+    try:
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    except json.JSONDecodeError as e:
+        errors.append(f"json: invalid line ({e})")
+        return
+    if len(entries) != 2 or entries[0]["message"] != "Playlist Old renamed to New ✨" or entries[0]["level"] != "INFO":
+        errors.append(f"json: unexpected entries {entries}")
+    elif "ValueError: boom" not in entries[1].get("exception", "") or entries[1]["logger"] != "bench.json":
+        errors.append(f"json: exception entry {entries[1]}")
+    else:
+        print(f"json line: {json.dumps(entries[0], ensure_ascii=False)}")
+
+
+def disabled_debug(records: int) -> None:
+    logger = make_logger("disabled", logging.NullHandler())
+    playlist_id, user_id, name = 42, 7, "Road Trip"
+    started = time.perf_counter()
+    for _ in range(records):
+        logger.debug(f"Successfully get tracks from {name} playlist for user_id = {user_id}, playlist_id = {playlist_id}")
+    eager = (time.perf_counter() - started) / records
+    started = time.perf_counter()
+    for _ in range(records):
+        logger.debug("Successfully get tracks from %s playlist for user_id = %s, playlist_id = %s", name, user_id, playlist_id)
+    lazy = (time.perf_counter() - started) / records
+    print(f"disabled DEBUG line: {eager * 1e9:.0f}ns f-string, {lazy * 1e9:.0f}ns lazy arguments")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--slow-ms", type=float, default=2, help="time the slow output takes per line")
+    parser.add_argument("--burst", type=int, default=500, help="lines logged against the slow output")
+    args = parser.parse_args()
+
+    errors: list[str] = []
+    caller_cost(args.records, errors)
+    slow_output(args.slow_ms, args.burst, errors)
+    json_mode(errors)
+    disabled_debug(args.records * 10)
+    for error in errors:
+        print(f"!! {error}")
+    print(f"logging pipeline: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Count the Bot API calls of inline-keyboard navigation with plain edits and with the edit_view diff cache.
+
+Usage:
+    python benchmarks/bench_message_edits.py [--users 200]
+
+Every user taps through the playlist menus the way the handlers edit the callback's message: open a playlist's
+actions (text + keyboard), ask to delete it (keyboard only), open track removal (text + keyboard) and cancel
+(text only), tapping every button twice as impatient users do. Each tap gets the message as Telegram currently
+shows it, like a callback query. Two modes run against the local fake Bot API, which rejects edits that change
+nothing with "message is not modified":
+    - plain: edit_text followed by edit_reply_markup, as the handlers did before.
+    - view:  utils.edits.edit_view, merging text and keyboard and skipping edits that change nothing.
+Reported: edit requests, "not modified" errors and time per mode. Both modes must leave every message with the
+same text and keyboard, and the view mode must not get any "not modified" error. Exit code 1 if not.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from common import prepare_environment
+
+prepare_environment()
+
+from aiogram.exceptions import TelegramBadRequest  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from fake_bot_api import FakeBotAPI, make_bot  # noqa: E402
+from keyboards.inline import (  # noqa: E402
+    get_playlist_actions_keyboard,
+    get_playlist_delete_confirmation_keyboard,
+    get_playlist_list_keyboard,
+)
+from utils.edits import edit_view, edit_stats  # noqa: E402
+
+
+def taps(playlist: str) -> list[tuple[str | None, object]]:
+    # (new text or None to keep it, new keyboard) per tap, every one twice
+    steps = [
+        (f"✍🏻 Select action for playlist '{playlist}':", get_playlist_actions_keyboard(playlist)),
+        (None, get_playlist_delete_confirmation_keyboard(playlist)),
+        (f"✍🏻 Select action for playlist '{playlist}':", get_playlist_actions_keyboard(playlist)),
+        ("📝 Please Choose track index from below list to remove.", get_playlist_actions_keyboard(playlist)),
+        ("❌ Deletion canceled.", None),
+    ]
+    return [step for step in steps for _ in range(2)]
+
+
+def shown_message(fake: FakeBotAPI, bot, chat_id: int, message_id: int) -> Message:
+    # What a callback query carries: the message as it is shown right now
+    text, reply_markup = fake.messages[(chat_id, message_id)]
+    message = {"message_id": message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}, "text": text}
+    if reply_markup is not None:
+        message["reply_markup"] = json.loads(reply_markup)
+    return Message.model_validate(message, context={"bot": bot})
+
+
+async def plain_edit(message: Message, text: str | None, reply_markup) -> None:
+    try:
+        if text is not None:
+            await message.edit_text(text)
+        await message.edit_reply_markup(reply_markup=reply_markup)
+    except TelegramBadRequest:
+        pass
+
+
+async def run_mode(mode: str, users: int) -> tuple[dict, float, dict]:
+    fake = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9)
+    bot = make_bot(await fake.start())
+    playlists = [f"Playlist {n}" for n in range(5)]
+
+    async def user_session(chat_id: int) -> int:
+        sent = await bot.send_message(chat_id, "🎧 Your playlists", reply_markup=get_playlist_list_keyboard(playlists))
+        for text, reply_markup in taps(f"Playlist {chat_id % 5}"):
+            message = shown_message(fake, bot, chat_id, sent.message_id)
+            if mode == "view":
+                await edit_view(message, text, reply_markup)
+            else:
+                await plain_edit(message, text, reply_markup)
+        return sent.message_id
+
+    started = time.perf_counter()
+    message_ids = await asyncio.gather(*(user_session(chat_id) for chat_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - started
+    requests = {"edits": fake.requests["editMessageText"] + fake.requests["editMessageReplyMarkup"], "not_modified": fake.not_modified}
+    final = {chat_id: fake.messages[(chat_id, message_id)] for chat_id, message_id in zip(range(1, users + 1), message_ids)}
+    await bot.session.close()
+    await fake.stop()
+    return requests, elapsed, final
+
+
+async def run(args) -> int:
+    results = {}
+    failed = False
+    print(f"{args.users} users, {len(taps('x'))} taps each")
+    for mode in ("plain", "view"):
+        requests, elapsed, final = await run_mode(mode, args.users)
+        results[mode] = final
+        print(f"{mode:<6} {requests['edits']:>6} edit requests | {requests['not_modified']:>5} not modified | {elapsed * 1000:.0f}ms")
+        if mode == "view" and requests["not_modified"]:
+            failed = True
+    stats = edit_stats()
+    print(f"view: {stats['skipped']} skipped, {stats['merged']} text + keyboard merged, cache hit ratio {stats['cache']['hit_ratio']:.2f}")
+    if results["plain"] != results["view"]:
+        print("!! messages differ between the modes")
+        failed = True
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
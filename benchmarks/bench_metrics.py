@@ -0,0 +1,220 @@
+"""
+Exercise the metrics instrumentation: per-handler, per-query and per-API-call latency histograms.
+
+Usage:
+    python benchmarks/bench_metrics.py [--users 200] [--api-latency 0.005] [--updates 20000]
+
+1. `--users` users run through the bot concurrently (create a playlist, add tracks, list playlists, open one and
+   show its tracks) against the local fake Bot API answering after `--api-latency` seconds. The metrics are then
+   fetched from METRICS_PATH of the webhook application and checked: valid histograms (cumulative buckets, +Inf
+   equal to the count) with samples for every handler, query and API method the flow used. The slowest handlers,
+   queries and API methods are reported by total time.
+2. Overhead: `--updates` updates fed to a dispatcher with a no-op handler, with and without UpdateMetricsMiddleware,
+   and the cost of one histogram observation.
+Exit code 1 if a check fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+from common import prepare_environment
+
+prepare_environment()
+os.environ["OUTBOUND_CHAT_RATE"] = "1000000"
+os.environ["OUTBOUND_CHAT_BURST"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_RATE"] = "1000000"
+os.environ["OUTBOUND_GLOBAL_BURST"] = "1000000"
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+
+SAMPLE = re.compile(r'^(\w+?)(_bucket|_sum|_count)?(\{.*\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+# Label naming what was timed, per histogram
+NAME_LABEL = {"bot_handler_seconds": "handler", "bot_db_operation_seconds": "operation", "bot_api_request_seconds": "method"}
+
+EXPECTED = {
+    "bot_handler_seconds": {"cmd_start", "cmd_new_playlist", "process_new_playlist", "show_all_playlists", "show_playlist_action_kb", "show_playlist"},
+    "bot_db_operation_seconds": {"insert_user", "insert_playlist", "get_playlists", "get_playlist_page"},
+    "bot_api_request_seconds": {"sendMessage", "editMessageText", "sendMediaGroup", "answerCallbackQuery"},
+}
+
+
+def make_message(update_id: int, user_id: int, text: str) -> dict:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}, "text": text,
+    }}
+
+
+def make_callback(update_id: int, user_id: int, fake: FakeBotAPI, message_id: int, data: str) -> dict:
+    text, reply_markup = fake.messages[(user_id, message_id)]
+    message = {"message_id": message_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}, "text": text}
+    if reply_markup is not None:
+        message["reply_markup"] = json.loads(reply_markup)
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id), "chat_instance": "bench", "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        "message": message, "data": data,
+    }}
+
+
+def check_exposition(text: str) -> tuple[list[str], dict[str, set[str]]]:
+    """
+    Check the histograms of a Prometheus text exposition; return errors and what was timed per histogram.
+    """
+    errors = []
+    series: dict[tuple[str, str], list[tuple[str, float]]] = defaultdict(list)
+    seen: dict[str, set[str]] = defaultdict(set)
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        if match is None:
+            errors.append(f"malformed line {line!r}")
+            continue
+        name, suffix, labels, value = match.groups()
+        labels = labels or ""
+        key_labels = re.sub(r',?le="[^"]*"', "", labels)
+        series[(name, key_labels)].append((suffix or "", float(value)))
+        if suffix == "_count":
+            pairs = dict(LABEL.findall(labels))
+            seen[name].add(pairs.get(NAME_LABEL.get(name, ""), ""))
+    for (name, labels), samples in series.items():
+        buckets = [value for suffix, value in samples if suffix == "_bucket"]
+        counts = [value for suffix, value in samples if suffix == "_count"]
+        if not buckets:
+            continue
+        if any(b < a for a, b in zip(buckets, buckets[1:])):
+            errors.append(f"{name}{labels}: buckets are not cumulative")
+        if not counts or buckets[-1] != counts[0]:
+            errors.append(f"{name}{labels}: +Inf bucket differs from the count")
+    return errors, seen
+
+
+def report(title: str, name: str, top: int = 6) -> None:
+    from utils.metrics import metrics
+
+    rows = sorted(metrics.summary(name).items(), key=lambda item: item[1]["avg_ms"] * item[1]["count"], reverse=True)
+    print(f"{title}:")
+    for labels, row in rows[:top]:
+        print(f"  {'/'.join(label for label in labels if label):<40} {row['count']:>6} calls  avg {row['avg_ms']:>7.2f}ms  "
+              f"p50 {row['p50_ms']:>7.2f}ms  p99 {row['p99_ms']:>7.2f}ms")
+
+
+async def run_flow(args) -> list[str]:
+    fake = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9, latency=args.api_latency)
+    os.environ["TELEGRAM_API_URL"] = await fake.start()
+
+    from aiohttp.test_utils import TestClient, TestServer
+    import bot as app
+    import services.playlist_service as ps
+    from config import app_config
+    from database.db import init_db
+    from server.webhook import create_webhook_app
+
+    init_db()
+    dp = app.create_dispatcher(app.bot_info)
+    await app.bot_info.refresh()
+    await dp.emit_startup(bot=app.bot, dispatcher=dp, bots=[app.bot], **dp.workflow_data)
+    update_ids = iter(range(1, 10**9))
+
+    async def user_flow(user_id: int) -> None:
+        for text in ("/start", "🆕 New Playlist", "Mix"):
+            await dp.feed_raw_update(app.bot, make_message(next(update_ids), user_id, text))
+        await ps.add_tracks("Mix", await ps.get_user_id(user_id), [f"{user_id}-{n}" for n in range(15)])
+        await dp.feed_raw_update(app.bot, make_message(next(update_ids), user_id, "🎧 My Playlists"))
+        message_id = max(key[1] for key in fake.messages if key[0] == user_id)
+        for data in ("use_playlist:Mix", "show:Mix"):
+            await dp.feed_raw_update(app.bot, make_callback(next(update_ids), user_id, fake, message_id, data))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_flow(user_id) for user_id in range(1, args.users + 1)))
+    print(f"{args.users} users ran the flow in {time.perf_counter() - started:.2f}s (API latency {args.api_latency * 1000:.0f}ms)")
+
+    web_app, _ = create_webhook_app(dp, app.bot)
+    async with TestClient(TestServer(web_app)) as client:
+        response = await client.get(app_config.METRICS_PATH)
+        exposition = await response.text()
+    errors, seen = check_exposition(exposition)
+    if response.status != 200:
+        errors.append(f"{app_config.METRICS_PATH} answered {response.status}")
+    for name, expected in EXPECTED.items():
+        missing = expected - seen[name]
+        if missing:
+            errors.append(f"{name} has no samples for {sorted(missing)}")
+    print(f"{app_config.METRICS_PATH}: {len(exposition.splitlines())} lines, {len(exposition) / 1024:.0f} KiB")
+    report("slowest handlers (total time)", "bot_handler_seconds")
+    report("slowest queries (total time)", "bot_db_operation_seconds")
+    report("slowest API methods (total time)", "bot_api_request_seconds")
+
+    from services.sessions import add_track_sessions
+    await add_track_sessions.stop()
+    await dp.emit_shutdown(bot=app.bot, dispatcher=dp, bots=[app.bot], **dp.workflow_data)
+    await app.bot_info.stop()
+    await app.outbound.stop()
+    await app.bot.session.close()
+    await fake.stop()
+    return errors
+
+
+async def measure_overhead(args) -> None:
+    from aiogram import Bot, Dispatcher, Router
+    from aiogram.types import Update
+    from services.metrics import UpdateMetricsMiddleware
+    from utils.metrics import Histogram
+
+    updates = [Update.model_validate(make_message(n, n % 1000 + 1, "hi"), context={"bot": None}) for n in range(args.updates)]
+    bot = Bot(token="123456:benchmark-token")
+    results = {}
+    for mode in ("plain", "metrics"):
+        router = Router()
+        router.message.register(lambda message: None)
+        dp = Dispatcher()
+        dp.include_router(router)
+        if mode == "metrics":
+            UpdateMetricsMiddleware().install(dp)
+        started = time.perf_counter()
+        for update in updates:
+            await dp.feed_update(bot, update)
+        results[mode] = (time.perf_counter() - started) / len(updates)
+    await bot.session.close()
+
+    histogram = Histogram()
+    started = time.perf_counter()
+    for n in range(args.updates * 10):
+        histogram.observe(n * 1e-6)
+    observe = (time.perf_counter() - started) / (args.updates * 10)
+    print(f"dispatcher: {results['plain'] * 1e6:.1f}us/update plain, {results['metrics'] * 1e6:.1f}us/update with metrics "
+          f"(+{(results['metrics'] - results['plain']) * 1e6:.1f}us); one observation {observe * 1e9:.0f}ns")
+
+
+async def run(args) -> int:
+    errors = await run_flow(args)
+    await measure_overhead(args)
+    for error in errors:
+        print(f"!! {error}")
+    print(f"metrics: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--api-latency", type=float, default=0.005, help="seconds the fake Bot API takes per request")
+    parser.add_argument("--updates", type=int, default=20000, help="updates of the overhead measurement")
+    args = parser.parse_args()
+    try:
+        return asyncio.run(run(args))
+    finally:
+        from database.db import pool
+        from database.executor import db_executor
+        db_executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Stream playlists as media groups to many chats against a local fake Bot API with Telegram-like flood limits.
+
+Usage:
+    python benchmarks/bench_outbound.py [--chats 20] [--tracks 100] [--chat-rate 3] [--global-rate 30]
+
+Every chat receives its playlist as `--tracks / 10` media groups sent back-to-back, like show_playlist and the
+share link do. One second in, every chat also gets an interactive reply. Two modes are compared:
+    - direct:    requests go straight to the API; the first TelegramRetryAfter aborts the chat's loop (old behaviour).
+    - scheduled: requests go through OutboundMiddleware; flood waits are retried and replies overtake media.
+The scheduled mode fails (exit code 1) if any media group is missing or delivered out of order.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import prepare_environment, percentiles
+
+prepare_environment()
+
+from aiogram.exceptions import TelegramRetryAfter  # noqa: E402
+from aiogram.types import InputMediaAudio  # noqa: E402
+from fake_bot_api import FakeBotAPI, make_bot  # noqa: E402
+from services.outbound import OutboundScheduler, OutboundMiddleware  # noqa: E402
+
+
+async def stream_playlist(bot, chat_id: int, groups: int) -> int:
+    sent = 0
+    try:
+        for group in range(groups):
+            media = [InputMediaAudio(media=f"file-{chat_id}-{group}-{n}", caption=f"group {group}" if n == 0 else None) for n in range(10)]
+            await bot.send_media_group(chat_id, media)
+            sent += 1
+    except TelegramRetryAfter:
+        pass
+    return sent
+
+
+async def interactive_reply(bot, chat_id: int, latencies: list[float]) -> None:
+    await asyncio.sleep(1)
+    started = time.perf_counter()
+    try:
+        await bot.send_message(chat_id, "reply")
+    except TelegramRetryAfter:
+        return
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_mode(args, scheduled: bool) -> dict:
+    fake = FakeBotAPI(chat_rate=args.chat_rate, chat_burst=3, global_rate=args.global_rate, global_burst=args.global_rate)
+    await fake.start()
+    bot = make_bot(fake.base_url)
+    scheduler = None
+    if scheduled:
+        scheduler = OutboundScheduler(chat_rate=args.chat_rate, chat_burst=3, global_rate=args.global_rate, global_burst=args.global_rate)
+        bot.session.middleware(OutboundMiddleware(scheduler))
+
+    groups = args.tracks // 10
+    latencies: list[float] = []
+    started = time.perf_counter()
+    results = await asyncio.gather(*(stream_playlist(bot, chat_id, groups) for chat_id in range(1, args.chats + 1)),
+                                   *(interactive_reply(bot, chat_id, latencies) for chat_id in range(1, args.chats + 1)))
+    elapsed = time.perf_counter() - started
+
+    in_order = all(
+        [entry for entry in fake.delivered[chat_id] if entry.startswith("sendMediaGroup")]
+        == [f"sendMediaGroup:group {group}" for group in range(groups)]
+        for chat_id in range(1, args.chats + 1)
+    )
+    stats = scheduler.stats() if scheduler else {}
+    if scheduler:
+        await scheduler.stop()
+    await bot.session.close()
+    await fake.stop()
+    return {
+        "elapsed": elapsed,
+        "groups_sent": sum(results[:args.chats]),
+        "groups_expected": groups * args.chats,
+        "replies": len(latencies),
+        "flood_errors": fake.flood_errors,
+        "in_order": in_order,
+        "reply_latency_ms": percentiles(latencies),
+        "retries": stats.get("retries", 0),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--tracks", type=int, default=100, help="tracks per playlist (10 per media group)")
+    parser.add_argument("--chat-rate", type=float, default=3.0, help="requests/s allowed per chat by the fake API")
+    parser.add_argument("--global-rate", type=float, default=30.0, help="requests/s allowed overall by the fake API")
+    args = parser.parse_args()
+
+    print(f"{args.chats} chats x {args.tracks // 10} media groups, fake API limits {args.chat_rate}/s per chat, {args.global_rate}/s global")
+    failed = False
+    for mode, scheduled in (("direct", False), ("scheduled", True)):
+        result = asyncio.run(run_mode(args, scheduled))
+        lat = result["reply_latency_ms"]
+        print(
+            f"{mode:<9} {result['elapsed']:>6.1f}s | media groups {result['groups_sent']}/{result['groups_expected']} "
+            f"in order={result['in_order']} | replies {result['replies']}/{args.chats} "
+            f"p50={lat['p50']:.0f}ms p99={lat['p99']:.0f}ms | 429s={result['flood_errors']} retries={result['retries']}"
+        )
+        if scheduled:
+            failed = result["groups_sent"] != result["groups_expected"] or not result["in_order"] or result["replies"] != args.chats
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Compare loading a whole playlist with reading it one keyset page at a time.
+
+Usage:
+    python benchmarks/bench_playlist_pages.py [--sizes 100,1000,10000,50000] [--page-size 30] [--repeat 50]
+
+For playlists of every size in `--sizes` reports the time of:
+    - full:  get_tracks_by_playlist_id, all tracks at once (what "Show Musics" and share links loaded before),
+    - first: get_playlist_page for the first page, with the track count,
+    - deep:  get_playlist_page for the page after the middle of the playlist,
+    - walk:  reading the whole playlist page by page, per page.
+Page times should stay flat as the playlist grows. Walking all pages must return the same tracks in the same
+order as get_tracks_by_playlist_id. Exit code 1 if not.
+"""
+import argparse
+import sys
+import time
+
+from common import prepare_environment, percentiles
+
+prepare_environment()
+
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+
+def populate(sizes: list[int]) -> None:
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO users (id, telegram_id) VALUES (1, 10000001)")
+        for playlist_id, size in enumerate(sizes, start=1):
+            conn.execute("INSERT INTO playlists (id, user_id, name) VALUES (?, 1, ?)", (playlist_id, f"playlist-{size}"))
+            conn.executemany(
+                "INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)",
+                ((playlist_id, f"file-{playlist_id}-{t}", (t + 1) * ps.TRACK_POSITION_GAP) for t in range(size)),
+            )
+
+
+def timed(func, repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def walk(playlist_id: int, page_size: int) -> tuple[list[str], list[float]]:
+    tracks, samples, after = [], [], None
+    while True:
+        started = time.perf_counter()
+        page = ps.get_playlist_page.run_sync(playlist_id=playlist_id, after_position=after, limit=page_size)
+        samples.append(time.perf_counter() - started)
+        tracks += page.tracks
+        if not page.has_more:
+            return tracks, samples
+        after = page.last_position
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000,50000")
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    init_db()
+    populate(sizes)
+    failed = False
+    print(f"page size {args.page_size}, p50 of {args.repeat} runs")
+    print(f"{'tracks':>8} {'full':>10} {'first':>10} {'deep':>10} {'walk/page':>10}")
+    for playlist_id, size in enumerate(sizes, start=1):
+        full = timed(lambda: ps.get_tracks_by_playlist_id.run_sync(playlist_id), args.repeat)
+        first = timed(lambda: ps.get_playlist_page.run_sync(playlist_id=playlist_id, limit=args.page_size, with_count=True), args.repeat)
+        middle = (size // 2) * ps.TRACK_POSITION_GAP
+        deep = timed(lambda: ps.get_playlist_page.run_sync(playlist_id=playlist_id, after_position=middle, limit=args.page_size), args.repeat)
+        tracks, samples = walk(playlist_id, args.page_size)
+        print(f"{size:>8} {full['p50']:>8.3f}ms {first['p50']:>8.3f}ms {deep['p50']:>8.3f}ms {percentiles(samples)['p50']:>8.3f}ms")
+        if tracks != ps.get_tracks_by_playlist_id.run_sync(playlist_id):
+            print(f"!! pages of the {size}-track playlist differ from the full playlist")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        db_executor.shutdown()
+        pool.close()
@@ -0,0 +1,321 @@
+"""
+Time every public function of services/playlist_service.py on a large dataset and report how each one scales.
+
+Usage:
+    python benchmarks/generate_data.py --db big.db
+    python benchmarks/bench_service_scaling.py --db big.db [--repeat 20] [--concurrency 1,8,64,256] [--output scaling.json]
+    python benchmarks/bench_service_scaling.py [--users 2000 --playlists 10000 --tracks 300000]
+
+Without `--db` a small dataset is generated first (with generate_data.py, into a temporary directory). Functions
+are awaited the way the handlers call them, through the database executor; the database functions behind the
+async wrappers (insert_track, delete_track_at, move_track_to, ...) are timed through their wrapper:
+    - per playlist size bucket (1, 10, ... 100k tracks, the manifest's sample playlists): listing, paging and
+      lookups, add_track(s), remove_track_by_index at the first, middle and last index and by position,
+      move_track, set_cover_image, rename_playlist and delete_playlist,
+    - per playlists-per-user bucket: get_playlists, lookup_user_id, get_user_id, create_playlist,
+    - create_playlist and add_user from `--concurrency` concurrent callers, for distinct users and for one user:
+      throughput and latency.
+Each function gets a scaling curve (p50 per bucket, p99 in the JSON output); functions whose p50 grows more than
+10x from the smallest to the largest bucket are listed as not scaling. Unless set, the group commit window
+(DB_WRITE_BATCH_WINDOW_MS) is 0 so write times are the database's own work, and SLOW_QUERY_MS is 0 so statements
+are not timed twice.
+
+Writes are undone after being timed, except delete_playlist, which removes one sample playlist per bucket while
+at least one is left; regenerate the dataset after many runs. Exit code 1 if a call failed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from common import prepare_environment, percentiles
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--db", default=None, help="database made by generate_data.py (with its .json manifest)")
+parser.add_argument("--users", type=int, default=2000, help="users of the generated dataset")
+parser.add_argument("--playlists", type=int, default=10000, help="playlists of the generated dataset")
+parser.add_argument("--tracks", type=int, default=300000, help="tracks of the generated dataset")
+parser.add_argument("--repeat", type=int, default=20, help="calls per function and bucket")
+parser.add_argument("--concurrency", default="1,8,64,256", help="concurrent callers of the contention runs")
+parser.add_argument("--calls", type=int, default=2000, help="calls per contention run")
+parser.add_argument("--output", default=None, help="write the results to this JSON file")
+args = parser.parse_args()
+DB_PATH = prepare_environment(args.db)
+os.environ.setdefault("DB_WRITE_BATCH_WINDOW_MS", "0")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+from generate_data import generate  # noqa: E402
+
+if args.db is None:
+    generate(DB_PATH, args.users, args.playlists, args.tracks, log=lambda line: print(f"generating: {line}"))
+
+from database.db import pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+PAGE_SIZE = 30
+# Telegram ids of users created by the contention runs, far above the generated ones
+NEW_TELEGRAM_ID_BASE = 10 ** 12
+GROWTH_LIMIT = 10
+
+
+@dataclass
+class Operation:
+    """
+    One timed call: `call(sample, n, context)` is awaited; `prepare(sample)` returns its context and `undo(sample,
+    context)` reverts it, both untimed. `failed(result)` tells whether the call failed.
+    """
+
+    name: str
+    call: Callable[[dict, int, Any], Any]
+    prepare: Callable[[dict], Any] | None = None
+    undo: Callable[[dict, Any], Any] | None = None
+    failed: Callable[[Any], bool] = lambda result: result is None or result is False
+
+
+def bucket_label(bucket: str) -> str:
+    value = int(bucket)
+    return f"{value // 1000}k" if value >= 1000 else str(value)
+
+
+def track_at(playlist_id: int, index: int) -> tuple[str, int]:
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT file_id, position FROM tracks WHERE playlist_id=? ORDER BY position LIMIT 1 OFFSET ?", (playlist_id, index)
+        ).fetchone()
+
+
+def restore_track(sample: dict, track: tuple[str, int]) -> None:
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)", (sample["id"], *track))
+
+
+def drop_bench_tracks(sample: dict, _context: Any = None) -> None:
+    with pool.writer() as conn:
+        conn.execute("DELETE FROM tracks WHERE playlist_id=? AND file_id LIKE 'bench-%'", (sample["id"],))
+
+
+def drop_bench_playlists(user_id: int | None = None, _context: Any = None) -> None:
+    with pool.writer() as conn:
+        if user_id is None:
+            conn.execute("DELETE FROM playlists WHERE name LIKE 'bench %'")
+        else:
+            conn.execute("DELETE FROM playlists WHERE user_id=? AND name LIKE 'bench %'", (user_id,))
+
+
+def removal(name: str, index_of: Callable[[dict], int], by_position: bool = False) -> Operation:
+    def prepare(sample: dict) -> tuple[int, tuple[str, int]]:
+        index = index_of(sample)
+        return index, track_at(sample["id"], index)
+
+    def call(sample: dict, n: int, context: tuple[int, tuple[str, int]]):
+        index, track = context
+        return ps.remove_track_by_index(sample["user_id"], sample["name"], index, position=track[1] if by_position else None)
+
+    return Operation(name, call, prepare, lambda sample, context: restore_track(sample, context[1]))
+
+
+async def restore_move(sample: dict, _context: Any) -> None:
+    await ps.move_track(sample["user_id"], sample["name"], 0, sample["tracks"] - 1)
+
+
+async def restore_name(sample: dict, _context: Any) -> None:
+    await ps.rename_playlist(sample["user_id"], f"{sample['name']} *", sample["name"])
+
+
+PLAYLIST_OPERATIONS = [
+    Operation("get_tracks", lambda s, n, c: ps.get_tracks(s["name"], s["user_id"])),
+    Operation("get_tracks_by_playlist_id", lambda s, n, c: ps.get_tracks_by_playlist_id(s["id"])),
+    Operation("get_track_positions", lambda s, n, c: ps.get_track_positions(s["name"], s["user_id"])),
+    Operation("get_playlist_page first", lambda s, n, c: ps.get_playlist_page(user_id=s["user_id"], playlist_name=s["name"], limit=PAGE_SIZE, with_count=True)),
+    Operation("get_playlist_page last", lambda s, n, c: ps.get_playlist_page(playlist_id=s["id"], after_position=s["last_page_after"], limit=PAGE_SIZE)),
+    Operation("get_playlist_name_by_id", lambda s, n, c: ps.get_playlist_name_by_id(s["id"])),
+    Operation("get_cover_image_by_playlist_id", lambda s, n, c: ps.get_cover_image_by_playlist_id(s["id"]), failed=lambda result: False),
+    Operation("lookup_playlist_id", lambda s, n, c: ps.lookup_playlist_id(s["user_id"], s["name"])),
+    Operation("get_playlist_id_by_name", lambda s, n, c: ps.get_playlist_id_by_name(s["user_id"], s["name"])),
+    Operation("add_track", lambda s, n, c: ps.add_track(s["name"], s["user_id"], f"bench-{n}"), undo=drop_bench_tracks),
+    Operation("add_tracks x10", lambda s, n, c: ps.add_tracks(s["name"], s["user_id"], [f"bench-{n}-{k}" for k in range(10)]), undo=drop_bench_tracks),
+    removal("remove_track_by_index first", lambda s: 0),
+    removal("remove_track_by_index middle", lambda s: s["tracks"] // 2),
+    removal("remove_track_by_index last", lambda s: s["tracks"] - 1),
+    removal("remove_track_by_index position", lambda s: s["tracks"] // 2, by_position=True),
+    Operation("move_track last->first", lambda s, n, c: ps.move_track(s["user_id"], s["name"], s["tracks"] - 1, 0), undo=restore_move),
+    Operation("set_cover_image", lambda s, n, c: ps.set_cover_image(s["user_id"], s["name"], f"bench-cover-{n}")),
+    Operation("rename_playlist", lambda s, n, c: ps.rename_playlist(s["user_id"], s["name"], f"{s['name']} *"), undo=restore_name),
+]
+
+USER_OPERATIONS = [
+    Operation("get_playlists", lambda u, n, c: ps.get_playlists(u["id"])),
+    Operation("lookup_user_id", lambda u, n, c: ps.lookup_user_id(u["telegram_id"])),
+    Operation("get_user_id", lambda u, n, c: ps.get_user_id(u["telegram_id"])),
+    Operation("create_playlist", lambda u, n, c: ps.create_playlist(u["id"], f"bench {n}"), undo=lambda u, c: drop_bench_playlists(u["id"])),
+]
+
+
+async def run_operation(operation: Operation, samples: list[dict], repeat: int, failures: list[str]) -> dict[str, float]:
+    timings = []
+    for n in range(repeat):
+        sample = samples[n % len(samples)]
+        context = operation.prepare(sample) if operation.prepare else None
+        started = time.perf_counter()
+        result = await operation.call(sample, n, context)
+        timings.append(time.perf_counter() - started)
+        if operation.failed(result):
+            failures.append(f"{operation.name} returned {result} for playlist or user {sample['id']}")
+        if operation.undo:
+            undone = operation.undo(sample, context)
+            if asyncio.iscoroutine(undone):
+                await undone
+    return percentiles(timings)
+
+
+def live_playlists(samples: list[dict]) -> list[dict]:
+    """
+    Return the sample playlists still in the database, with their current track count and last page.
+    """
+    live = []
+    with pool.reader() as conn:
+        for sample in samples:
+            if not conn.execute("SELECT 1 FROM playlists WHERE id=?", (sample["id"],)).fetchone():
+                continue
+            sample = dict(sample)
+            sample["tracks"] = conn.execute("SELECT COUNT(*) FROM tracks WHERE playlist_id=?", (sample["id"],)).fetchone()[0]
+            row = conn.execute(
+                "SELECT position FROM tracks WHERE playlist_id=? ORDER BY position DESC LIMIT 1 OFFSET ?", (sample["id"], PAGE_SIZE)
+            ).fetchone()
+            sample["last_page_after"] = row[0] if row else None
+            live.append(sample)
+    return live
+
+
+async def contention(concurrency: int, calls: int, call: Callable[[int, int], Any]) -> dict[str, float]:
+    """
+    Run `calls` calls of `call(worker, k)` from `concurrency` concurrent workers; return throughput and latency.
+    """
+    timings: list[float] = []
+    per_worker = max(1, calls // concurrency)
+
+    async def worker(index: int) -> None:
+        for k in range(per_worker):
+            started = time.perf_counter()
+            await call(index, k)
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"calls_per_second": len(timings) / elapsed, **percentiles(timings)}
+
+
+def print_curves(title: str, results: dict[str, dict[str, dict]], buckets: list[str]) -> list[str]:
+    """
+    Print p50 per bucket for every operation; return the operations that do not scale.
+    """
+    not_scaling = []
+    print(f"\n{title} (p50 ms of {args.repeat} calls)")
+    print(f"{'operation':<34}" + "".join(f"{bucket_label(bucket):>10}" for bucket in buckets) + f"{'growth':>9}")
+    for name, by_bucket in results.items():
+        cells = [by_bucket.get(bucket) for bucket in buckets]
+        values = [cell["p50"] for cell in cells if cell]
+        growth = values[-1] / values[0] if len(values) > 1 and values[0] > 0 else 1.0
+        flag = "  <- not scaling" if growth > GROWTH_LIMIT else ""
+        if flag:
+            not_scaling.append(name)
+        print(f"{name:<34}" + "".join(f"{cell['p50']:>10.3f}" if cell else f"{'-':>10}" for cell in cells) + f"{growth:>8.1f}x{flag}")
+    return not_scaling
+
+
+async def run(manifest: dict) -> int:
+    failures: list[str] = []
+    playlist_buckets = {
+        bucket: live_playlists(samples) for bucket, samples in manifest["playlists_by_tracks"].items() if bucket != "0"
+    }
+    playlist_buckets = {bucket: samples for bucket, samples in playlist_buckets.items() if samples}
+    user_buckets = {bucket: samples for bucket, samples in manifest["users_by_playlists"].items() if samples}
+
+    by_playlist: dict[str, dict[str, dict]] = {}
+    for operation in PLAYLIST_OPERATIONS:
+        for bucket, samples in playlist_buckets.items():
+            by_playlist.setdefault(operation.name, {})[bucket] = await run_operation(operation, samples, args.repeat, failures)
+    for bucket, samples in playlist_buckets.items():
+        if len(samples) < 2:
+            continue
+        victim = samples[-1]
+        started = time.perf_counter()
+        if not await ps.delete_playlist(victim["user_id"], victim["name"]):
+            failures.append(f"delete_playlist failed for {victim}")
+        by_playlist.setdefault("delete_playlist (1 call)", {})[bucket] = percentiles([time.perf_counter() - started])
+
+    by_user: dict[str, dict[str, dict]] = {}
+    for operation in USER_OPERATIONS:
+        for bucket, samples in user_buckets.items():
+            by_user.setdefault(operation.name, {})[bucket] = await run_operation(operation, samples, args.repeat, failures)
+
+    buckets = sorted(playlist_buckets, key=int)
+    not_scaling = print_curves(f"by tracks in the playlist ({manifest['totals']['tracks']} tracks in total)", by_playlist, buckets)
+    not_scaling += print_curves(
+        f"by playlists of the user ({manifest['totals']['playlists']} playlists in total)", by_user, sorted(user_buckets, key=int)
+    )
+
+    users = manifest["totals"]["users"]
+    hot_user = max((user for samples in user_buckets.values() for user in samples), key=lambda user: user["playlists"])
+    rng = random.Random(1)
+    new_users = iter(range(NEW_TELEGRAM_ID_BASE, NEW_TELEGRAM_ID_BASE + 10 ** 9))
+    contended: dict[str, dict[str, dict]] = {}
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        runs = {
+            "create_playlist, distinct users": lambda w, k: ps.create_playlist(rng.randint(1, users), f"bench {concurrency}-{w}-{k}"),
+            "create_playlist, one user": lambda w, k: ps.create_playlist(hot_user["id"], f"bench {concurrency}-{w}-{k}"),
+            "add_user": lambda w, k: ps.add_user(next(new_users)),
+        }
+        for name, call in runs.items():
+            contended.setdefault(name, {})[str(concurrency)] = await contention(concurrency, args.calls, call)
+            drop_bench_playlists()
+    with pool.writer() as conn:
+        conn.execute("DELETE FROM users WHERE telegram_id >= ?", (NEW_TELEGRAM_ID_BASE,))
+    print(f"\nunder contention ({args.calls} calls per run): calls/s, p50/p99 ms")
+    print(f"{'operation':<34}" + "".join(f"{f'{c} callers':>24}" for c in contended["add_user"]))
+    for name, by_concurrency in contended.items():
+        print(f"{name:<34}" + "".join(
+            f"{cell['calls_per_second']:>10.0f} {cell['p50']:>6.2f}/{cell['p99']:<6.2f}" for cell in by_concurrency.values()
+        ))
+
+    if not_scaling:
+        print(f"\nnot scaling (p50 grows more than {GROWTH_LIMIT}x): {', '.join(not_scaling)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({
+                "dataset": {key: manifest[key] for key in ("parameters", "totals", "tracks_per_playlist", "playlists_per_user")},
+                "repeat": args.repeat,
+                "by_playlist_tracks": by_playlist,
+                "by_user_playlists": by_user,
+                "contention": contended,
+                "not_scaling": not_scaling,
+            }, file, indent=2)
+        print(f"results written to {args.output}")
+    for failure in sorted(set(failures))[:20]:
+        print(f"!! {failure}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    try:
+        with open(f"{DB_PATH}.json", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        print(f"!! {DB_PATH}.json not found, create the database with benchmarks/generate_data.py")
+        return 1
+    try:
+        return asyncio.run(run(manifest))
+    finally:
+        db_executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
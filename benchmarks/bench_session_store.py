@@ -0,0 +1,148 @@
+"""
+Measure add-track session memory and deadline tracking for many users.
+
+Usage:
+    python benchmarks/bench_session_store.py [--users 1000000] [--max-sessions 100000] [--timers 200000]
+
+Sessions: `--users` distinct users each start one add-track session and half of them forward a track, then the
+time window passes. Reported for the old never-evicted dict of dicts, an uncapped SessionStore and one capped at
+`--max-sessions`: memory held after all sessions started (tracemalloc), after the window passed, and the session
+lookup rate. A SessionStore must stay within its cap and be empty once the window passed.
+
+Deadlines: `--timers` pending deadlines kept by a TimerWheel vs one `asyncio.sleep` task per user. Reported: memory,
+time to schedule them all, and how late the last one fired.
+
+Exit code 1 if a check fails.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from common import prepare_environment
+
+prepare_environment()
+
+from services.sessions import SessionStore  # noqa: E402
+from utils.timer_wheel import TimerWheel  # noqa: E402
+
+MIB = 1024 * 1024
+
+
+def run_dicts(users: int) -> tuple[int, int, float]:
+    tracemalloc.start()
+    contexts = defaultdict(lambda: {"playlist_name": None, "playlist_db_id": None, "timestamp": 0, "tracks_added": 0})
+    for user_id in range(users):
+        contexts[user_id] = {"playlist_name": f"playlist {user_id % 100}", "playlist_db_id": user_id, "timestamp": time.time(), "tracks_added": 0}
+    started = time.perf_counter()
+    for user_id in range(0, users, 2):
+        contexts.get(user_id)["tracks_added"] += 1
+    lookups = (users // 2) / (time.perf_counter() - started)
+    after_start = tracemalloc.get_traced_memory()[0]
+    # Expired contexts were only reset when the user sent another audio, never removed
+    after_expiry = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del contexts
+    return after_start, after_expiry, lookups
+
+
+async def run_store(users: int, max_sessions: int) -> tuple[int, int, float, dict]:
+    tracemalloc.start()
+    store = SessionStore(ttl=1, max_size=max_sessions, tick=0.1)
+    for user_id in range(users):
+        store.start(user_id, f"playlist {user_id % 100}", user_id)
+    started = time.perf_counter()
+    for user_id in range(0, users, 2):
+        session = store.get(user_id)
+        if session is not None:
+            session.tracks_added += 1
+    lookups = (users // 2) / (time.perf_counter() - started)
+    after_start = tracemalloc.get_traced_memory()[0]
+    stats = store.stats()
+    while len(store):
+        await asyncio.sleep(0.1)
+    after_expiry = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await store.stop()
+    return after_start, after_expiry, lookups, {**stats, "after_expiry": len(store)}
+
+
+async def run_wheel(timers: int) -> tuple[int, float, float]:
+    fired = 0
+    last_fired_at = 0.0
+
+    def on_fire(_key) -> None:
+        nonlocal fired, last_fired_at
+        fired += 1
+        last_fired_at = time.monotonic()
+
+    tracemalloc.start()
+    deadline = time.monotonic() + 2.0
+    # Every timer shares the one deadline, the wheel only holds the keys
+    wheel = TimerWheel(on_fire, lambda _key: deadline, tick=0.1, slots=64)
+    started = time.perf_counter()
+    for key in range(timers):
+        wheel.schedule(key, deadline)
+    scheduling = time.perf_counter() - started
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    while fired < timers:
+        await asyncio.sleep(0.05)
+    await wheel.stop()
+    return held, scheduling, last_fired_at - deadline
+
+
+async def run_sleep_tasks(timers: int) -> tuple[int, float, float]:
+    fired = 0
+    last_fired_at = 0.0
+
+    async def sleeper() -> None:
+        nonlocal fired, last_fired_at
+        await asyncio.sleep(2.0)
+        fired += 1
+        last_fired_at = time.monotonic()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(sleeper()) for _ in range(timers)]
+    scheduling = time.perf_counter() - started
+    deadline = time.monotonic() + 2.0
+    # Let every task reach its sleep, that is when its timer handle exists
+    await asyncio.sleep(0)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await asyncio.gather(*tasks)
+    return held, scheduling, last_fired_at - deadline
+
+
+async def run(args) -> int:
+    failed = False
+    print(f"Sessions: {args.users} users, SessionStore capped at {args.max_sessions} sessions")
+    held, after_expiry, lookups = run_dicts(args.users)
+    print(f"  dict of dicts  started {held / MIB:>7.1f} MiB | after expiry {after_expiry / MIB:>7.1f} MiB | {lookups:>9.0f} lookups/s")
+    for name, max_sessions in (("SessionStore", args.users), ("capped", args.max_sessions)):
+        held, after_expiry, lookups, stats = await run_store(args.users, max_sessions)
+        print(f"  {name:<14} started {held / MIB:>7.1f} MiB | after expiry {after_expiry / MIB:>7.1f} MiB | {lookups:>9.0f} lookups/s "
+              f"| size {stats['size']} evicted {stats['evicted']} approx {stats['approx_bytes'] / MIB:.1f} MiB")
+        failed = failed or stats["size"] > max_sessions or stats["after_expiry"] != 0
+
+    print(f"Deadlines: {args.timers} pending, 2s each")
+    for name, runner in (("TimerWheel", run_wheel), ("sleep tasks", run_sleep_tasks)):
+        held, scheduling, late = await runner(args.timers)
+        print(f"  {name:<14} {held / MIB:>7.1f} MiB | scheduled in {scheduling * 1000:>6.0f}ms | last fired {late * 1000:>5.0f}ms late")
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--max-sessions", type=int, default=100_000)
+    parser.add_argument("--timers", type=int, default=200_000)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Load-test the webhook endpoint with synthetic /start updates and report response and handling latency.
+
+Usage:
+    python benchmarks/bench_webhook.py [--updates 3000] [--users 1000] [--rate 300] [--concurrency 100] [--max-running 64]
+
+Runs the webhook application on a local port with the /start router. A separate client process serves the fake
+Bot API (benchmarks/fake_bot_api.py, flood limits disabled) the bot replies to, and posts `--updates` updates from
+`--users` users at `--rate` updates per second with at most `--concurrency` requests in flight, like Telegram does
+with max_connections. Reported per mode:
+    - response: time until the webhook answered the POST (what Telegram waits for),
+    - handling: time from the POST until the handler finished (database write and reply sent).
+Modes:
+    - inline:     aiogram's SimpleRequestHandler answering only after the update was handled.
+    - background: BackgroundRequestHandler, answers immediately and handles at most --max-running updates at once,
+                  one at a time per user (UserOrderMiddleware).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+from common import prepare_environment, percentiles
+
+prepare_environment()
+os.environ.setdefault("WEBHOOK_SECRET", "benchmark-secret")
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from aiogram import Dispatcher  # noqa: E402
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler  # noqa: E402
+from fake_bot_api import FakeBotAPI, make_bot  # noqa: E402
+from config import app_config  # noqa: E402
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+from routers.private.start import start_router  # noqa: E402
+from server.webhook import create_webhook_app  # noqa: E402
+from services.ordering import UserOrderMiddleware  # noqa: E402
+
+
+def synthetic_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": "/start",
+        },
+    }
+
+
+# update_id -> when its handler finished (time.monotonic, comparable across processes on the same host)
+handled_at: dict[int, float] = {}
+
+dp = Dispatcher()
+dp.include_router(start_router)
+
+
+@dp.update.outer_middleware()
+async def record_handling(handler, event, data):
+    try:
+        return await handler(event, data)
+    finally:
+        handled_at[event.update_id] = time.monotonic()
+
+
+def load_generator(args: dict, conn) -> None:
+    """
+    Child process: serve the fake Bot API, post the synthetic updates once the webhook URL arrives, report
+    posting times and response latencies, and keep the fake API up until told to stop.
+    """
+    async def run() -> None:
+        fake = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9)
+        conn.send(await fake.start())
+        url, offset = await asyncio.to_thread(conn.recv)
+
+        posted_at: dict[int, float] = {}
+        responses: list[float] = []
+        statuses: dict[int, int] = {}
+        slots = asyncio.Semaphore(args["concurrency"])
+        headers = {"X-Telegram-Bot-Api-Secret-Token": app_config.WEBHOOK_SECRET}
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args["concurrency"])) as client:
+            first_post = time.monotonic()
+
+            async def post(n: int) -> None:
+                update_id = offset + n
+                update = synthetic_update(update_id, 1 + n % args["users"])
+                if args["rate"]:
+                    await asyncio.sleep(max(0.0, first_post + n / args["rate"] - time.monotonic()))
+                async with slots:
+                    posted_at[update_id] = started = time.monotonic()
+                    async with client.post(url, json=update, headers=headers) as response:
+                        await response.read()
+                        statuses[response.status] = statuses.get(response.status, 0) + 1
+                    responses.append(time.monotonic() - started)
+
+            await asyncio.gather(*(post(n) for n in range(args["updates"])))
+            async with client.post(url, json=synthetic_update(offset - 1, 1), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as response:
+                rejected = response.status == 401
+        conn.send((posted_at, responses, statuses, rejected))
+        await asyncio.to_thread(conn.recv)
+        await fake.stop()
+
+    asyncio.run(run())
+
+
+async def run_mode(args, background: bool, conn) -> dict:
+    bot = make_bot(await asyncio.to_thread(conn.recv))
+    handled_at.clear()
+
+    if background:
+        app, _ = create_webhook_app(dp, bot)
+    else:
+        app = web.Application()
+        SimpleRequestHandler(dp, bot, handle_in_background=False, secret_token=app_config.WEBHOOK_SECRET).register(app, path=app_config.WEBHOOK_PATH)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}{app_config.WEBHOOK_PATH}"
+
+    conn.send((url, 1))
+    posted_at, responses, statuses, rejected = await asyncio.to_thread(conn.recv)
+    deadline = time.monotonic() + 120
+    while len(handled_at) < args.updates and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    conn.send("stop")
+    await runner.cleanup()
+
+    handled = [handled_at[update_id] - posted for update_id, posted in posted_at.items() if update_id in handled_at]
+    elapsed = max(handled_at.values()) - min(posted_at.values())
+    return {
+        "updates_per_sec": len(handled) / elapsed,
+        "handled": len(handled),
+        "statuses": statuses,
+        "bad_secret_rejected": rejected,
+        "response_ms": percentiles(responses),
+        "handling_ms": percentiles(handled),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100, help="POST requests in flight")
+    parser.add_argument("--rate", type=float, default=300, help="updates posted per second, 0 = as fast as possible")
+    parser.add_argument("--max-running", type=int, default=None, help="overrides MAX_RUNNING_UPDATES")
+    args = parser.parse_args()
+    if args.max_running is not None:
+        app_config.MAX_RUNNING_UPDATES = args.max_running
+    dp.update.outer_middleware(UserOrderMiddleware(max_running=app_config.MAX_RUNNING_UPDATES))
+
+    init_db()
+    print(f"{args.updates} updates from {args.users} users at {args.rate or 'max'}/s, {args.concurrency} concurrent POSTs, "
+          f"max running {app_config.MAX_RUNNING_UPDATES}")
+    for mode, background in (("inline", False), ("background", True)):
+        conn, child_conn = multiprocessing.Pipe()
+        client = multiprocessing.Process(target=load_generator, args=(vars(args), child_conn))
+        client.start()
+        result = asyncio.run(run_mode(args, background, conn))
+        client.join()
+        resp, hand = result["response_ms"], result["handling_ms"]
+        print(
+            f"{mode:<10} {result['updates_per_sec']:>7.0f} updates/s handled={result['handled']} http={result['statuses']} "
+            f"bad secret rejected={result['bad_secret_rejected']} | response p50={resp['p50']:.1f}ms p99={resp['p99']:.1f}ms | "
+            f"handling p50={hand['p50']:.1f}ms p99={hand['p99']:.1f}ms"
+        )
+    db_executor.shutdown()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Assert that the hot queries of services/playlist_service.py are served by indexes.
+
+Usage:
+    python benchmarks/check_query_plans.py
+
+Migrates a fresh database, runs EXPLAIN QUERY PLAN for every hot query and fails (exit code 1) when a plan scans a
+whole table or needs a temporary B-tree to sort. Keep HOT_QUERIES in sync with the service when queries change.
+"""
+import sys
+
+from common import prepare_environment
+
+DB_PATH = prepare_environment()
+
+from database.db import init_db, pool  # noqa: E402
+
+# (name, SQL, index expected in the plan)
+HOT_QUERIES = [
+    ("lookup_user_id", "SELECT id FROM users WHERE telegram_id=?", "sqlite_autoindex_users_1"),
+    ("lookup_playlist_id", "SELECT id FROM playlists WHERE user_id=? AND name=?", "sqlite_autoindex_playlists_1"),
+    ("get_playlists", "SELECT name FROM playlists WHERE user_id=?", "sqlite_autoindex_playlists_1"),
+    ("get_tracks", """
+        SELECT t.file_id FROM tracks t
+        JOIN playlists p ON p.id = t.playlist_id
+        WHERE p.name=? AND p.user_id=?
+        ORDER BY t.position
+    """, "idx_tracks_playlist_position"),
+    ("get_track_positions", """
+        SELECT t.position FROM tracks t
+        JOIN playlists p ON p.id = t.playlist_id
+        WHERE p.name=? AND p.user_id=?
+        ORDER BY t.position
+    """, "idx_tracks_playlist_position"),
+    ("get_tracks_by_playlist_id", "SELECT file_id FROM tracks WHERE playlist_id=? ORDER BY position", "idx_tracks_playlist_position"),
+    ("get_playlist_page (header)", "SELECT id, name, cover_file_id FROM playlists WHERE user_id=? AND name=?", "sqlite_autoindex_playlists_1"),
+    ("get_playlist_page (first page)", "SELECT position, file_id FROM tracks WHERE playlist_id=? ORDER BY position LIMIT ?", "idx_tracks_playlist_position"),
+    ("get_playlist_page (next page)", "SELECT position, file_id FROM tracks WHERE playlist_id=? AND position>? ORDER BY position LIMIT ?", "idx_tracks_playlist_position"),
+    ("get_playlist_page (count)", "SELECT COUNT(*) FROM tracks WHERE playlist_id=?", "idx_tracks_playlist_position"),
+    ("insert_track (next position)", "SELECT COALESCE(MAX(position), 0) + ? FROM tracks WHERE playlist_id=?", "idx_tracks_playlist_position"),
+    ("delete_track_at (by position)", "DELETE FROM tracks WHERE playlist_id=? AND position=?", "idx_tracks_playlist_position"),
+    ("delete_track_at (by index)", """
+        DELETE FROM tracks WHERE id = (
+            SELECT id FROM tracks WHERE playlist_id=? ORDER BY position LIMIT 1 OFFSET ?
+        )
+    """, "idx_tracks_playlist_position"),
+    ("move_track_to (neighbours)", """
+        SELECT position FROM tracks WHERE playlist_id=? AND id<>?
+        ORDER BY position LIMIT ? OFFSET ?
+    """, "idx_tracks_playlist_position"),
+    ("delete_playlist_by_id", "DELETE FROM tracks WHERE playlist_id=?", "idx_tracks_playlist_position"),
+    ("load_fsm_record", "SELECT state, data, updated_at FROM fsm_states WHERE key=?", "PRIMARY KEY"),
+    ("purge_fsm_records", "DELETE FROM fsm_states WHERE updated_at < ?", "idx_fsm_states_updated_at"),
+]
+
+
+def plan_problems(plan: list[str], expected_index: str) -> list[str]:
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN"):
+            problems.append(f"full scan: {step}")
+        if "TEMP B-TREE" in step:
+            problems.append(f"temporary sort: {step}")
+    if not any(expected_index in step for step in plan):
+        problems.append(f"{expected_index} not used")
+    return problems
+
+
+def main() -> int:
+    init_db()
+    failures = 0
+    with pool.reader() as conn:
+        for name, sql, expected_index in HOT_QUERIES:
+            params = (1,) * sql.count("?")
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            problems = plan_problems(plan, expected_index)
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok  '} {name}")
+            for step in plan:
+                print(f"       {step}")
+            for problem in problems:
+                print(f"       !! {problem}")
+    pool.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Check the slow-query log and measure what timing every statement costs.
+
+Usage:
+    python benchmarks/check_slow_queries.py [--tracks 300000] [--threshold-ms 5] [--statements 50000]
+
+Fills a database with `--tracks` tracks, then with SLOW_QUERY_MS=`--threshold-ms` runs the regular service
+calls (indexed, fast) a few hundred times and an unindexed search over all tracks a few times. Checks:
+    - only the unindexed statement is logged as slow, with its duration, row count and parameter types,
+    - its query plan (a full SCAN of tracks) is captured once, however often it is slow,
+    - parameter values never appear in the log,
+    - the report lists it first, with the right number of calls and rows,
+    - the bulk inserts filling the database (executemany, in batches) are logged at most once per statement, with
+      their batch size and no query plan.
+Then times `--statements` indexed lookups on a plain and on a timed connection.
+Exit code 1 if a check fails.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from common import prepare_environment
+
+DB_PATH = prepare_environment()
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--tracks", type=int, default=300000)
+parser.add_argument("--threshold-ms", type=float, default=5)
+parser.add_argument("--statements", type=int, default=50000, help="lookups of the overhead measurement")
+args = parser.parse_args()
+os.environ["SLOW_QUERY_MS"] = str(args.threshold_ms)
+
+from database.db import init_db, pool  # noqa: E402
+from database.executor import db_executor  # noqa: E402
+from database.slow_queries import TimedConnection, SlowQueryLog, slow_query_log  # noqa: E402
+import services.playlist_service as ps  # noqa: E402
+
+SECRET = "do-not-log-this-value"
+SLOW_SQL = "SELECT COUNT(*) FROM tracks WHERE file_id LIKE ?"
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record.getMessage())
+
+
+def populate(tracks: int, batch: int = 50000) -> None:
+    playlists = max(1, tracks // 100)
+    with pool.writer() as conn:
+        conn.executemany("INSERT INTO users (id, telegram_id) VALUES (?, ?)", ((i, 10_000_000 + i) for i in range(1, playlists + 1)))
+        conn.executemany("INSERT INTO playlists (id, user_id, name) VALUES (?, ?, ?)", ((i, i, f"playlist-{i}") for i in range(1, playlists + 1)))
+        for start in range(0, tracks, batch):
+            conn.executemany(
+                "INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)",
+                ((t % playlists + 1, f"file-{t}", (t // playlists + 1) * ps.TRACK_POSITION_GAP) for t in range(start, min(tracks, start + batch))),
+            )
+
+
+def overhead(statements: int) -> tuple[float, float]:
+    results = []
+    for factory in (sqlite3.Connection, TimedConnection):
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, factory=factory)
+        started = time.perf_counter()
+        for i in range(statements):
+            conn.execute("SELECT id FROM users WHERE telegram_id=?", (10_000_001 + i % 100,)).fetchone()
+        results.append((time.perf_counter() - started) / statements)
+        conn.close()
+    return results[0], results[1]
+
+
+def main() -> int:
+    init_db()
+    capture = Capture()
+    logging.getLogger("database.slow_queries").addHandler(capture)
+    populate(args.tracks)
+    batches = [message for message in capture.records if message.startswith("Slow batch")]
+    bulk_errors = []
+    if len(batches) > len({message.split(": ", 1)[1] for message in batches}):
+        bulk_errors.append("a slow executemany statement was logged more than once")
+    if any(" rows, params " not in message for message in batches) or any("query plan" in message for message in capture.records):
+        bulk_errors.append("slow executemany logged without its batch size or with a query plan")
+    print(f"{len(batches)} slow bulk insert statements logged while filling the database, "
+          f"{sum(stats.slow for stats in slow_query_log.statements.values())} slow batches counted")
+    slow_query_log.reset()
+    capture.records.clear()
+
+    for i in range(300):
+        user_id = ps.lookup_user_id.run_sync(10_000_001 + i % 100)
+        ps.get_playlist_page.run_sync(user_id=user_id, playlist_name=f"playlist-{user_id}", limit=30, with_count=True)
+        ps.get_playlists.run_sync(user_id)
+    explains = 0
+    original_explain = SlowQueryLog._explain
+
+    def counting_explain(conn, sql, params):
+        nonlocal explains
+        explains += 1
+        return original_explain(conn, sql, params)
+
+    SlowQueryLog._explain = staticmethod(counting_explain)
+    searches = 5
+    with pool.reader() as conn:
+        for _ in range(searches):
+            conn.execute(SLOW_SQL, (f"%{SECRET}%",)).fetchone()
+
+    errors = bulk_errors
+    slow = [message for message in capture.records if message.startswith("Slow query")]
+    print(f"{len(slow)} slow statements logged (threshold {args.threshold_ms:g}ms):")
+    for message in slow[:2]:
+        print("  " + message.replace("\n", "\n  "))
+    if not slow:
+        errors.append(f"the unindexed search was not logged, it took {slow_query_log.statements[SLOW_SQL].max * 1000:.1f}ms")
+    if any(SLOW_SQL not in message for message in slow):
+        errors.append("an indexed statement was logged as slow")
+    if any("(str)" not in message or "1 rows" not in message for message in slow):
+        errors.append("slow query line lacks the parameter types or row count")
+    if any(SECRET in message for message in capture.records):
+        errors.append("a parameter value was logged")
+    if slow and explains != 1:
+        errors.append(f"query plan captured {explains} times")
+    if slow and "SCAN tracks" not in slow[0]:
+        errors.append("query plan of the search is missing")
+
+    report = slow_query_log.report(top=5)
+    print(slow_query_log.format_report(top=5))
+    if report[0].sql != SLOW_SQL or report[0].count != searches or report[0].rows != searches:
+        errors.append(f"report starts with {report[0].sql!r} ({report[0].count} calls, {report[0].rows} rows)")
+
+    plain, timed = overhead(args.statements)
+    print(f"indexed lookup: {plain * 1e6:.1f}us plain, {timed * 1e6:.1f}us timed (+{(timed - plain) * 1e6:.1f}us per statement)")
+    for error in errors:
+        print(f"!! {error}")
+    print(f"slow query log: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        db_executor.shutdown()
+        pool.close()
@@ -0,0 +1,125 @@
+"""
+Replay a synthetic update stream through the multi-process supervisor and assert per-user ordering.
+
+Usage:
+    python benchmarks/check_update_ordering.py [--users 200] [--messages 10] [--workers 1,4]
+
+Every user sends /start followed by `--messages` texts `seq-0`, `seq-1`, ...; the users' streams are randomly
+interleaved, as Telegram delivers them. The texts reach the full router stack in the worker processes, which
+answer each one with a reply quoting it, sent to a local fake Bot API (benchmarks/fake_bot_api.py). The check
+fails (exit code 1) if any user's replies are missing or arrive out of order. Throughput is reported per worker
+count; it only scales when the machine has that many free cores.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from common import prepare_environment
+
+# Every text is an unknown playlist name, which the bot logs as a warning
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+# Spawned workers re-import this module; they must reuse the database the parent prepared
+os.environ["UPDATE_ORDERING_DB"] = prepare_environment(os.environ.get("UPDATE_ORDERING_DB"))
+# Flood limits are not what this checks; the fake API and the workers' outbound scheduler let everything through
+for name in ("OUTBOUND_CHAT_RATE", "OUTBOUND_CHAT_BURST", "OUTBOUND_GLOBAL_RATE", "OUTBOUND_GLOBAL_BURST"):
+    os.environ[name] = "1000000"
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+from database.db import init_db  # noqa: E402
+from server.supervisor import Supervisor  # noqa: E402
+
+
+def synthetic_stream(users: list[int], messages: int, seed: int = 7) -> list[dict]:
+    """
+    Return /start plus `messages` texts per user, randomly interleaved while keeping each user's own order.
+    """
+    rng = random.Random(seed)
+    pending = {user: ["/start"] + [f"seq-{n}" for n in range(messages)] for user in users}
+    stream = []
+    while pending:
+        user = rng.choice(list(pending))
+        text = pending[user].pop(0)
+        if not pending[user]:
+            del pending[user]
+        update_id = len(stream) + 1
+        stream.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user, "type": "private"},
+                "from": {"id": user, "is_bot": False, "first_name": f"user{user}"},
+                "text": text,
+            },
+        })
+    return stream
+
+
+def ordering_errors(delivered: dict[int, list[str]], users: list[int], messages: int) -> list[str]:
+    errors = []
+    for user in users:
+        replies = delivered.get(user, [])
+        seen = [n for reply in replies for n in range(messages) if f"`seq-{n}`" in reply]
+        if not replies or "Welcome" not in replies[0]:
+            errors.append(f"user {user}: first reply is not the /start welcome: {replies[:1]}")
+        if seen != list(range(messages)):
+            errors.append(f"user {user}: replies out of order or missing: {seen}")
+    return errors
+
+
+async def run_round(fake: FakeBotAPI, workers: int, users: list[int], messages: int) -> tuple[float, list[str]]:
+    fake.delivered.clear()
+    supervisor = Supervisor(workers)
+    supervisor.start()
+    stream = synthetic_stream(users, messages)
+    expected = len(stream)
+
+    # Wait until every worker answered its warm-up getMe, so process start-up is not measured
+    while fake.requests["getMe"] < workers:
+        await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    for update in stream:
+        supervisor.dispatch(update)
+    deadline = started + 300
+    while sum(len(replies) for replies in fake.delivered.values()) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await supervisor.stop()
+    fake.requests["getMe"] = 0
+    return expected / elapsed, ordering_errors(fake.delivered, users, messages)
+
+
+async def run(args) -> int:
+    fake = FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9)
+    os.environ["TELEGRAM_API_URL"] = await fake.start()
+    failed = False
+    for round_number, workers in enumerate(int(n) for n in args.workers.split(",")):
+        # Fresh user ids per round, so no round sees state left by the previous one
+        users = [1_000_000 * (round_number + 1) + n for n in range(args.users)]
+        rate, errors = await run_round(fake, workers, users, args.messages)
+        print(f"workers={workers:<2} {rate:>7.0f} updates/s | ordering {'ok' if not errors else f'FAILED ({len(errors)} users)'}")
+        for error in errors[:10]:
+            print(f"       !! {error}")
+        failed = failed or bool(errors)
+    await fake.stop()
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10, help="texts per user after /start")
+    parser.add_argument("--workers", default="1,4", help="comma-separated worker counts to run")
+    args = parser.parse_args()
+
+    init_db()
+    print(f"{args.users} users x {args.messages + 1} updates, {os.cpu_count()} CPU cores")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
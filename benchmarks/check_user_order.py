@@ -0,0 +1,213 @@
+"""
+Stress-test per-user ordering of update handling (UserOrderMiddleware).
+
+Usage:
+    python benchmarks/check_user_order.py [--users 500] [--updates 20] [--max-running 64]
+
+Feeds `--users` x `--updates` interleaved message updates to a dispatcher, one task per update in arrival order
+like polling and the webhook do, to a handler sleeping a random 0-5ms. Checks:
+    - handlers of one user never overlap and start in the order the user's updates arrived,
+    - different users run in parallel, never more than `--max-running` at once,
+    - a user whose handlers are slow does not hold back the other users,
+    - the messages of an album run together, after the user's previous update and before the next one,
+    - cancelling a waiting update keeps the order of the updates around it,
+    - no per-user state is left once everything finished.
+Reported: updates/s, handler concurrency and the middleware's queue depth and wait time. Exit code 1 if a check
+fails.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from common import prepare_environment, percentiles
+
+prepare_environment()
+
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.types import Message, Update  # noqa: E402
+from services.ordering import UserOrderMiddleware  # noqa: E402
+
+SLOW_USER = 10**9 + 2
+SLOW_DELAY = 0.2
+
+rng = random.Random(1)
+# user id -> (tag, started, finished) per handled update, in the order handlers started
+runs: dict[int, list[list]] = defaultdict(list)
+running = 0
+max_concurrency = 0
+
+router = Router()
+
+
+@router.message()
+async def record(message: Message) -> None:
+    global running, max_concurrency
+    started = time.monotonic()
+    entry = [message.text, started, 0.0]
+    runs[message.from_user.id].append(entry)
+    running += 1
+    max_concurrency = max(max_concurrency, running)
+    try:
+        await asyncio.sleep(SLOW_DELAY if message.from_user.id == SLOW_USER else rng.random() * 0.005)
+    finally:
+        running -= 1
+        entry[2] = time.monotonic()
+
+
+def make_update(update_id: int, user_id: int, text: str, media_group_id: str | None = None) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+            "media_group_id": media_group_id,
+        },
+    }, context={"bot": None})
+
+
+async def feed(dp: Dispatcher, bot: Bot, updates: list[Update]) -> list[asyncio.Task]:
+    # One task per update in arrival order, like polling and the webhook handler
+    return [asyncio.create_task(dp.feed_update(bot, update)) for update in updates]
+
+
+def check_sequences(expected: dict[int, list[str]]) -> list[str]:
+    errors = []
+    for user_id, tags in expected.items():
+        user_runs = runs[user_id]
+        if [tag for tag, _, _ in user_runs] != tags:
+            errors.append(f"user {user_id} handled {[tag for tag, _, _ in user_runs][:5]}..., expected {tags[:5]}...")
+            continue
+        for (_, _, previous_end), (tag, started, _) in zip(user_runs, user_runs[1:]):
+            if started < previous_end:
+                errors.append(f"user {user_id}: {tag} started before the previous update finished")
+                break
+    return errors
+
+
+async def check_stress(dp: Dispatcher, bot: Bot, order: UserOrderMiddleware, users: int, per_user: int) -> list[str]:
+    updates = []
+    expected: dict[int, list[str]] = defaultdict(list)
+    # Interleave users, each round in a different order
+    for k in range(per_user):
+        round_users = list(range(1, users + 1))
+        rng.shuffle(round_users)
+        for user_id in round_users:
+            tag = f"seq-{k}"
+            updates.append(make_update(len(updates) + 1, user_id, tag))
+            expected[user_id].append(tag)
+
+    started = time.monotonic()
+    tasks = await feed(dp, bot, updates)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+
+    errors = check_sequences(expected)
+    if max_concurrency < 2:
+        errors.append(f"users did not run in parallel (max concurrency {max_concurrency})")
+    if order.max_running and max_concurrency > order.max_running:
+        errors.append(f"{max_concurrency} handlers ran at once, limit is {order.max_running}")
+
+    lat = percentiles([user_runs[-1][2] - started for user_runs in runs.values()])
+    stats = order.stats()
+    print(f"stress: {len(updates)} updates in {elapsed:.2f}s ({len(updates) / elapsed:.0f} updates/s), max concurrency {max_concurrency}")
+    print(f"  users done after p50={lat['p50']:.0f}ms p99={lat['p99']:.0f}ms")
+    print(f"  middleware: max depth {stats['max_depth']}, {stats['waited']} waited avg {stats['wait_avg_ms']:.1f}ms max {stats['wait_max_ms']:.0f}ms")
+    return errors
+
+
+async def check_slow_user(dp: Dispatcher, bot: Bot) -> list[str]:
+    # 10 slow updates first in line, then 3 quick ones from each of 50 other users
+    updates = [make_update(920_001 + k, SLOW_USER, f"slow-{k}") for k in range(10)]
+    for k in range(3):
+        for user_id in range(10**9 + 100, 10**9 + 150):
+            updates.append(make_update(920_100 + len(updates), user_id, f"quick-{k}"))
+    started = time.monotonic()
+    await asyncio.gather(*await feed(dp, bot, updates))
+    slow_done = runs[SLOW_USER][-1][2] - started
+    others_done = max(runs[user_id][-1][2] for user_id in range(10**9 + 100, 10**9 + 150)) - started
+    errors = []
+    if others_done > SLOW_DELAY * 2:
+        errors.append(f"other users finished after {others_done * 1000:.0f}ms, held back by the slow user ({slow_done * 1000:.0f}ms)")
+    print(f"slow user: done after {slow_done * 1000:.0f}ms, others after {others_done * 1000:.0f}ms: {'ok' if not errors else 'FAILED'}")
+    return errors
+
+
+async def check_album(dp: Dispatcher, bot: Bot) -> list[str]:
+    user_id = 10**9
+    runs.pop(user_id, None)
+    updates = [make_update(900_001, user_id, "before")]
+    updates += [make_update(900_002 + i, user_id, f"album-{i}", media_group_id="album") for i in range(3)]
+    updates.append(make_update(900_005, user_id, "after"))
+    await asyncio.gather(*await feed(dp, bot, updates))
+
+    errors = []
+    by_tag = {tag: (started, finished) for tag, started, finished in runs[user_id]}
+    if set(by_tag) != {"before", "album-0", "album-1", "album-2", "after"}:
+        return [f"album check handled {sorted(by_tag)}"]
+    album = [by_tag[f"album-{i}"] for i in range(3)]
+    if min(started for started, _ in album) < by_tag["before"][1]:
+        errors.append("album started before the previous update finished")
+    if by_tag["after"][0] < max(finished for _, finished in album):
+        errors.append("update after the album started before the album finished")
+    if max(started for started, _ in album) > min(finished for _, finished in album):
+        errors.append("album messages did not run together")
+    print(f"album: {'ok' if not errors else 'FAILED'}")
+    return errors
+
+
+async def check_cancel(dp: Dispatcher, bot: Bot) -> list[str]:
+    user_id = 10**9 + 1
+    tasks = await feed(dp, bot, [make_update(910_001 + i, user_id, f"c-{i}") for i in range(3)])
+    await asyncio.sleep(0)
+    # c-1 is waiting for c-0; c-2 must still wait for c-0
+    tasks[1].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tags = [tag for tag, _, _ in runs[user_id]]
+    errors = []
+    if tags != ["c-0", "c-2"]:
+        errors.append(f"after cancelling c-1 handled {tags}")
+    elif runs[user_id][1][1] < runs[user_id][0][2]:
+        errors.append("c-2 started before c-0 finished")
+    print(f"cancel: {'ok' if not errors else 'FAILED'}")
+    return errors
+
+
+async def run(args) -> int:
+    order = UserOrderMiddleware(max_running=args.max_running)
+    dp = Dispatcher()
+    dp.update.outer_middleware(order)
+    dp.include_router(router)
+    # Handlers never call the Bot API
+    bot = Bot(token="123456:benchmark-token")
+
+    errors = await check_stress(dp, bot, order, args.users, args.updates)
+    errors += await check_slow_user(dp, bot)
+    errors += await check_album(dp, bot)
+    errors += await check_cancel(dp, bot)
+    if order.stats()["users"] or order.stats()["running"] or order.stats()["waiting"]:
+        errors.append(f"state left behind: {order.stats()}")
+    await bot.session.close()
+
+    for error in errors[:20]:
+        print(f"!! {error}")
+    print(f"per-user order: {'ok' if not errors else 'FAILED'}")
+    return 1 if errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--updates", type=int, default=20, help="updates per user")
+    parser.add_argument("--max-running", type=int, default=64)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Shared helpers for the scripts in this directory.
+
+Benchmarks run against a throwaway SQLite file, so the environment has to be prepared *before* any project module
+(and therefore `config.app_config`) is imported. Call `prepare_environment()` first thing in every script.
+"""
+import os
+import sys
+import time
+import tempfile
+import statistics
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def prepare_environment(db_path: str | None = None) -> str:
+    """
+    Point the bot configuration to a benchmark database and make project modules importable.
+
+    Parameters:
+        db_path (str | None): Database file to use. A fresh file in a temporary directory is used when omitted.
+
+    Returns:
+        str: Absolute path of the database file the project modules will use.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bilbo-bench-"), "bench.db")
+    db_path = os.path.abspath(db_path)
+    os.environ["DATABASE_NAME"] = db_path
+    os.environ.setdefault("BOT_TOKEN", "123456:benchmark-token")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    return db_path
+
+
+def ops_per_second(func, iterations: int) -> float:
+    """
+    Call `func(i)` for i in range(iterations) and return the achieved calls per second.
+    """
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    return iterations / (time.perf_counter() - started)
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """
+    Return p50/p90/p99/max of latency samples (seconds) converted to milliseconds.
+    """
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else [ordered[0]] * 99
+    return {
+        "p50": cuts[49] * 1000,
+        "p90": cuts[89] * 1000,
+        "p99": cuts[98] * 1000,
+        "max": ordered[-1] * 1000,
+    }
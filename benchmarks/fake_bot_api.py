@@ -0,0 +1,216 @@
+"""
+A local stand-in for the Telegram Bot API, used by the benchmarks that talk to Telegram.
+
+It answers every method with a minimal valid result and enforces flood limits like Telegram does: every chat and
+the bot as a whole have a token bucket, and a request that finds its bucket empty gets HTTP 429 with
+`retry_after`. Point a Bot at it with `make_bot(fake.base_url)`, or answer requests in process without HTTP with
+`RecordingSession`.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict
+
+from aiohttp import web
+from aiogram.client.session.base import BaseSession
+
+ADMIN_RIGHTS = (
+    "is_anonymous", "can_manage_chat", "can_delete_messages", "can_manage_video_chats", "can_restrict_members",
+    "can_promote_members", "can_change_info", "can_invite_users", "can_post_stories", "can_edit_stories",
+    "can_delete_stories",
+)
+
+class Bucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take one token; return 0 on success or the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeBotAPI:
+    """
+    Fake Bot API server with per-chat and global flood limits, request counters and a per-chat delivery log.
+
+    Text messages are remembered, so editing one to the text and keyboard it already has fails with
+    "message is not modified" like on Telegram.
+    """
+
+    def __init__(self, chat_rate: float = 1.0, chat_burst: float = 3, global_rate: float = 30.0, global_burst: float = 30, latency: float = 0.0):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = Bucket(global_rate, global_burst)
+        self.chat_buckets: dict[int, Bucket] = {}
+        self.latency = latency
+        self.requests: dict[str, int] = defaultdict(int)
+        self.flood_errors = 0
+        # chat_id -> methods (with the caption/text tag sent by the benchmark) in the order they were accepted
+        self.delivered: dict[int, list[str]] = defaultdict(list)
+        self.base_url = ""
+        self._runner: web.AppRunner | None = None
+        self._message_id = 0
+        # (chat_id, message_id) -> (text, reply_markup JSON) of text messages
+        self.messages: dict[tuple[int, int], tuple[str, str | None]] = {}
+        self.not_modified = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @staticmethod
+    def _normalize_markup(reply_markup: str | None) -> str | None:
+        """
+        Return the inline keyboard as Telegram echoes it back: only the non-empty rows of `inline_keyboard`, no
+        null fields and no client-side extras like `row_width`; None when nothing is left.
+        """
+        if reply_markup is None:
+            return None
+        keyboard = json.loads(reply_markup).get("inline_keyboard")
+        rows = [[{key: value for key, value in button.items() if value is not None} for button in row] for row in keyboard or () if row]
+        return json.dumps({"inline_keyboard": rows}) if rows else None
+
+    def _message(self, chat_id: int, message_id: int | None = None, text: str | None = None, reply_markup: str | None = None) -> dict:
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        message = {"message_id": message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+        if text is not None:
+            # Only inline keyboards belong to a message
+            reply_markup = self._normalize_markup(reply_markup)
+            self.messages[(chat_id, message_id)] = (text, reply_markup)
+            message["text"] = text
+            if reply_markup is not None:
+                message["reply_markup"] = json.loads(reply_markup)
+        return message
+
+    def _edit(self, method: str, chat_id: int, data) -> tuple[int, dict]:
+        key = (chat_id, int(data["message_id"]))
+        text, reply_markup = self.messages.get(key, ("", None))
+        if method.lower() == "editmessagetext":
+            text = data["text"]
+        edited = (text, self._normalize_markup(data.get("reply_markup")))
+        if self.messages.get(key) == edited:
+            self.not_modified += 1
+            return 400, {
+                "ok": False,
+                "error_code": 400,
+                "description": "Bad Request: message is not modified: specified new message content and reply markup are exactly the same as a current content and reply markup of the message",
+            }
+        self.delivered[chat_id].append(f"{method}:{text}")
+        return 200, {"ok": True, "result": self._message(chat_id, key[1], *edited)}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post()
+        self.requests[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, payload = self.answer(method, data)
+        return web.json_response(payload, status=status)
+
+    def answer(self, method: str, data) -> tuple[int, dict]:
+        """
+        Return the HTTP status and JSON payload answering `method` called with the form fields `data`.
+        """
+        if method.lower() == "getme":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}}
+        if method.lower() == "getmycommands":
+            return 200, {"ok": True, "result": []}
+        if method.lower() == "getmydefaultadministratorrights":
+            return 200, {"ok": True, "result": dict.fromkeys(ADMIN_RIGHTS, False)}
+        if "chat_id" not in data:
+            return 200, {"ok": True, "result": True}
+
+        chat_id = int(data["chat_id"])
+        bucket = self.chat_buckets.setdefault(chat_id, Bucket(self.chat_rate, self.chat_burst))
+        wait = max(bucket.take(), self.global_bucket.take())
+        if wait > 0:
+            self.flood_errors += 1
+            retry_after = max(1, math.ceil(wait))
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }
+
+        if method.lower() == "sendmediagroup":
+            media = json.loads(data["media"])
+            self.delivered[chat_id].append(f"{method}:{media[0].get('caption', '')}")
+            return 200, {"ok": True, "result": [self._message(chat_id) for _ in media]}
+        if method.lower() in ("editmessagetext", "editmessagereplymarkup"):
+            return self._edit(method, chat_id, data)
+        self.delivered[chat_id].append(f"{method}:{data.get('text', data.get('caption', ''))}")
+        return 200, {"ok": True, "result": self._message(chat_id, text=data.get("text"), reply_markup=data.get("reply_markup"))}
+
+
+class RecordingSession(BaseSession):
+    """
+    Bot session answering every request in process with a FakeBotAPI's logic, without HTTP, so a benchmark
+    measures the bot and not the network. Requests are serialized like AiohttpSession does and counted in
+    `api.requests`; answers are parsed by aiogram as usual (errors raise the usual exceptions).
+    """
+
+    def __init__(self, api: FakeBotAPI | None = None, **kwargs):
+        """
+        Parameters:
+            api (FakeBotAPI | None): State answering the requests; one without flood limits when omitted.
+        """
+        super().__init__(**kwargs)
+        self.api = api or FakeBotAPI(chat_rate=1e9, chat_burst=1e9, global_rate=1e9, global_burst=1e9)
+
+    async def make_request(self, bot, method, timeout=None):
+        data = {}
+        for key, value in method.model_dump(warnings=False).items():
+            value = self.prepare_value(value, bot=bot, files={})
+            if value:
+                data[key] = value
+        name = method.__api_method__
+        self.api.requests[name] += 1
+        if self.api.latency:
+            await asyncio.sleep(self.api.latency)
+        status, payload = self.api.answer(name, data)
+        response = self.check_response(bot=bot, method=method, status_code=status, content=json.dumps(payload))
+        return response.result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError("RecordingSession does not download files")
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def make_bot(base_url: str, token: str = "123456:benchmark-token"):
+    """
+    Return an aiogram Bot whose requests go to `base_url` instead of api.telegram.org.
+    """
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    return Bot(token=token, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
@@ -0,0 +1,268 @@
+"""
+Populate a SQLite file with a large, skewed dataset for the service benchmarks.
+
+Usage:
+    python benchmarks/generate_data.py --db big.db [--users 1000000] [--playlists 5000000] [--tracks 50000000]
+                                       [--max-playlist-tracks 100000] [--huge 2] [--seed 1]
+
+The schema is created by the bot's own migrations. Data is skewed like real usage:
+    - playlists per user and tracks per playlist follow Pareto distributions (`--alpha`): most users have a
+      playlist or two and most playlists a few tracks, while a few have thousands,
+    - `--huge` playlists have exactly `--max-playlist-tracks` tracks, no playlist has more,
+    - track file ids come from a catalog of `--catalog` audio files where low ids are much more popular, so the
+      same file sits in many playlists (but never twice in one),
+    - file ids and names have realistic lengths, a fifth of the playlists have a cover.
+Positions are spaced TRACK_POSITION_GAP apart as the bot writes them; no ANALYZE is run, like in production.
+
+A manifest is written next to the database (`<db>.json`): the parameters, totals, distribution percentiles and
+sample playlists per size bucket (1, 10, 100, ... tracks) and users per playlist count bucket, which
+bench_service_scaling.py uses. Expect about 10 minutes and 15 GB per 50M tracks (one core).
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from array import array
+
+from common import prepare_environment
+
+# Telegram audio and photo file ids are about 70-80 characters long
+FILE_ID_TAIL = "AAKB7mWt3xq9Lr2Jp0cVnZ4yHs8dFg1Ue6Oi5Ma7Tb_Xw-Qk3Yz"
+WORDS = ("Chill", "Workout", "Road Trip", "Focus", "Party", "Sleep", "Rock", "Jazz", "Classics", "Favorites", "Mix", "Late Night")
+TELEGRAM_ID_BASE = 100_000_000
+
+
+def file_id(catalog_index: int) -> str:
+    return f"CQACAgIAAxkBAAI{catalog_index:010d}{FILE_ID_TAIL}"
+
+
+def size_bucket(count: int) -> int:
+    """
+    Return the power of ten `count` falls in (0 for 0): 1 for 1-9, 10 for 10-99, ...
+    """
+    return 10 ** int(math.log10(count)) if count > 0 else 0
+
+
+def distribution(counts: array) -> dict[str, int]:
+    ordered = sorted(counts)
+    if not ordered:
+        return {}
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "p999": pick(0.999), "max": ordered[-1]}
+
+
+def pareto_counts(rng: random.Random, items: int, total: int, alpha: float, cap: int, fixed: dict[int, int]) -> array:
+    """
+    Split `total` over `items` with Pareto(`alpha`) weights, at most `cap` per item; `fixed` items get exactly
+    their value. Returns the counts; their sum is `total` unless the caps do not leave room for it.
+    """
+    counts = array("I", bytes(4 * items))
+    budget = total - sum(fixed.values())
+    weights = array("d", (rng.paretovariate(alpha) for _ in range(items)))
+    for index in fixed:
+        weights[index] = 0.0
+    scale = budget / math.fsum(weights) if budget > 0 else 0.0
+    assigned = 0
+    for index, weight in enumerate(weights):
+        count = min(cap, int(weight * scale))
+        counts[index] = count
+        assigned += count
+    for index, count in fixed.items():
+        counts[index] = count
+    # Rounding and the cap leave a remainder, handed out one by one to random items with room left
+    remainder = budget - assigned
+    tries = 0
+    while remainder > 0 and tries < 20 * items:
+        index = rng.randrange(items)
+        tries += 1
+        if index not in fixed and counts[index] < cap:
+            counts[index] += 1
+            remainder -= 1
+    return counts
+
+
+def generate(db_path: str, users: int, playlists: int, tracks: int, catalog: int | None = None, alpha: float = 1.3,
+             max_playlist_tracks: int = 100_000, huge: int = 2, popularity: float = 3.0, covers: float = 0.2,
+             samples: int = 5, seed: int = 1, batch: int = 200_000, log=print) -> dict:
+    """
+    Create `db_path` with the bot's schema and the generated dataset, and write its manifest.
+
+    Parameters:
+        db_path (str): Database file to create; it must not exist yet.
+        users (int): Number of users.
+        playlists (int): Number of playlists, spread over the users.
+        tracks (int): Number of tracks to spread over the playlists (fewer if the per-playlist cap leaves no room).
+        catalog (int | None): Number of distinct audio files; a quarter of `tracks` (at least 16 times the largest
+                              playlist) when omitted.
+        alpha (float): Pareto shape of playlists per user and tracks per playlist; lower is more skewed.
+        max_playlist_tracks (int): Most tracks in one playlist.
+        huge (int): Number of playlists with exactly `max_playlist_tracks` tracks.
+        popularity (float): Skew of file popularity; a file's index is catalog * random() ** popularity.
+        covers (float): Share of playlists with a cover image.
+        samples (int): Sample playlists and users recorded per bucket in the manifest.
+        seed (int): Random seed; the same arguments and seed give the same data.
+        batch (int): Rows per insert transaction.
+        log (Callable[[str], None]): Progress output.
+
+    Returns:
+        dict: The manifest, also written to `<db_path>.json`.
+    """
+    from database.migrations import apply_migrations
+    from services.playlist_service import TRACK_POSITION_GAP
+
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists")
+    huge = min(huge, playlists)
+    if catalog is None:
+        catalog = max(tracks // 4, 16 * max_playlist_tracks)
+    if catalog < max_playlist_tracks:
+        raise ValueError("the catalog must hold at least --max-playlist-tracks files")
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # Nothing to protect while loading: no journal, no fsync, a large page cache
+    for pragma in ("journal_mode=OFF", "synchronous=OFF", "temp_store=MEMORY", "cache_size=-524288", "locking_mode=EXCLUSIVE"):
+        conn.execute(f"PRAGMA {pragma}")
+    conn.execute("BEGIN")
+    apply_migrations(conn)
+    conn.execute("COMMIT")
+
+    def insert(sql: str, rows) -> None:
+        for chunk in iter(lambda: list(itertools.islice(rows, batch)), []):
+            conn.execute("BEGIN")
+            conn.executemany(sql, chunk)
+            conn.execute("COMMIT")
+
+    insert("INSERT INTO users (id, telegram_id) VALUES (?, ?)", ((i, TELEGRAM_ID_BASE + 37 * i) for i in range(1, users + 1)))
+    log(f"{users} users in {time.perf_counter() - started:.1f}s")
+
+    # Owners are drawn by Pareto weight, so a few users own many playlists
+    cumulative = array("d", itertools.accumulate(rng.paretovariate(alpha) for _ in range(users)))
+    user_playlists = array("I", bytes(4 * (users + 1)))
+
+    def playlist_rows():
+        for playlist_id in range(1, playlists + 1):
+            user_id = bisect.bisect(cumulative, rng.random() * cumulative[-1]) + 1
+            user_id = min(user_id, users)
+            user_playlists[user_id] += 1
+            name = f"{rng.choice(WORDS)} {user_playlists[user_id]}"
+            cover = f"AgACAgIAAxkBAAI{playlist_id:010d}{FILE_ID_TAIL}" if rng.random() < covers else None
+            yield playlist_id, user_id, name, cover
+
+    insert("INSERT INTO playlists (id, user_id, name, cover_file_id) VALUES (?, ?, ?, ?)", playlist_rows())
+    log(f"{playlists} playlists in {time.perf_counter() - started:.1f}s")
+
+    fixed = {index: max_playlist_tracks for index in rng.sample(range(playlists), huge)}
+    counts = pareto_counts(rng, playlists, tracks, alpha, max_playlist_tracks, fixed)
+    total_tracks = sum(counts)
+    progress = {"rows": 0, "next": 10 ** 6}
+
+    def track_rows():
+        for index, count in enumerate(counts):
+            if count * 16 > catalog:
+                picks = rng.sample(range(catalog), count)
+            else:
+                seen: set[int] = set()
+                picks = []
+                while len(picks) < count:
+                    pick = int(catalog * rng.random() ** popularity)
+                    if pick not in seen:
+                        seen.add(pick)
+                        picks.append(pick)
+            for k, pick in enumerate(picks, start=1):
+                yield index + 1, file_id(pick), k * TRACK_POSITION_GAP
+            progress["rows"] += count
+            if progress["rows"] >= progress["next"]:
+                progress["next"] += 10 ** 6
+                elapsed = time.perf_counter() - started
+                log(f"  {progress['rows']}/{total_tracks} tracks, {elapsed:.0f}s")
+
+    insert("INSERT INTO tracks (playlist_id, file_id, position) VALUES (?, ?, ?)", track_rows())
+    log(f"{total_tracks} tracks in {time.perf_counter() - started:.1f}s")
+
+    playlist_samples: dict[int, list[int]] = {}
+    for index, count in enumerate(counts):
+        bucket = playlist_samples.setdefault(size_bucket(count), [])
+        if len(bucket) < samples:
+            bucket.append(index + 1)
+    user_samples: dict[int, list[int]] = {}
+    for user_id in range(1, users + 1):
+        bucket = user_samples.setdefault(size_bucket(user_playlists[user_id]), [])
+        if len(bucket) < samples:
+            bucket.append(user_id)
+    manifest = {
+        "database": os.path.abspath(db_path),
+        "parameters": {
+            "users": users, "playlists": playlists, "tracks": tracks, "catalog": catalog, "alpha": alpha,
+            "max_playlist_tracks": max_playlist_tracks, "huge": huge, "popularity": popularity, "covers": covers,
+            "seed": seed,
+        },
+        "totals": {"users": users, "playlists": playlists, "tracks": total_tracks},
+        "tracks_per_playlist": distribution(counts),
+        "playlists_per_user": distribution(user_playlists[1:]),
+        "playlists_by_tracks": {},
+        "users_by_playlists": {},
+    }
+    for bucket, ids in sorted(playlist_samples.items()):
+        manifest["playlists_by_tracks"][str(bucket)] = [
+            {"id": playlist_id, "user_id": user_id, "telegram_id": TELEGRAM_ID_BASE + 37 * user_id, "name": name, "tracks": counts[playlist_id - 1]}
+            for playlist_id, user_id, name in conn.execute(
+                f"SELECT id, user_id, name FROM playlists WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids
+            )
+        ]
+    for bucket, ids in sorted(user_samples.items()):
+        manifest["users_by_playlists"][str(bucket)] = [
+            {"id": user_id, "telegram_id": TELEGRAM_ID_BASE + 37 * user_id, "playlists": user_playlists[user_id]} for user_id in ids
+        ]
+    # Leave the file as the bot expects it
+    conn.execute("PRAGMA locking_mode=NORMAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    manifest["seconds"] = round(time.perf_counter() - started, 1)
+    manifest["bytes"] = os.path.getsize(db_path)
+    with open(f"{db_path}.json", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    log(f"{db_path}: {manifest['bytes'] / 2**20:.0f} MiB in {manifest['seconds']}s, manifest {db_path}.json")
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="database file to create")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--playlists", type=int, default=5_000_000)
+    parser.add_argument("--tracks", type=int, default=50_000_000)
+    parser.add_argument("--catalog", type=int, default=None, help="distinct audio files (default: tracks / 4)")
+    parser.add_argument("--alpha", type=float, default=1.3, help="Pareto shape, lower is more skewed")
+    parser.add_argument("--max-playlist-tracks", type=int, default=100_000)
+    parser.add_argument("--huge", type=int, default=2, help="playlists with exactly --max-playlist-tracks tracks")
+    parser.add_argument("--samples", type=int, default=5, help="sample playlists and users per bucket in the manifest")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="replace an existing database")
+    args = parser.parse_args()
+    db_path = prepare_environment(args.db)
+    if args.force:
+        for suffix in ("", "-wal", "-shm", ".json"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    try:
+        manifest = generate(
+            db_path, args.users, args.playlists, args.tracks, catalog=args.catalog, alpha=args.alpha,
+            max_playlist_tracks=args.max_playlist_tracks, huge=args.huge, samples=args.samples, seed=args.seed,
+        )
+    except (FileExistsError, ValueError) as e:
+        print(f"!! {e}")
+        return 1
+    print(f"tracks per playlist: {manifest['tracks_per_playlist']}")
+    print(f"playlists per user: {manifest['playlists_per_user']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
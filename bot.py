@@ -1,6 +1,9 @@
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import TelegramAPIServer
 import sys
 
 import asyncio
@@ -20,41 +23,116 @@ from config import app_config
 
 from utils.logging import get_logger
 
-from database.db import init_db
+from database.db import init_db, pool
+from database.executor import db_executor
+from database.fsm_storage import SQLiteStorage
+from database.slow_queries import slow_query_log, log_report_on_signal
+from services.bot_info import BotInfoRegistry
+from services.outbound import outbound, OutboundMiddleware
+from services.sessions import add_track_sessions
+from services.ordering import UserOrderMiddleware
+from services.metrics import UpdateMetricsMiddleware, ApiMetricsMiddleware, MetricsFileWriter
+from utils.metrics import metrics
+from server.webhook import run_webhook
+from server.supervisor import run_supervisor
 
 logger = get_logger(__name__)
 
 
 
-bot = Bot(
-    token=app_config.BOT_TOKEN,
-    default=DefaultBotProperties(
-        parse_mode=ParseMode.MARKDOWN
+def create_bot(session: BaseSession | None = None) -> Bot:
+    """
+    Build the Bot used to talk to Telegram.
+    
+    Messages default to Markdown, requests go to TELEGRAM_API_URL when it is set (e.g. a local Bot API server)
+    and chat-bound requests are paced by the rate-limited outbound scheduler. Every request sent is timed
+    (see ApiMetricsMiddleware).
+    
+    Parameters:
+        session (BaseSession | None): Session sending the requests, e.g. a fake one in benchmarks; by default an
+            AiohttpSession to TELEGRAM_API_URL or api.telegram.org.
+    
+    Returns:
+        Bot: The configured bot.
+    """
+    if session is None:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(app_config.TELEGRAM_API_URL)) if app_config.TELEGRAM_API_URL else AiohttpSession()
+    bot = Bot(
+        token=app_config.BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(
+            parse_mode=ParseMode.MARKDOWN
+        )
+    )
+    bot.session.middleware(OutboundMiddleware(outbound))
+    bot.session.middleware(ApiMetricsMiddleware())
+    return bot
+
+
+def create_dispatcher(bot_info: BotInfoRegistry) -> Dispatcher:
+    """
+    Build the Dispatcher with every router of the bot and FSM states persisted in SQLite (see SQLiteStorage).
+    
+    Each user's updates are handled one after another in arrival order and different users in parallel, at most
+    MAX_RUNNING_UPDATES at once (see UserOrderMiddleware, available to handlers as `update_order`). Handlers are
+    timed once their turn came (see UpdateMetricsMiddleware) and the queue depths are exported as gauges.
+    
+    Routers are module-level objects that can be attached to one dispatcher only, so this is called once per
+    process: by main(), or by each worker process of the supervisor mode. It is not called at import time
+    because spawned worker processes import this module again.
+    
+    Parameters:
+        bot_info (BotInfoRegistry): Cached bot facts, available to every handler as the `bot_info` argument.
+    
+    Returns:
+        Dispatcher: The dispatcher with all routers included.
+    """
+    dp = Dispatcher(storage=SQLiteStorage(
+        cache_size=app_config.FSM_CACHE_SIZE,
+        ttl=app_config.FSM_STATE_TTL,
+        flush_interval_ms=app_config.FSM_FLUSH_INTERVAL_MS
+    ))
+    dp["bot_info"] = bot_info
+    update_order = UserOrderMiddleware(max_running=app_config.MAX_RUNNING_UPDATES)
+    dp.update.outer_middleware(update_order)
+    dp["update_order"] = update_order
+    UpdateMetricsMiddleware().install(dp)
+    metrics.gauge("bot_updates_running", "Updates being handled", lambda: update_order.stats()["running"])
+    metrics.gauge("bot_updates_waiting", "Updates waiting for their user's turn or a free slot", lambda: update_order.stats()["waiting"])
+    metrics.gauge("bot_db_requests_in_flight", "Database requests queued or running on threads", lambda: db_executor.stats()["in_flight"])
+    metrics.gauge("bot_db_requests_waiting", "Database requests waiting for a slot", lambda: db_executor.stats()["waiting"])
+    metrics.gauge("bot_outbound_queued", "Bot API requests waiting in the outbound scheduler", lambda: outbound.stats()["queued"])
+    dp.include_routers(
+        start_router,
+        show_playlist_router,
+        add_track_router,
+        add_playlist_router,
+        share_playlist_router,
+        show_musics_router,
+        rename_playlist_router,
+        set_cover_router,
+        remove_track_router,
+        remove_playlist_router
     )
-)
-dp = Dispatcher()
-
-dp.include_routers(
-    start_router,
-    show_playlist_router,
-    add_track_router,
-    add_playlist_router,
-    share_playlist_router,
-    show_musics_router,
-    rename_playlist_router,
-    set_cover_router,
-    remove_track_router,
-    remove_playlist_router
-)
+    return dp
+
+
+bot = create_bot()
+bot_info = BotInfoRegistry(bot, refresh_interval=app_config.BOT_INFO_REFRESH_INTERVAL)
 
 
 async def main():
     """
-    Start the Telegram bot: initialize the database, then begin polling for updates.
+    Start the Telegram bot: initialize the database, then begin receiving updates.
     
     This coroutine initializes the application's database by calling init_db(). If
     database initialization fails, the process exits with status code 1. On
-    successful initialization it starts long-polling the Dispatcher for updates.
+    successful initialization it caches the bot's identity (refreshed in the background, see BotInfoRegistry)
+    and starts receiving updates, either by long polling or through the webhook server (BOT_MODE). With
+    WORKER_PROCESSES above 1 this process only receives updates and shards them over worker processes.
+    With METRICS_FILE set, metrics are written to that file periodically. The slowest SQL statements are logged
+    on SIGUSR1 and when the bot stops.
+    When the bot stops, the database executor threads are drained and pooled connections are closed.
     """
     logger.info("Starting bot ...")
     try:
@@ -63,7 +141,37 @@ async def main():
         logger.error("Database initialization failed, exiting.", exc_info=True)
         sys.exit(1)
 
-    await dp.start_polling(bot)
+    if slow_query_log.enabled:
+        log_report_on_signal(asyncio.get_running_loop())
+    dp = create_dispatcher(bot_info)
+    if not await bot_info.refresh():
+        logger.warning("Could not fetch all bot info at startup, it will be fetched again on first use.")
+    bot_info.start()
+    metrics_file = MetricsFileWriter(app_config.METRICS_FILE, app_config.METRICS_FILE_INTERVAL) if app_config.METRICS_FILE else None
+    if metrics_file is not None:
+        metrics_file.start()
+
+    try:
+        if app_config.WORKER_PROCESSES > 1:
+            await run_supervisor(dp, bot)
+        elif app_config.BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            # getUpdates is refused while a webhook is set, e.g. after switching back from webhook mode
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        # Sessions ending right now still clear their state, so the storage is closed after them
+        await add_track_sessions.stop()
+        await dp.storage.close()
+        await bot_info.stop()
+        await outbound.stop()
+        if metrics_file is not None:
+            await metrics_file.stop()
+        db_executor.shutdown()
+        if slow_query_log.enabled:
+            slow_query_log.log_report()
+        pool.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
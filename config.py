@@ -11,20 +11,110 @@ class appConfigs:
     BOT_TOKEN: str = getenv("BOT_TOKEN","")
     LOG_LEVEL: str = getenv("LOG_LEVEL","INFO")
     LOG_FILE: str|None = getenv("LOG_FILE",None)
+    # Log line format: "text" (timestamp, level emoji, file and line) or "json" (one object per line)
+    LOG_FORMAT: str = getenv("LOG_FORMAT","text").lower()
+    # Log records waiting for the background log writer at most; more are dropped (and counted) instead of blocking
+    LOG_QUEUE_SIZE: int = int(getenv("LOG_QUEUE_SIZE","10000"))
     DATABASE_NAME: str = getenv("DATABASE_NAME","playlist.db")
     PROJECT_ROOT_DIR: str = str(pathlib.Path(os.path.dirname(os.path.abspath(__file__))).absolute())
-    # Max delay between text and audio forwards (in seconds)
+    # Seconds an add-track session stays open after the playlist was chosen or the last audio was forwarded
     ADD_TRACK_TIME_WINDOW: int = int(getenv("ADD_TRACK_TIME_WINDOW","60"))
+    # Add-track sessions kept in memory; starting one more evicts the least recently used
+    ADD_TRACK_MAX_SESSIONS: int = int(getenv("ADD_TRACK_MAX_SESSIONS","100000"))
+    # Resolution (in seconds) of add-track session deadlines; sessions end at most this long after their window closed
+    ADD_TRACK_TIMER_TICK: float = float(getenv("ADD_TRACK_TIMER_TICK","1"))
+    # How forwarded tracks are acknowledged: "message" (one reply per track or album) or "progress" (one status message per session, edited in place)
+    ADD_TRACK_REPLIES: str = getenv("ADD_TRACK_REPLIES","message").lower()
+    # Minimum seconds between two edits of the add-track progress message
+    ADD_TRACK_PROGRESS_INTERVAL: float = float(getenv("ADD_TRACK_PROGRESS_INTERVAL","2"))
+    # Audio files of one forwarded album are collected until none arrived for this long (in milliseconds)
+    ALBUM_DEBOUNCE_MS: float = float(getenv("ALBUM_DEBOUNCE_MS","500"))
+    # Tracks sent per page of a playlist listing, further pages come with a "Next page" button
+    PLAYLIST_PAGE_SIZE: int = int(getenv("PLAYLIST_PAGE_SIZE","30"))
+    # How often (in seconds) the cached bot identity, commands and admin rights are refreshed from Telegram
+    BOT_INFO_REFRESH_INTERVAL: float = float(getenv("BOT_INFO_REFRESH_INTERVAL","3600"))
+    # FSM states (and their data) kept in memory in front of the fsm_states table
+    FSM_CACHE_SIZE: int = int(getenv("FSM_CACHE_SIZE","10000"))
+    # Seconds after its last change an FSM state is considered abandoned and dropped; 0 keeps states forever
+    FSM_STATE_TTL: float = float(getenv("FSM_STATE_TTL","86400"))
+    # FSM changes are written to the database in one batch this long after the first unwritten one (in milliseconds)
+    FSM_FLUSH_INTERVAL_MS: float = float(getenv("FSM_FLUSH_INTERVAL_MS","200"))
+    # Outgoing requests per second allowed per chat, and how many a chat may send back-to-back after being idle
+    OUTBOUND_CHAT_RATE: float = float(getenv("OUTBOUND_CHAT_RATE","1"))
+    OUTBOUND_CHAT_BURST: float = float(getenv("OUTBOUND_CHAT_BURST","3"))
+    # Outgoing requests per second allowed across all chats, and the matching burst
+    OUTBOUND_GLOBAL_RATE: float = float(getenv("OUTBOUND_GLOBAL_RATE","30"))
+    OUTBOUND_GLOBAL_BURST: float = float(getenv("OUTBOUND_GLOBAL_BURST","30"))
+    # Outgoing requests in flight at the same time
+    OUTBOUND_WORKERS: int = int(getenv("OUTBOUND_WORKERS","8"))
+    # Flood-control (retry_after) retries of one request before giving up
+    OUTBOUND_MAX_RETRIES: int = int(getenv("OUTBOUND_MAX_RETRIES","5"))
+    # How updates are received: "polling" (getUpdates) or "webhook"
+    BOT_MODE: str = getenv("BOT_MODE","polling").lower()
+    # Public HTTPS base URL registered with Telegram in webhook mode; leave empty if the webhook is set externally
+    WEBHOOK_BASE_URL: str = getenv("WEBHOOK_BASE_URL","")
+    WEBHOOK_PATH: str = getenv("WEBHOOK_PATH","/webhook")
+    # Address the webhook server listens on
+    WEBHOOK_HOST: str = getenv("WEBHOOK_HOST","0.0.0.0")
+    WEBHOOK_PORT: int = int(getenv("WEBHOOK_PORT","8080"))
+    # Secret Telegram sends in X-Telegram-Bot-Api-Secret-Token; requests without it are rejected when set
+    WEBHOOK_SECRET: str = getenv("WEBHOOK_SECRET","")
+    # Seconds to wait for in-flight webhook updates on shutdown
+    WEBHOOK_SHUTDOWN_TIMEOUT: float = float(getenv("WEBHOOK_SHUTDOWN_TIMEOUT","10"))
+    # Max updates handled at the same time (per process); one user's updates always run one after another
+    MAX_RUNNING_UPDATES: int = int(getenv("MAX_RUNNING_UPDATES",getenv("WEBHOOK_MAX_IN_FLIGHT","64")))
+    # Path of the Prometheus metrics endpoint on the webhook server; empty disables it
+    METRICS_PATH: str = getenv("METRICS_PATH","/metrics")
+    # File the metrics are written to in the Prometheus text format (e.g. for node_exporter's textfile collector); empty disables it
+    METRICS_FILE: str = getenv("METRICS_FILE","")
+    # Seconds between two writes of METRICS_FILE
+    METRICS_FILE_INTERVAL: float = float(getenv("METRICS_FILE_INTERVAL","15"))
+    # Worker processes handling updates; above 1 the main process only receives updates and shards them by user
+    WORKER_PROCESSES: int = int(getenv("WORKER_PROCESSES","1"))
+    # Base URL of the Bot API server, e.g. a local telegram-bot-api instance; empty uses api.telegram.org
+    TELEGRAM_API_URL: str = getenv("TELEGRAM_API_URL","")
+    # SQLite durability level (PRAGMA synchronous), NORMAL is safe with WAL; FULL fsyncs every commit
+    DB_SYNCHRONOUS: str = getenv("DB_SYNCHRONOUS","NORMAL")
+    # Number of long-lived read-only SQLite connections kept in the pool
+    DB_READ_CONNECTIONS: int = int(getenv("DB_READ_CONNECTIONS","4"))
+    # SQLite memory-mapped I/O size in bytes (PRAGMA mmap_size)
+    DB_MMAP_SIZE: int = int(getenv("DB_MMAP_SIZE",str(256 * 1024 * 1024)))
+    # SQLite page cache size, negative values are in KiB (PRAGMA cache_size)
+    DB_CACHE_SIZE: int = int(getenv("DB_CACHE_SIZE","-65536"))
+    # Threads that run database queries off the asyncio event loop
+    DB_EXECUTOR_THREADS: int = int(getenv("DB_EXECUTOR_THREADS","4"))
+    # Max database requests queued or running at once; further callers wait without blocking the loop
+    DB_EXECUTOR_QUEUE_SIZE: int = int(getenv("DB_EXECUTOR_QUEUE_SIZE","1024"))
+    # Max cached telegram_id -> user id entries and how long (seconds) they stay valid, 0 disables expiry
+    USER_ID_CACHE_SIZE: int = int(getenv("USER_ID_CACHE_SIZE","100000"))
+    USER_ID_CACHE_TTL: float = float(getenv("USER_ID_CACHE_TTL","86400"))
+    # Max users whose playlist name -> playlist id mapping is cached
+    PLAYLIST_ID_CACHE_USERS: int = int(getenv("PLAYLIST_ID_CACHE_USERS","50000"))
+    # Bot messages whose last edited text and keyboard are remembered to skip edits that change nothing
+    EDIT_CACHE_SIZE: int = int(getenv("EDIT_CACHE_SIZE","10000"))
+    # Seconds a remembered message view stays valid; 0 keeps it until evicted
+    EDIT_CACHE_TTL: float = float(getenv("EDIT_CACHE_TTL","86400"))
+    # SQL statements taking at least this long (in milliseconds) are logged with their query plan; 0 disables SQL timing
+    SLOW_QUERY_MS: float = float(getenv("SLOW_QUERY_MS","100"))
+    # Statements listed in the slowest SQL statements report
+    SLOW_QUERY_TOP: int = int(getenv("SLOW_QUERY_TOP","10"))
+    # Writes queued together are committed in one transaction; while such a burst is arriving, wait this long (in
+    # milliseconds) for the rest of it. A lone write is never held back
+    DB_WRITE_BATCH_WINDOW_MS: float = float(getenv("DB_WRITE_BATCH_WINDOW_MS","10"))
+    # Max number of writes committed in one transaction
+    DB_WRITE_BATCH_MAX_OPS: int = int(getenv("DB_WRITE_BATCH_MAX_OPS","256"))
 
     def __post_init__(self):
         """
         Validate required configuration after initialization.
         
         Raises:
-            ValueError: If the BOT_TOKEN configuration is empty or not provided.
+            ValueError: If the BOT_TOKEN configuration is empty or not provided, or BOT_MODE is unknown.
         """
         if not self.BOT_TOKEN:
             raise ValueError("Please set BOT_TOKEN value as environment variable")
+        if self.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', got '{self.BOT_MODE}'")
 
 
 app_config = appConfigs()   
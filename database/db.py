@@ -1,6 +1,12 @@
 import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator
 from utils.logging import get_logger
 from config import app_config
+from database.migrations import apply_migrations
+from database.slow_queries import slow_query_log, TimedConnection
 from os.path import join as path_join
 
 logger = get_logger(__name__)
@@ -8,36 +14,156 @@ logger = get_logger(__name__)
 
 sqlite_db_path = path_join(app_config.PROJECT_ROOT_DIR,app_config.DATABASE_NAME)
 
+class ConnectionPool:
+    """
+    Keep long-lived SQLite connections: one writer and up to N readers.
+
+    Connections are opened lazily, tuned once with PRAGMAs when they are opened and then reused by every
+    service call instead of paying for `sqlite3.connect` (file open, schema parse, locking) on each query.
+    Connections run in autocommit mode (isolation_level=None); `writer()` wraps its block in an explicit
+    `BEGIN IMMEDIATE` ... `COMMIT` transaction and rolls back on failure. Unless SLOW_QUERY_MS is 0, connections
+    time their statements for the slow-query log (see SlowQueryLog).
+    """
+
+    def __init__(self, db_path: str, readers: int = 4):
+        """
+        Parameters:
+            db_path (str): Path of the SQLite database file.
+            readers (int): Maximum number of read connections kept open (at least 1).
+        """
+        self.db_path = db_path
+        self.max_readers = max(1, readers)
+        self._writer: sqlite3.Connection | None = None
+        self._writer_lock = threading.Lock()
+        self._idle_readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._all_readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    def _pragmas(self) -> list[str]:
+        """
+        Return the PRAGMA statements applied to every new connection.
+        """
+        return [
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA synchronous={app_config.DB_SYNCHRONOUS}",
+            "PRAGMA foreign_keys=ON",
+            "PRAGMA temp_store=MEMORY",
+            f"PRAGMA mmap_size={int(app_config.DB_MMAP_SIZE)}",
+            f"PRAGMA cache_size={int(app_config.DB_CACHE_SIZE)}",
+        ]
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """
+        Open a new tuned connection to the database.
+
+        Parameters:
+            read_only (bool): When True the connection refuses writes (PRAGMA query_only).
+        """
+        factory = TimedConnection if slow_query_log.enabled else sqlite3.Connection
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10, factory=factory)
+        for pragma in self._pragmas():
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        logger.debug("Opened %s connection to %s", "read" if read_only else "write", self.db_path)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yield the single writer connection inside an immediate transaction.
+
+        Only one thread can hold the writer at a time. The transaction is committed when the block exits
+        normally and rolled back if it raises.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yield a read-only connection from the pool, opening a new one if the pool is not full yet.
+
+        Blocks until a connection is returned when all `max_readers` connections are in use.
+        """
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        while True:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                with self._readers_lock:
+                    if len(self._all_readers) < self.max_readers:
+                        conn = self._connect(read_only=True)
+                        self._all_readers.append(conn)
+                        return conn
+                conn = self._idle_readers.get()
+            # None is put by _release_reader when a reader closed by close() came back: its slot is free again
+            if conn is not None:
+                return conn
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        with self._readers_lock:
+            if conn in self._all_readers:
+                self._idle_readers.put(conn)
+                return
+        # Checked out when the pool was closed
+        conn.close()
+        self._idle_readers.put(None)
+
+    def close(self) -> None:
+        """
+        Close every open connection. The pool reopens connections lazily if it is used again.
+
+        Readers that are checked out are closed when they are returned, not while they are in use.
+        """
+        with self._writer_lock, self._readers_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            while True:
+                try:
+                    conn = self._idle_readers.get_nowait()
+                except queue.Empty:
+                    break
+                if conn is not None:
+                    conn.close()
+            self._all_readers.clear()
+        logger.debug("Closed all connections to %s", self.db_path)
+
+
+pool = ConnectionPool(sqlite_db_path, readers=app_config.DB_READ_CONNECTIONS)
+
 def init_db():
     """
-    Initialize the SQLite database by creating tables for users, playlists, and tracks if they do not already exist.
-    
-    This function ensures the required schema is present for the playlist application. Rolls back the transaction on failure and commits on success.
+    Initialize the SQLite database by applying pending schema migrations (see database.migrations).
+
+    A fresh database gets the users, playlists and tracks tables and their indexes; an existing one is only
+    upgraded from its recorded PRAGMA user_version. All pending migrations run in one transaction, which is rolled
+    back on failure and committed on success.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("""CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER NOT NULL UNIQUE
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS playlists (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                cover_file_id TEXT,
-                UNIQUE(user_id, name),
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS tracks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                playlist_id INTEGER NOT NULL,
-                file_id TEXT NOT NULL,
-                UNIQUE(playlist_id,file_id),
-                FOREIGN KEY (playlist_id) REFERENCES playlists (id) ON DELETE CASCADE
-            )""")
+        with pool.writer() as conn:
+            version = apply_migrations(conn)
     except Exception as e:
-        logger.error("Failed to execute table creation queries",exc_info=True)
+        logger.error("Failed to apply database migrations",exc_info=True)
         raise e
     else:
-        logger.debug("Tables created successfully (If not exists).")
+        logger.debug("Database schema is at version %s.", version)
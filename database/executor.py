@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+from utils.logging import get_logger
+from utils.metrics import metrics
+from config import app_config
+from database.db import pool
+from database.write_queue import WriteQueue
+
+logger = get_logger(__name__)
+
+db_operation_seconds = metrics.histogram(
+    "bot_db_operation_seconds",
+    "Time an awaited service function took, including the wait for a database thread or group commit",
+    ("operation", "kind")
+)
+
+
+class DBExecutor:
+    """
+    Run blocking database calls on dedicated threads so the asyncio event loop never waits on disk I/O.
+
+    Reads run on a thread pool; writes go to a group-commit `WriteQueue` that coalesces them into shared
+    transactions. The request queue is bounded: at most `queue_size` calls are queued or running at once. Callers
+    beyond that limit wait on an asyncio semaphore, which suspends the coroutine instead of blocking the loop.
+    """
+
+    def __init__(self, threads: int = 4, queue_size: int = 1024, write_queue: WriteQueue | None = None):
+        """
+        Parameters:
+            threads (int): Number of database worker threads (at least 1).
+            queue_size (int): Maximum number of in-flight database requests (at least 1).
+            write_queue (WriteQueue | None): Group-commit queue for writes, a default one is created when omitted.
+        """
+        self.threads = max(1, threads)
+        self.queue_size = max(1, queue_size)
+        self.write_queue = write_queue or WriteQueue()
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="db")
+        return self._executor
+
+    def _get_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        # asyncio primitives are bound to one loop, recreate the semaphore if a new loop is running
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.queue_size)
+            self._slots_loop = loop
+        return self._slots
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        slots = self._get_slots(asyncio.get_running_loop())
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run `func(*args, **kwargs)` on a database thread and return its result.
+        """
+        async with self._slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    async def run_write(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Queue the write operation `func(conn, *args, **kwargs)` for the next group commit and return its result.
+        """
+        async with self._slot():
+            return await asyncio.wrap_future(self.write_queue.submit(func, *args, **kwargs))
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the current queue depth: requests running or queued on threads and requests waiting for a slot.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_size": self.queue_size,
+            "pending_writes": self.write_queue.pending(),
+        }
+
+    def shutdown(self) -> None:
+        """
+        Wait for queued calls and writes to finish and stop the worker threads. The executor restarts lazily if used again.
+        """
+        self.write_queue.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        logger.debug("Database executor stopped")
+
+
+db_executor = DBExecutor(
+    threads=app_config.DB_EXECUTOR_THREADS,
+    queue_size=app_config.DB_EXECUTOR_QUEUE_SIZE,
+    write_queue=WriteQueue(window_ms=app_config.DB_WRITE_BATCH_WINDOW_MS, max_ops=app_config.DB_WRITE_BATCH_MAX_OPS)
+)
+
+
+class DBOperation:
+    """
+    Async wrapper around a synchronous service function that takes a pooled connection as its first argument.
+
+    Awaiting the wrapper runs a read on `db_executor` with a reader connection, or queues a write operation for
+    the next group commit (see `WriteQueue`). A write operation that returns None or False did not apply, so its
+    changes are rolled back instead of committed. `run_sync` runs the operation in the calling thread in its own
+    transaction, and the undecorated function stays available as `__wrapped__` for calls that already hold a
+    connection. Every awaited call is timed in the `bot_db_operation_seconds` histogram.
+    """
+
+    def __init__(self, func: Callable[..., Any], write: bool):
+        functools.update_wrapper(self, func)
+        self.write = write
+        self._labels = (func.__name__, "write" if write else "read")
+
+    def run_sync(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run the operation in the calling thread. Returns None if no connection could be used.
+        """
+        try:
+            if not self.write:
+                with pool.reader() as conn:
+                    return self.__wrapped__(conn, *args, **kwargs)
+            with pool.writer() as conn:
+                result = self.__wrapped__(conn, *args, **kwargs)
+                if (result is None or result is False) and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                return result
+        except sqlite3.Error:
+            logger.error(f"Database access failed while running {self.__name__}",exc_info=True)
+            return None
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            if self.write:
+                return await db_executor.run_write(self.__wrapped__, *args, **kwargs)
+            return await db_executor.run(self.run_sync, *args, **kwargs)
+        finally:
+            db_operation_seconds.observe(self._labels, time.perf_counter() - started)
+
+
+def db_read(func: Callable[..., Any]) -> DBOperation:
+    """
+    Decorate a service function `func(conn, ...)` as an awaitable read-only operation.
+    """
+    return DBOperation(func, write=False)
+
+
+def db_write(func: Callable[..., Any]) -> DBOperation:
+    """
+    Decorate a service function `func(conn, ...)` as an awaitable write operation committed through the write queue.
+    """
+    return DBOperation(func, write=True)
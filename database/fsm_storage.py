@@ -0,0 +1,271 @@
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Mapping, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from utils.cache import LRUCache
+from utils.logging import get_logger
+from database.executor import db_read, db_write
+
+logger = get_logger(__name__)
+
+
+class FSMRecord:
+    """
+    State and data of one FSM key, with the wall-clock time (time.time) they were last changed.
+    """
+
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None, updated_at: float = 0.0):
+        self.state = state
+        self.data = data or {}
+        self.updated_at = updated_at
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+@db_read
+def load_fsm_record(conn: sqlite3.Connection, key: str) -> list[tuple[Optional[str], Optional[str], float]]:
+    """
+    Return the stored (state, data, updated_at) row of an FSM key as a list of at most one row.
+
+    An empty list means the key has no stored state; None (from the decorator) means the read failed.
+    """
+    return conn.execute("SELECT state, data, updated_at FROM fsm_states WHERE key=?", (key,)).fetchall()
+
+
+@db_write
+def save_fsm_records(conn: sqlite3.Connection, upserts: list[tuple[str, Optional[str], Optional[str], float]], deletes: list[tuple[str]]) -> bool:
+    """
+    Write a batch of FSM changes: upsert (key, state, data, updated_at) rows and delete the keys that became empty.
+
+    Returns:
+        bool: True once every change is applied.
+    """
+    if upserts:
+        conn.executemany(
+            """INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?,?,?,?)
+               ON CONFLICT(key) DO UPDATE SET state=excluded.state, data=excluded.data, updated_at=excluded.updated_at""",
+            upserts
+        )
+    if deletes:
+        conn.executemany("DELETE FROM fsm_states WHERE key=?", deletes)
+    return True
+
+
+@db_write
+def purge_fsm_records(conn: sqlite3.Connection, older_than: float) -> int:
+    """
+    Delete FSM rows that were not changed since `older_than` (time.time) and return how many were deleted.
+    """
+    return conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (older_than,)).rowcount
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    aiogram FSM storage persisted in the bot's SQLite database (table fsm_states), so conversations survive restarts.
+
+    - Reads are served from a bounded LRU cache of records; only a cache miss reads the database. Keys without a
+      state are cached too, because the FSM middleware looks up the state of every incoming update.
+    - Writes are write-behind: a change updates the cache and marks the key dirty; dirty keys are written
+      together, in one group-committed operation, `flush_interval_ms` after the first change. Several changes of
+      a key in that window (set_state + set_data) become a single row write. Keys with neither state nor data
+      are deleted instead of stored, so the table only holds conversations in progress.
+    - States not changed for `ttl` seconds are abandoned: they read as empty and are purged from the table.
+
+    The cache assumes this process is the only writer of its keys, which holds in every serving mode (workers of
+    the multi-process mode own disjoint users). Call `close()` to write pending changes on shutdown; the
+    dispatcher does this when polling or the webhook application stops.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 10_000,
+        ttl: float = 86400,
+        flush_interval_ms: float = 200,
+        key_builder: KeyBuilder | None = None
+    ):
+        """
+        Parameters:
+            cache_size (int): Maximum number of records kept in memory.
+            ttl (float): Seconds after its last change a state is considered abandoned; 0 keeps states forever.
+            flush_interval_ms (float): Delay between the first unwritten change and the batch write.
+            key_builder (KeyBuilder | None): Turns storage keys into row keys; includes bot id and destiny by default.
+        """
+        self.cache = LRUCache(max_size=cache_size)
+        self.ttl = ttl or None
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True, with_business_connection_id=True)
+        # Changed records not written yet, and the ones being written by the running flush
+        self._dirty: dict[str, FSMRecord] = {}
+        self._flushing: dict[str, FSMRecord] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._purged_at = 0.0
+        self.loads = 0
+        self.flushes = 0
+        self.written = 0
+        self.expired = 0
+
+    def _is_expired(self, record: FSMRecord, now: float) -> bool:
+        return self.ttl is not None and not record.is_empty() and record.updated_at + self.ttl < now
+
+    async def _get_record(self, key: StorageKey) -> tuple[str, FSMRecord]:
+        row_key = self.key_builder.build(key)
+        record = self._dirty.get(row_key) or self._flushing.get(row_key) or self.cache.get(row_key)
+        if record is None:
+            rows = await load_fsm_record(row_key)
+            self.loads += 1
+            # A change may have landed while the row was being read; it is newer than the row
+            record = self._dirty.get(row_key) or self._flushing.get(row_key) or self.cache.get(row_key)
+            if record is None:
+                if rows is None:
+                    # Read failed: answer "no state" this time but do not cache it, the row may exist
+                    return row_key, FSMRecord()
+                record = FSMRecord(rows[0][0], json.loads(rows[0][1]) if rows[0][1] else None, rows[0][2]) if rows else FSMRecord()
+                self.cache.set(row_key, record)
+        if self._is_expired(record, time.time()):
+            logger.debug("FSM state %s of %s expired", record.state, row_key)
+            self.expired += 1
+            record = FSMRecord(updated_at=time.time())
+            self._mark_dirty(row_key, record)
+        return row_key, record
+
+    def _mark_dirty(self, row_key: str, record: FSMRecord) -> None:
+        self.cache.set(row_key, record)
+        self._dirty[row_key] = record
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        task = self._flush_task
+        if task is None or task.done() or task is asyncio.current_task():
+            self._flush_task = asyncio.create_task(self._flush_later(), name="fsm-flush")
+
+    async def _change(self, key: StorageKey, state: Any = ..., data: Any = ...) -> None:
+        row_key, current = await self._get_record(key)
+        record = FSMRecord(
+            current.state if state is ... else state,
+            current.data if data is ... else data,
+            time.time()
+        )
+        self._mark_dirty(row_key, record)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._change(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        _, record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._change(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, record = await self._get_record(key)
+        return dict(record.data)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """
+        Write every pending change in one operation, and purge abandoned states at most once per `ttl`.
+
+        Changes of a failed write stay pending and are retried with the next flush.
+
+        Returns:
+            bool: False if the write failed.
+        """
+        while self._flushing:
+            # Another flush is running; its records must be committed before newer versions of them are written
+            await asyncio.sleep(self.flush_interval or 0.001)
+        if not self._dirty:
+            return True
+        self._flushing, self._dirty = self._dirty, {}
+        try:
+            upserts, deletes = self._serialize_flushing()
+            saved = await save_fsm_records(upserts, deletes)
+        except asyncio.CancelledError:
+            self._requeue()
+            raise
+        except Exception:
+            logger.error(f"Failed to write {len(self._flushing)} FSM records", exc_info=True)
+            saved = None
+        if not saved:
+            logger.error(f"Could not write {len(self._flushing)} FSM records, retrying with the next flush")
+            self._requeue()
+            self._schedule_flush()
+            return False
+        self.flushes += 1
+        self.written += len(self._flushing)
+        self._flushing = {}
+
+        now = time.time()
+        if self.ttl is not None and now - self._purged_at >= self.ttl:
+            self._purged_at = now
+            purged = await purge_fsm_records(now - self.ttl)
+            if purged:
+                logger.info(f"Purged {purged} abandoned FSM states")
+        return True
+
+    def _serialize_flushing(self) -> tuple[list[tuple], list[tuple]]:
+        """
+        Return the rows to upsert and the keys to delete for the records being flushed.
+
+        A record whose data is not JSON serializable can never be written: it is dropped from the flush (and kept
+        in the cache only) instead of failing every later flush.
+        """
+        upserts = []
+        deletes = []
+        unserializable = []
+        for row_key, record in self._flushing.items():
+            if record.is_empty():
+                deletes.append((row_key,))
+                continue
+            try:
+                data = json.dumps(record.data, ensure_ascii=False, separators=(",", ":")) if record.data else None
+            except (TypeError, ValueError):
+                logger.error(f"FSM data of {row_key} is not JSON serializable, it is kept in memory only", exc_info=True)
+                unserializable.append(row_key)
+                continue
+            upserts.append((row_key, record.state, data, record.updated_at))
+        for row_key in unserializable:
+            del self._flushing[row_key]
+        return upserts, deletes
+
+    def _requeue(self) -> None:
+        # Changes made since the flush started are newer and win over the unwritten ones
+        for row_key, record in self._flushing.items():
+            self._dirty.setdefault(row_key, record)
+        self._flushing = {}
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return cache statistics, pending changes and load/flush/expiry counters.
+        """
+        return {
+            "cache": self.cache.stats(),
+            "pending": len(self._dirty) + len(self._flushing),
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "written": self.written,
+            "expired": self.expired,
+        }
+
+    async def close(self) -> None:
+        """
+        Write pending changes now. The storage stays usable afterwards.
+        """
+        await self.flush()
+        # Nothing is left for the scheduled flush; it is only waiting for its timer
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
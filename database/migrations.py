@@ -0,0 +1,97 @@
+import sqlite3
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Ordered schema migrations: (version, description, statements).
+# The database records the last applied version in PRAGMA user_version; only newer migrations run at startup.
+# Never edit a released migration, append a new one instead.
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (1, "initial schema", [
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL UNIQUE
+        )""",
+        """CREATE TABLE IF NOT EXISTS playlists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            cover_file_id TEXT,
+            UNIQUE(user_id, name),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )""",
+        """CREATE TABLE IF NOT EXISTS tracks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            playlist_id INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            UNIQUE(playlist_id,file_id),
+            FOREIGN KEY (playlist_id) REFERENCES playlists (id) ON DELETE CASCADE
+        )""",
+    ]),
+    # Track listing (`WHERE playlist_id=? ORDER BY id`), index lookups and the playlist view read tracks in
+    # insertion order; UNIQUE(playlist_id,file_id) is ordered by file_id, so they needed a temp B-tree sort.
+    # This index is ordered by id and also holds file_id, so those queries never touch the table itself.
+    (2, "covering index for ordered track listing", [
+        "CREATE INDEX IF NOT EXISTS idx_tracks_playlist_order ON tracks (playlist_id, id, file_id)",
+    ]),
+    # Tracks get an explicit, gap-based ordering key. Existing rows keep their insertion order (id * 1024, gaps are
+    # per row so positions only need to be ordered, not dense, inside a playlist). Listing, index lookups and moves
+    # use the new covering index, which replaces the id-ordered one.
+    (3, "explicit track positions", [
+        "ALTER TABLE tracks ADD COLUMN position INTEGER NOT NULL DEFAULT 0",
+        "UPDATE tracks SET position = id * 1024",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_playlist_position ON tracks (playlist_id, position, file_id)",
+        "DROP INDEX IF EXISTS idx_tracks_playlist_order",
+    ]),
+    # FSM state and data of conversations in progress (database.fsm_storage), keyed by aiogram's storage key.
+    # Rows are small and looked up by key only, so the table is clustered on it; the updated_at index serves
+    # the purge of abandoned states.
+    (4, "persistent FSM storage", [
+        """CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Return the schema version stored in the database header (PRAGMA user_version).
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Apply every migration newer than the database's schema version, in order.
+
+    Must be called inside a transaction (e.g. `pool.writer()`): PRAGMA user_version is transactional, so either
+    all pending migrations and the new version are committed together or nothing is.
+
+    Parameters:
+        conn (sqlite3.Connection): Connection with an open write transaction.
+
+    Returns:
+        int: The schema version after migrating.
+
+    Raises:
+        RuntimeError: If the database was created by a newer version of the bot.
+    """
+    version = get_schema_version(conn)
+    if version > LATEST_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than supported version {LATEST_VERSION}")
+    for migration_version, description, statements in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        logger.info(f"Applying database migration {migration_version}: {description}")
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version={int(migration_version)}")
+        version = migration_version
+    return version
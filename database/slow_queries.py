@@ -0,0 +1,306 @@
+import asyncio
+import re
+import signal
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any
+from utils.logging import get_logger
+from config import app_config
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """
+    Return `sql` on one line with literals and placeholder lists replaced by `?`, so executions of the same
+    statement share one entry whatever their values.
+    """
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+
+
+def params_shape(params: Any, many: bool = False) -> str:
+    """
+    Describe the parameters of a statement by their types only, never their values, e.g. `(int, str)` or
+    `120 x (int, str)` for executemany.
+    """
+    if many:
+        return f"{len(params)} x {params_shape(params[0]) if params else '()'}"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+class StatementStats:
+    """
+    Executions of one normalized statement: how many, how long in total and at most, how many were slow, rows.
+    """
+
+    __slots__ = ("sql", "count", "total", "max", "slow", "rows", "plan")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.rows = 0
+        # EXPLAIN QUERY PLAN output, captured the first time the statement was slow ("" if it has none)
+        self.plan: str | None = None
+
+
+class SlowQueryLog:
+    """
+    Time every SQL statement run on the pooled connections and log the ones slower than `threshold_ms`.
+
+    A slow statement is logged with its normalized SQL, the types of its parameters, its row count, its duration
+    and its query plan. The plan is captured with EXPLAIN QUERY PLAN the first time the statement is slow and
+    reused afterwards. A slow executemany() batch (bulk inserts of large albums, data imports) is only logged
+    the first time for its statement, with the batch size and without a plan; later ones are counted. Every
+    statement is aggregated (count, total and max time, rows), see report().
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, top: int = 10):
+        """
+        Parameters:
+            threshold_ms (float): Statements taking at least this long are logged; 0 disables timing.
+            top (int): Default number of statements in report().
+        """
+        self.threshold = threshold_ms / 1000
+        self.top = top
+        self.statements: dict[str, StatementStats] = {}
+        self._by_sql: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def _stats(self, sql: str) -> StatementStats:
+        normalized = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(normalized)
+            if stats is None:
+                stats = self.statements[normalized] = StatementStats(normalized)
+            # Statements come from the code, so the raw texts are few; this keeps normalizing off the hot path
+            if len(self._by_sql) < 10000:
+                self._by_sql[sql] = stats
+        return stats
+
+    def record(self, conn: sqlite3.Connection, sql: str, params: Any, many: bool, seconds: float, rows: int) -> None:
+        """
+        Account one execution of `sql`, and log it if it was slow.
+        """
+        stats = self._by_sql.get(sql) or self._stats(sql)
+        with self._lock:
+            stats.count += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+            if rows > 0:
+                stats.rows += rows
+        if seconds < self.threshold:
+            return
+        with self._lock:
+            stats.slow += 1
+            slow = stats.slow
+        if many:
+            if slow == 1:
+                logger.warning(
+                    f"Slow batch: {seconds * 1000:.1f}ms for {len(params)} rows, params {params_shape(params, many)}: "
+                    f"{stats.sql} (later slow batches of this statement are only counted)"
+                )
+            return
+        if stats.plan is None:
+            stats.plan = self._explain(conn, sql, params)
+        plan = f"\n{stats.plan}" if stats.plan else ""
+        logger.warning(f"Slow query: {seconds * 1000:.1f}ms, {max(rows, 0)} rows, params {params_shape(params)}: {stats.sql}{plan}")
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, params: Any) -> str:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return ""
+        try:
+            # A plain cursor, so the EXPLAIN itself is not timed
+            rows = conn.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error as e:
+            return f"  (query plan not available: {e})"
+        if not rows:
+            return ""
+        depths = {0: 0}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depths[node_id] = depths.get(parent, 0) + 1
+            lines.append(f"{'  ' * depths[node_id]}{detail}")
+        return "\n".join(lines)
+
+    def report(self, top: int | None = None, by: str = "total") -> list[StatementStats]:
+        """
+        Return the `top` statements (SLOW_QUERY_TOP by default) that took the most time, by "total", "max" or
+        "avg" time.
+        """
+        keys = {
+            "total": lambda stats: stats.total,
+            "max": lambda stats: stats.max,
+            "avg": lambda stats: stats.total / stats.count,
+        }
+        with self._lock:
+            statements = list(self.statements.values())
+        return sorted(statements, key=keys[by], reverse=True)[:self.top if top is None else top]
+
+    def format_report(self, top: int | None = None, by: str = "total") -> str:
+        """
+        Return report() as a text table, with the query plan of every statement that was slow.
+        """
+        lines = [f"Slowest SQL statements by {by} time (threshold {self.threshold * 1000:g}ms):",
+                 f"{'total':>10} {'calls':>8} {'avg':>9} {'max':>9} {'slow':>6} {'rows/call':>9}  statement"]
+        for stats in self.report(top, by):
+            lines.append(
+                f"{stats.total * 1000:>8.1f}ms {stats.count:>8} {stats.total / stats.count * 1000:>7.3f}ms "
+                f"{stats.max * 1000:>7.2f}ms {stats.slow:>6} {stats.rows / stats.count:>9.1f}  {stats.sql}"
+            )
+            if stats.plan:
+                lines.append(stats.plan)
+        return "\n".join(lines)
+
+    def log_report(self) -> None:
+        """
+        Log format_report() at INFO level.
+        """
+        logger.info(self.format_report())
+
+    def reset(self) -> None:
+        """
+        Forget every statement and captured plan.
+        """
+        with self._lock:
+            self.statements.clear()
+            self._by_sql.clear()
+
+
+slow_query_log = SlowQueryLog(threshold_ms=app_config.SLOW_QUERY_MS, top=app_config.SLOW_QUERY_TOP)
+
+
+def log_report_on_signal(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Log the slowest SQL statements report whenever the process receives SIGUSR1 (where the platform has it).
+    """
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, slow_query_log.log_report)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        logger.debug("SIGUSR1 is not available, the slow query report is only logged at shutdown")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor reporting every statement it runs to `slow_query_log`.
+
+    A query's time includes fetching its rows, since SQLite produces them while they are fetched; it is recorded
+    once the rows are exhausted, or when the cursor runs the next statement, is closed or is released.
+    """
+
+    _pending: list | None = None
+
+    def _finish(self) -> None:
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            slow_query_log.record(self.connection, *pending)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> "TimedCursor":
+        if self._pending is not None:
+            self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            # Not a query: nothing left to fetch
+            slow_query_log.record(self.connection, sql, parameters, False, elapsed, self.rowcount)
+        else:
+            self._pending = [sql, parameters, False, elapsed, 0]
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> "TimedCursor":
+        if self._pending is not None:
+            self._finish()
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        slow_query_log.record(self.connection, sql, seq_of_parameters, True, time.perf_counter() - started, self.rowcount)
+        return self
+
+    def _fetched(self, started: float, rows: int, exhausted: bool) -> None:
+        pending = self._pending
+        if pending is not None:
+            pending[3] += time.perf_counter() - started
+            pending[4] += rows
+            if exhausted:
+                self._pending = None
+                slow_query_log.record(self.connection, *pending)
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list:
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors, including the ones behind execute() and executemany(), are TimedCursors.
+    """
+
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        return super().cursor(factory or TimedCursor)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
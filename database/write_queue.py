@@ -0,0 +1,146 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+from utils.logging import get_logger
+from database.db import pool
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Write-behind queue that commits many small write operations in a single transaction (group commit).
+
+    Operations are functions `func(conn, *args)` like the ones decorated with @db_write. A dedicated thread takes
+    every operation already queued (up to `max_ops`) and runs them on the writer connection inside one transaction,
+    committed once. A write that arrives alone, like a rename, is committed at once; operations that queue up while
+    a batch commits form the next batch. Only when several operations were queued together, i.e. a burst is under
+    way, the thread waits up to `window_ms` milliseconds for the rest of it.
+
+    Every operation runs inside its own SAVEPOINT, so each caller still gets its own result: an operation that
+    returns None or False (error, duplicate, not found) or raises is rolled back to its savepoint without
+    affecting the rest of the batch. Results are only delivered after the batch is committed; if the commit
+    itself fails every operation in the batch resolves to None, and any other failure of the batch is raised by
+    all of its futures. The writer thread keeps serving later batches either way.
+    """
+
+    def __init__(self, window_ms: float = 10, max_ops: int = 256):
+        """
+        Parameters:
+            window_ms (float): How long to wait for more operations when several arrived together.
+            max_ops (int): Maximum number of operations committed together.
+        """
+        self.window = max(0.0, window_ms) / 1000
+        self.max_ops = max(1, max_ops)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-write-queue", daemon=True)
+                self._thread.start()
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Queue `func(conn, *args, **kwargs)` for the next batch and return a future for its result.
+        """
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((func, args, kwargs, future))
+        return future
+
+    def pending(self) -> int:
+        """
+        Return the approximate number of operations waiting for the next batch.
+        """
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = None
+            while len(batch) < self.max_ops:
+                try:
+                    timeout = 0 if deadline is None else deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    # Nothing else queued: a lone write is not held back, a burst gets the window to complete
+                    if deadline is not None or len(batch) == 1 or self.window <= 0:
+                        break
+                    deadline = time.monotonic() + self.window
+                    continue
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        outcomes = []
+        try:
+            with pool.writer() as conn:
+                for func, args, kwargs, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT write_op")
+                    try:
+                        result = func(conn, *args, **kwargs)
+                    except sqlite3.Error:
+                        logger.error(f"Database error while running {getattr(func, '__name__', func)} in write batch",exc_info=True)
+                        conn.execute("ROLLBACK TO write_op")
+                        outcomes.append((future, None, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_op")
+                        outcomes.append((future, None, e))
+                    else:
+                        if result is None or result is False:
+                            conn.execute("ROLLBACK TO write_op")
+                        outcomes.append((future, result, None))
+                    conn.execute("RELEASE write_op")
+        except sqlite3.Error:
+            logger.error(f"Failed to commit write batch of {len(batch)} operations",exc_info=True)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            return
+        except Exception as e:
+            # Anything else (e.g. the writer connection failing to open) fails the batch, not the writer thread
+            logger.error(f"Unexpected error in write batch of {len(batch)} operations",exc_info=True)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        logger.debug("Committed write batch of %s operations", len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stop(self) -> None:
+        """
+        Commit everything already queued and stop the writer thread. The queue restarts lazily if used again.
+        """
+        with self._thread_lock:
+            if self._thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
@@ -69,25 +69,25 @@ def get_playlist_list_keyboard(playlists_name:list[str]):
     kb = InlineKeyboardMarkup(inline_keyboard=inline_keyboard,row_width=2)
     return kb
 
-def get_music_remove_list_keyboard(music_ids:list[int]):
+def get_music_remove_list_keyboard(track_positions:list[int]):
     """
     Builds an InlineKeyboardMarkup that lets the user select tracks to remove.
     
-    Creates rows containing up to six inline buttons each. Buttons are labeled with the zero-based track index and use callback data in the form `track_to_remove:{index}`. Only the length of `music_ids` is used; the values in the list are not included in button text.
+    Creates rows containing up to six inline buttons each. Buttons are labeled with the zero-based track index and use callback data in the form `track_to_remove:{index}:{position}`, so the removal targets the track the user saw even if the playlist changed meanwhile.
     
     Parameters:
-        music_ids (list[int]): List of music identifiers; only its length determines how many indexed buttons are generated.
+        track_positions (list[int]): Stored positions of the playlist's tracks in playlist order (see playlist_service.get_track_positions).
     
     Returns:
         InlineKeyboardMarkup: Inline keyboard with rows of up to six track-selection buttons (row_width=2).
     """
     inline_keyboard = []
 
-    for i in range(0,len(music_ids),6):
+    for i in range(0,len(track_positions),6):
 
         sub_inline_keyboard = [
-            InlineKeyboardButton(text=f"{j}",callback_data=f"track_to_remove:{j}")
-            for j in range(i,min(i+6,len(music_ids)))
+            InlineKeyboardButton(text=f"{j}",callback_data=f"track_to_remove:{j}:{track_positions[j]}")
+            for j in range(i,min(i+6,len(track_positions)))
         ] 
         inline_keyboard.append(sub_inline_keyboard)
     
@@ -116,4 +116,27 @@ def get_playlist_delete_confirmation_keyboard(playlist_name: str):
         ],
         row_width=2)
     
-    return kb
\ No newline at end of file
+    return kb
+
+def get_next_page_keyboard(playlist_id: int, after_position: int, next_index: int):
+    """
+    Return an InlineKeyboardMarkup with a single "Next page" button continuing a playlist listing.
+    
+    The callback data `page:{playlist_id}:{after_position}:{next_index}` carries where the next page starts (the
+    stored position of the last track shown) and the index of its first track, and stays well under Telegram's
+    64-byte limit whatever the playlist is called.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value of the listed playlist.
+        after_position (int): Stored position of the last track shown.
+        next_index (int): Zero-based index of the first track of the next page.
+    
+    Returns:
+        InlineKeyboardMarkup: Inline keyboard with the "Next page" button.
+    """
+    inline_keyboard = [
+        [
+            InlineKeyboardButton(text=f"{EMOJIS.NEXT.value} Next page", callback_data=f"page:{playlist_id}:{after_position}:{next_index}")
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
@@ -1,9 +1,11 @@
-from aiogram import Router, F
+from aiogram import Bot, Dispatcher, Router, F
 from aiogram.types import Message,CallbackQuery
 from aiogram.fsm.context import FSMContext
-from collections import defaultdict
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from dataclasses import dataclass, field
+import asyncio
 import time
-from typing import Dict, Any
+from typing import Dict
 from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
@@ -11,15 +13,18 @@ from utils.typing import (
     get_audio_file_id,
     get_audio_title,
     get_callback_message,
-    get_callback_text_safe,
-    get_edit_text_message
+    get_callback_text_safe
 )
+from utils.edits import get_edit_view
 from config import app_config
 from services.playlist_service import (
     add_track,
+    add_tracks,
     get_playlist_id_by_name,
     get_user_id as get_db_user_id
 )
+from services.sessions import add_track_sessions, AddTrackSession
+from services.progress import ProgressMessage
 from utils.logging import get_logger
 from utils.messages import is_text_starts_with_emoji
 from utils.filters import IgnoreIfInPlaylistState
@@ -31,12 +36,49 @@ logger = get_logger(__name__)
 add_track_router = Router()
 add_track_router.message.filter(IgnoreIfInPlaylistState(exclude_state="waiting_for_add_music"))
 
-user_contexts: Dict[int, Dict[str, Any]] = defaultdict(lambda: {
-    "playlist_name": None, 
-    "playlist_db_id": None,
-    "timestamp": 0,
-    "tracks_added": 0
-})
+@dataclass
+class PendingAlbum:
+    """
+    Audio messages of one forwarded album collected so far, and when the last of them arrived.
+    """
+    messages: list[Message] = field(default_factory=list)
+    last_update: float = field(default_factory=time.monotonic)
+
+# (telegram user id, media_group_id) -> album being collected by the handler of its first message
+pending_albums: Dict[tuple[int, str], PendingAlbum] = {}
+
+
+async def collect_album(user_id: int, message: Message) -> list[Message] | None:
+    """
+    Group the audio messages of a forwarded album so they can be added in one go.
+    
+    Telegram delivers every file of an album as a separate update sharing a `media_group_id`, and aiogram
+    handles them concurrently. The handler of the first message waits until no further file arrived for
+    ALBUM_DEBOUNCE_MS and returns all collected messages in arrival order; the handlers of the others only add
+    their message and get None back.
+    
+    Parameters:
+        user_id (int): Telegram user id of the sender.
+        message (Message): Incoming audio message with a media_group_id.
+    
+    Returns:
+        list[Message] | None: Every message of the album for the first handler, None for the rest.
+    """
+    key = (user_id, str(message.media_group_id))
+    album = pending_albums.get(key)
+    if album is not None:
+        album.messages.append(message)
+        album.last_update = time.monotonic()
+        return None
+
+    album = pending_albums[key] = PendingAlbum(messages=[message])
+    window = app_config.ALBUM_DEBOUNCE_MS / 1000
+    try:
+        while (remaining := album.last_update + window - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+    finally:
+        pending_albums.pop(key, None)
+    return album.messages
 
 
 @add_track_router.message(
@@ -50,7 +92,7 @@ async def store_playlist_name(message: Message,state: FSMContext):
     Start an "add tracks" session for the user by storing the chosen playlist and prompting the user to forward audio.
     
     If the message text is a non-empty playlist name and the playlist exists for the user, this function:
-    - records a per-user context entry with keys: "playlist_name", "playlist_db_id", "timestamp", and "tracks_added" (initialized to 0);
+    - starts the user's add-track session (see services.sessions) for that playlist;
     - transitions the FSM to PlaylistStates.waiting_for_add_music;
     - sends a confirmation message describing the playlist and the time window allowed for forwarding audio files.
     
@@ -59,10 +101,10 @@ async def store_playlist_name(message: Message,state: FSMContext):
     - empty or whitespace-only playlist name (prompts for a valid name);
     - playlist not found for the user (informs that the playlist does not exist).
     
-    Side effects: modifies the global user_contexts, sets FSM state, and sends messages to the user.
+    Side effects: starts an add-track session, sets FSM state, and sends messages to the user.
     """
     user_id = get_user_id(message)
-    user_db_id = get_db_user_id(user_id)
+    user_db_id = await get_db_user_id(user_id)
     message_text = get_message_text_safe(message)
 
     if user_db_id is None:
@@ -74,7 +116,7 @@ async def store_playlist_name(message: Message,state: FSMContext):
         await message.answer(f"{EMOJIS.FAIL.value} Please provide a valid playlist name.")
         return
 
-    playlist_db_id = get_playlist_id_by_name(user_db_id,playlist_name)
+    playlist_db_id = await get_playlist_id_by_name(user_db_id,playlist_name)
     if playlist_db_id is False:
         logger.warning(f"User {user_id} tried to add to non-existent playlist '{playlist_name}'")
         await message.answer(
@@ -82,13 +124,7 @@ async def store_playlist_name(message: Message,state: FSMContext):
         )
         return
 
-    user_contexts[user_id] = {
-        "playlist_name": playlist_name,
-        "playlist_db_id": playlist_db_id,
-        "timestamp": time.time(),
-        "tracks_added": 0
-    }
-    
+    add_track_sessions.start(user_id, playlist_name, playlist_db_id)
     await state.set_state(PlaylistStates.waiting_for_add_music)
 
     
@@ -99,70 +135,153 @@ async def store_playlist_name(message: Message,state: FSMContext):
     )
 
 
+def render_progress(session: AddTrackSession) -> str:
+    """
+    Return the text of an add-track session's progress message: the playlist and the running counts.
+    """
+    return (
+        f"{EMOJIS.MUSIC.value} Adding tracks to '{session.playlist_name}'\n"
+        f"{EMOJIS.CHECK_MARK.value} Added: {session.tracks_added}\n"
+        f"{EMOJIS.FAIL.value} Already in playlist: {session.duplicates}\n"
+        f"{EMOJIS.WARN.value} Failed: {session.failed}"
+    )
+
+
+async def report_progress(bot: Bot, user_id: int, session: AddTrackSession):
+    """
+    Show the session's counts in its progress message, sending it on the first forwarded track and editing it
+    (at most once per ADD_TRACK_PROGRESS_INTERVAL) afterwards.
+    """
+    if session.progress is None:
+        session.progress = ProgressMessage(
+            bot,
+            user_id,
+            lambda: render_progress(session),
+            interval=app_config.ADD_TRACK_PROGRESS_INTERVAL
+        )
+    await session.progress.update()
+
+
 @add_track_router.message(PlaylistStates.waiting_for_add_music, F.audio)
-async def handle_forwarded_audio(message: Message,state: FSMContext):
+async def handle_forwarded_audio(message: Message,state: FSMContext,bot: Bot):
     """
     Handle a forwarded audio message when the user is in the "waiting for add music" session.
     
-    Processes an incoming audio message by validating the user session and time window, extracting the audio file ID and title, and attempting to add the track to the playlist stored in the per-user session context. Sends user-facing messages for each outcome (success, duplicate track, failure, expired session, or missing session) and clears the FSM state when the session is invalid or expired. On success, increments the session's tracks_added counter.
+    Processes an incoming audio message by looking up the user's add-track session (and extending its window), extracting the audio file ID and title, and attempting to add the track to the session's playlist. Sends user-facing messages for each outcome (success, duplicate track, failure, or ended session) and clears the FSM state when the session has ended. The outcome is counted in the session (tracks_added, duplicates, failed).
+    
+    With ADD_TRACK_REPLIES set to "progress", outcomes are not answered one by one: the session's progress message shows the running counts instead (see report_progress).
+    
+    Audio files of a forwarded album (same media_group_id) are collected by collect_album, inserted in one transaction and answered with a single summary message instead of one reply per file.
     
     Parameters:
         message (Message): The incoming Telegram message containing the forwarded audio.
-        state (FSMContext): The user's FSM context; may be cleared when the session is absent or expired.
+        state (FSMContext): The user's FSM context; cleared when the session has ended.
+        bot (Bot): Bot sending the progress message.
     """
     user_id = get_user_id(message)
-    user_db_id = get_db_user_id(user_id)
-    context = user_contexts.get(user_id)
+
+    if message.media_group_id is not None:
+        album_messages = await collect_album(user_id, message)
+        if album_messages is None:
+            return
+    else:
+        album_messages = [message]
+
+    user_db_id = await get_db_user_id(user_id)
 
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
         return await message.answer(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
 
-    if not context or not context.get("playlist_name"):
-        await message.answer(f"{EMOJIS.FAIL.value} No active playlist session. Send playlist name first.")
-        await state.clear()
-        return
-    
-    # Check time window
-    if time.time() - context['timestamp'] > app_config.ADD_TRACK_TIME_WINDOW:
+    # The user is in waiting_for_add_music, so a missing session ended: its time window passed (or it was evicted)
+    session = add_track_sessions.get(user_id)
+    if session is None:
         logger.info(f"Time window expired for user {user_id}")
         await message.answer(
             f"{EMOJIS.CLOCK.value} Time window expired ({app_config.ADD_TRACK_TIME_WINDOW}s)\n"
             f"{EMOJIS.LIST_WITH_PEN.value} Send the playlist name again to continue adding tracks."
         )
-        user_contexts[user_id] = {
-            "playlist_name": None,
-            "playlist_db_id": None,
-            "timestamp": 0,
-            "tracks_added": 0
-        }
         return await state.clear()
 
-    playlist_name = context["playlist_name"]
+    # Every forward keeps the session open for another window
+    add_track_sessions.extend(user_id)
+    playlist_name = session.playlist_name
+
+    if len(album_messages) > 1:
+        return await add_album(message, album_messages, user_db_id, session, bot)
 
     audio_file_id = get_audio_file_id(message)
     audio_title = get_audio_title(message)
+    progress_mode = app_config.ADD_TRACK_REPLIES == "progress"
 
-    track_added = add_track(playlist_name,user_db_id,audio_file_id)
+    track_added = await add_track(playlist_name,user_db_id,audio_file_id,playlist_id=session.playlist_db_id)
     if track_added is None:
+        session.failed += 1
         logger.error(f"Failed to add '{audio_title}' to {playlist_name} for user '{user_id}'.",exc_info=True)
-        await message.answer(
-            f"{EMOJIS.FAIL.value} Failed to add '{audio_title}' to {playlist_name}."
-        )
+        if not progress_mode:
+            await message.answer(
+                f"{EMOJIS.FAIL.value} Failed to add '{audio_title}' to {playlist_name}."
+            )
     elif track_added is False:
-        await message.answer(
-            f"{EMOJIS.FAIL.value} Track with title='{audio_title}' already exists in **{playlist_name}** playlist."
-        )
+        session.duplicates += 1
+        if not progress_mode:
+            await message.answer(
+                f"{EMOJIS.FAIL.value} Track with title='{audio_title}' already exists in **{playlist_name}** playlist."
+            )
     else:
-        context["tracks_added"] += 1
-        
-        await message.answer(
-            f"{EMOJIS.CHECK_MARK.value} Added: **{audio_title}**\n"
-            f"{EMOJIS.FILE.value} To playlist: '{playlist_name}'\n"
-            f"{EMOJIS.MUSIC.value} Total added this session: {context['tracks_added']}"
-        )
-        
+        session.tracks_added += 1
         logger.info(f"User {user_id} added '{audio_title}' with file_id '{audio_file_id}' to '{playlist_name}'")
+        if not progress_mode:
+            await message.answer(
+                f"{EMOJIS.CHECK_MARK.value} Added: **{audio_title}**\n"
+                f"{EMOJIS.FILE.value} To playlist: '{playlist_name}'\n"
+                f"{EMOJIS.MUSIC.value} Total added this session: {session.tracks_added}"
+            )
+
+    if progress_mode:
+        await report_progress(bot, user_id, session)
+
+
+async def add_album(message: Message, album_messages: list[Message], user_db_id: int, session: AddTrackSession, bot: Bot):
+    """
+    Add every audio file of a forwarded album to the session's playlist and answer with one summary, or update
+    the session's progress message when ADD_TRACK_REPLIES is "progress".
+    
+    Parameters:
+        message (Message): The first message of the album, used to answer the user.
+        album_messages (list[Message]): All audio messages of the album in arrival order.
+        user_db_id (int): Internal user id of the sender.
+        session (AddTrackSession): The user's active add-track session.
+        bot (Bot): Bot sending the progress message.
+    """
+    user_id = get_user_id(message)
+    playlist_name = session.playlist_name
+    file_ids = [get_audio_file_id(album_message) for album_message in album_messages]
+
+    result = await add_tracks(playlist_name,user_db_id,file_ids,playlist_id=session.playlist_db_id)
+    if not result:
+        logger.error(f"Failed to add album of {len(file_ids)} tracks to {playlist_name} for user '{user_id}'.")
+        added, duplicates, failed = 0, 0, len(file_ids)
+    else:
+        added, duplicates = result
+        failed = 0
+    session.tracks_added += added
+    session.duplicates += duplicates
+    session.failed += failed
+
+    logger.info(
+        f"User {user_id} forwarded an album of {len(file_ids)} tracks to '{playlist_name}': "
+        f"added={added} duplicates={duplicates} failed={failed}"
+    )
+    if app_config.ADD_TRACK_REPLIES == "progress":
+        return await report_progress(bot, user_id, session)
+    summary = [f"{EMOJIS.CHECK_MARK.value} Added {added} of {len(file_ids)} tracks to '{playlist_name}'"]
+    if duplicates:
+        summary.append(f"{EMOJIS.FAIL.value} Already in playlist: {duplicates}")
+    if failed:
+        summary.append(f"{EMOJIS.WARN.value} Failed: {failed}")
+    summary.append(f"{EMOJIS.MUSIC.value} Total added this session: {session.tracks_added}")
+    await message.answer("\n".join(summary))
 
 
 @add_track_router.callback_query(F.data.startswith("add_music:"))
@@ -182,39 +301,70 @@ async def handle_add_track_inline(callback: CallbackQuery, state: FSMContext ):
     """
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     playlist_name = callback_text.split(":")[1]
     
     user_id = get_user_id(callback)
-    user_db_id = get_db_user_id(user_id)
+    user_db_id = await get_db_user_id(user_id)
 
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        return await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")    
+        return await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")    
 
-    playlist_db_id = get_playlist_id_by_name(user_db_id,playlist_name)
+    playlist_db_id = await get_playlist_id_by_name(user_db_id,playlist_name)
     if playlist_db_id is False:
         logger.warning(f"User {user_id} tried to add to non-existent playlist '{playlist_name}'")
-        await edit_text_message(
+        await edit_message_view(
             f"{EMOJIS.FAIL.value} Playlist with name `{playlist_name}` is not exist for this user."
         )
         return
 
-    user_contexts[user_id] = {
-        "playlist_name": playlist_name,
-        "playlist_db_id": playlist_db_id,
-        "timestamp": time.time(),
-        "tracks_added": 0
-    }
+    add_track_sessions.start(user_id, playlist_name, playlist_db_id)
     
     await state.set_state(PlaylistStates.waiting_for_add_music)
     
     logger.info(f"User {user_id} started adding music to '{playlist_name}'")
-    await edit_text_message(
+    await edit_message_view(
         f"{EMOJIS.MUSIC.value} Ready to add tracks to playlist: **{playlist_name}**\n"
         f"{EMOJIS.CLOCK.value} Forward audio files within {app_config.ADD_TRACK_TIME_WINDOW} seconds\n"
     )
 
     return await callback.answer()
 
+
+async def end_add_track_session(bot: Bot, storage: BaseStorage, user_id: int, session: AddTrackSession):
+    """
+    Close an add-track session whose time window passed: leave waiting_for_add_music and send one summary.
+    
+    The session's progress message, if any, is brought up to date first. Nothing else is sent if the user
+    already left the "add music" state, e.g. by starting another action.
+    
+    Parameters:
+        bot (Bot): Bot used to send the summary.
+        storage (BaseStorage): The dispatcher's FSM storage.
+        user_id (int): Telegram id of the user (add-track sessions run in private chats, so also the chat id).
+        session (AddTrackSession): The session that ended.
+    """
+    if session.progress is not None:
+        await session.progress.finish()
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=bot.id, chat_id=user_id, user_id=user_id))
+    if await state.get_state() != PlaylistStates.waiting_for_add_music.state:
+        return
+    await state.clear()
+    logger.info(f"Add-track session of user {user_id} for '{session.playlist_name}' ended with {session.tracks_added} tracks added")
+    await bot.send_message(
+        user_id,
+        f"{EMOJIS.CLOCK.value} Session for playlist '{session.playlist_name}' ended: "
+        f"added {session.tracks_added} track{'' if session.tracks_added == 1 else 's'}.\n"
+        f"{EMOJIS.LIST_WITH_PEN.value} Send the playlist name again to add more."
+    )
+
+
+@add_track_router.startup()
+async def setup_session_end(bot: Bot, dispatcher: Dispatcher):
+    """
+    Let add-track sessions end by themselves once the dispatcher starts: when a session's window closes, the
+    user's state is cleared and a summary is sent (see end_add_track_session).
+    """
+    add_track_sessions.on_end = lambda user_id, session: end_add_track_session(bot, dispatcher.storage, user_id, session)
@@ -6,10 +6,9 @@ from utils.logging import get_logger
 from utils.typing import (
     get_user_id,
     get_callback_text_safe,
-    get_callback_message,
-    get_edit_markup_message,
-    get_edit_text_message
+    get_callback_message
 )
+from utils.edits import get_edit_view, edit_view
 from keyboards.inline import get_playlist_delete_confirmation_keyboard
 
 logger = get_logger(__name__)
@@ -40,8 +39,8 @@ async def delete_playlist_handler(callback: CallbackQuery):
     )
     kb = get_playlist_delete_confirmation_keyboard(playlist_name)
 
-    edit_markup_message = get_edit_markup_message(callback_message)
-    return await edit_markup_message(reply_markup=kb)
+    # Skipped when the confirmation keyboard is already shown
+    return await edit_view(callback_message, reply_markup=kb)
 
 
 @remove_playlist_router.callback_query(F.data.startswith("confirm_delete:"))
@@ -66,27 +65,27 @@ async def delete_confirm_action(callback: CallbackQuery):
     playlist_name = callback_text.split(":")[1]
 
     user_id = get_user_id(callback)
-    user_db_id = ps.get_user_id(user_id)
+    user_db_id = await ps.get_user_id(user_id)
 
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
         return await callback.answer()
 
-    success = ps.delete_playlist(user_db_id, playlist_name)
+    success = await ps.delete_playlist(user_db_id, playlist_name)
     if success is True:
         logger.info(f"User {user_id} deleted playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.TRASH.value} Playlist '{playlist_name}' deleted.")
+        await edit_message_view(f"{EMOJIS.TRASH.value} Playlist '{playlist_name}' deleted.")
         return await callback.answer()
     elif success is False:
         logger.warning(f"User {user_id} tried to delete non-existent playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Playlist *{playlist_name}* not found.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Playlist *{playlist_name}* not found.")
         return await callback.answer()
     else:
         logger.warning(f"User {user_id} failed to delete playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Failed to delete *{playlist_name}*.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Failed to delete *{playlist_name}*.")
         return await callback.answer()
 
 @remove_playlist_router.callback_query(F.data == "cancel_delete")
@@ -100,9 +99,9 @@ async def delete_cancel_action(callback: CallbackQuery):
         callback (CallbackQuery): Incoming callback query that triggered cancellation.
     """
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
-    await edit_text_message(f"{EMOJIS.FAIL.value} Deletion canceled.")
+    await edit_message_view(f"{EMOJIS.FAIL.value} Deletion canceled.")
     await callback.answer()
 
 
@@ -8,10 +8,9 @@ from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
     get_callback_text_safe,
-    get_callback_message,
-    get_edit_markup_message,
-    get_edit_text_message
+    get_callback_message
 )
+from utils.edits import get_edit_view
 from keyboards.inline import get_music_remove_list_keyboard
 
 logger = get_logger(__name__)
@@ -26,7 +25,7 @@ async def delete_track_handler(callback: CallbackQuery,state: FSMContext):
     The incoming CallbackQuery must contain callback data of the form "delete_track:<playlist_name>".
     Behavior:
     - Resolves the Telegram user to an internal DB user id. If resolution fails, edits the message with an internal error notice and returns.
-    - Loads tracks for the given playlist. If the playlist is empty or missing, edits the message to indicate the playlist is empty and answers the callback.
+    - Loads track positions for the given playlist. If the playlist is empty or missing, edits the message to indicate the playlist is empty and answers the callback.
     - If tracks exist, edits the message to prompt the user to choose a track index, replaces the message markup with a keyboard of indices, sets the FSM state to PlaylistStates.waiting_for_delete_track, and stores {"playlist_to_remove_track": <playlist_name>} in FSM data.
     - Always answers the callback at the end of a successful flow.
     
@@ -36,34 +35,33 @@ async def delete_track_handler(callback: CallbackQuery,state: FSMContext):
     """
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
-    edit_markup_message = get_edit_markup_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     user_id = get_user_id(callback)
     playlist_name = callback_text.split(":")[1]
 
-    user_db_id = ps.get_user_id(user_id)
-    tracks = ps.get_tracks(playlist_name, user_db_id)
+    user_db_id = await ps.get_user_id(user_id)
+    track_positions = await ps.get_track_positions(playlist_name, user_db_id)
 
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
         return await callback.answer()
     
-    if not tracks:
+    if not track_positions:
         logger.warning(f"User {user_id} tried to show non-existent or empty playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Playlist is empty")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Playlist is empty")
         return await callback.answer()
         
-    music_remove_keyboard = get_music_remove_list_keyboard(list(range(len(tracks))))
+    music_remove_keyboard = get_music_remove_list_keyboard(track_positions)
     logger.info(f"User {user_id} is trying to remove track from playlist '{playlist_name}'")
     await state.set_state(PlaylistStates.waiting_for_delete_track)
     await state.set_data(data={"playlist_to_remove_track":playlist_name})
-    await edit_text_message(
+    await edit_message_view(
         f"{EMOJIS.LIST_WITH_PEN.value} Please Choose track index from below list to remove.\n"
-        "You can see index numbers by tap on *📋 Show Musics* button"
+        "You can see index numbers by tap on *📋 Show Musics* button",
+        reply_markup=music_remove_keyboard
         )
-    await edit_markup_message(reply_markup=music_remove_keyboard)
 
     await callback.answer()
 
@@ -72,39 +70,42 @@ async def delete_track(callback: CallbackQuery, state: FSMContext):
     """
     Remove a track from the playlist chosen earlier in the FSM and notify the user.
     
-    Reads the playlist name from FSM state key "playlist_to_remove_track", parses the selected track index from the callback data (expects a colon-separated value with the index after the colon), resolves the caller's DB user id, and calls the playlist service to remove the track by index. Updates the chat message with success, not-found, or error text, clears the FSM state, and answers the callback.
+    Reads the playlist name from FSM state key "playlist_to_remove_track", parses the selected track index and stored position from the callback data (`track_to_remove:<index>:<position>`), resolves the caller's DB user id, and calls the playlist service to remove the track by index. Updates the chat message with success, not-found, or error text, clears the FSM state, and answers the callback.
     """
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     state_data = await state.get_data()
     playlist_name = state_data["playlist_to_remove_track"]
 
     user_id = get_user_id(callback)
-    track_index = int(callback_text.split(":")[1])
+    callback_parts = callback_text.split(":")
+    track_index = int(callback_parts[1])
+    # Keyboards sent before track positions existed only carry the index
+    track_position = int(callback_parts[2]) if len(callback_parts) > 2 else None
 
-    user_db_id = ps.get_user_id(user_id)
+    user_db_id = await ps.get_user_id(user_id)
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
         return await callback.answer()
 
-    success = ps.remove_track_by_index(user_db_id, playlist_name, track_index)
+    success = await ps.remove_track_by_index(user_db_id, playlist_name, track_index, position=track_position)
     if success is True:
         logger.info(f"User {user_id} removed track #{track_index} from '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.CHECK_MARK.value} Track #{track_index} removed from '{playlist_name}'.")
+        await edit_message_view(f"{EMOJIS.CHECK_MARK.value} Track #{track_index} removed from '{playlist_name}'.")
     elif success is None:
         logger.error(
             f"DB error removing track #{track_index} from '{playlist_name}' "
             f"for user_id={user_id} (db_id={user_db_id})"
         )
-        await edit_text_message(f"{EMOJIS.WARN.value} Something went wrong. Please try again.")
+        await edit_message_view(f"{EMOJIS.WARN.value} Something went wrong. Please try again.")
     else:
         logger.warning(
             f"Track #{track_index} not found in '{playlist_name}' for user_id={user_id}"
         )
-        await edit_text_message(f"{EMOJIS.FAIL.value} Can't remove track #{track_index} from '{playlist_name}'.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Can't remove track #{track_index} from '{playlist_name}'.")
     
     await state.clear()
     return await callback.answer()
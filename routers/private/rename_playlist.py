@@ -9,9 +9,9 @@ from utils.typing import (
     get_user_id,
     get_message_text_safe,
     get_callback_message,
-    get_callback_text_safe,
-    get_edit_text_message
+    get_callback_text_safe
 )
+from utils.edits import get_edit_view
 
 logger = get_logger(__name__)
 
@@ -34,14 +34,14 @@ async def handle_rename_callback(callback: CallbackQuery, state: FSMContext):
     """
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     playlist_name = callback_text.split(":")[1]
 
     await state.set_data(data={"playlist_name_to_rename":playlist_name})
     await state.set_state(PlaylistStates.waiting_for_rename)
 
-    await edit_text_message(f"{EMOJIS.NEW.value} Enter new name for {playlist_name}")
+    await edit_message_view(f"{EMOJIS.NEW.value} Enter new name for {playlist_name}")
     return await callback.answer()
 
 @rename_playlist_router.message(PlaylistStates.waiting_for_rename)
@@ -62,7 +62,7 @@ async def process_rename_playlist(message: Message, state: FSMContext):
     """
     user_id = get_user_id(message)
 
-    user_db_id = ps.get_user_id(user_id)
+    user_db_id = await ps.get_user_id(user_id)
     
     state_data = await state.get_data()
     old_name = state_data["playlist_name_to_rename"]
@@ -72,13 +72,13 @@ async def process_rename_playlist(message: Message, state: FSMContext):
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
         return await message.answer(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
 
-    new_playlist_exists = ps.get_playlist_id_by_name(user_db_id, new_name)
+    new_playlist_exists = await ps.get_playlist_id_by_name(user_db_id, new_name)
     if new_playlist_exists:
         logger.warning(f"User {user_id} tried to rename to existing playlist '{new_name}'")
         await state.clear()
         return await message.answer(f"{EMOJIS.FAIL.value} `{new_name}` already exists, can't rename.")
     
-    ps.rename_playlist(user_db_id, old_name, new_name)
+    await ps.rename_playlist(user_db_id, old_name, new_name)
     await state.clear()
     logger.info(f"User {user_id} renamed playlist '{old_name}' to '{new_name}'")
     return await message.answer(f"{EMOJIS.CHECK_MARK.value} Playlist renamed from '{old_name}' to '{new_name}'.")
\ No newline at end of file
@@ -8,9 +8,9 @@ from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
     get_callback_message,
-    get_callback_text_safe,
-    get_edit_text_message
+    get_callback_text_safe
 )
+from utils.edits import get_edit_view
 
 logger = get_logger(__name__)
 
@@ -29,7 +29,7 @@ async def handle_set_cover_callback(callback: CallbackQuery, state: FSMContext):
     """
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     playlist_name = callback_text.split(":")[1]
     user_id = get_user_id(callback)
@@ -38,7 +38,7 @@ async def handle_set_cover_callback(callback: CallbackQuery, state: FSMContext):
 
     await state.set_data(data={"playlist_name_to_set_cover":playlist_name})
     await state.set_state(PlaylistStates.waiting_for_cover_image)
-    await edit_text_message(
+    await edit_message_view(
         f"{EMOJIS.CAMERA.value} Send photo to set as cover image for **{playlist_name}**.\n"
         "Attention, send photo not file. If you send album, first one will be used."
     )
@@ -61,7 +61,7 @@ async def process_add_cover_to_playlist(message: Message, state: FSMContext):
             target playlist name. The state is cleared by this handler in all outcomes.
     """
     user_id = get_user_id(message)
-    user_db_id = ps.get_user_id(user_id)
+    user_db_id = await ps.get_user_id(user_id)
     
     state_data = await state.get_data()
     playlist_name = state_data["playlist_name_to_set_cover"]
@@ -76,9 +76,9 @@ async def process_add_cover_to_playlist(message: Message, state: FSMContext):
         return await message.answer(f"{EMOJIS.FAIL.value} Please send photo, Can't set this message as cover photo")
 
     file_id = message.photo[-1].file_id
-    cover_set = ps.set_cover_image(user_db_id, playlist_name, file_id)
+    cover_set = await ps.set_cover_image(user_db_id, playlist_name, file_id)
     if cover_set is True:
-        logger.debug(f"User:{user_id} set file with id={file_id} as cover image for {playlist_name} playlist")
+        logger.debug("User:%s set file with id=%s as cover image for %s playlist", user_id, file_id, playlist_name)
         await message.answer(f"{EMOJIS.CHECK_MARK.value} Cover image set for '{playlist_name}'")
     elif cover_set is False:
         logger.error(f"Failed to set cover image with file_id={file_id} for {playlist_name} for user_id={user_id}")
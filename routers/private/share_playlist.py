@@ -1,15 +1,15 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
-from aiogram import Bot
+from services.bot_info import BotInfoRegistry
 import services.playlist_service as ps
 from utils.logging import get_logger
 from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
     get_callback_text_safe,
-    get_callback_message,
-    get_edit_text_message
+    get_callback_message
 )
+from utils.edits import get_edit_view
 
 logger = get_logger(__name__)
 
@@ -17,7 +17,7 @@ share_playlist_router = Router()
 
 
 @share_playlist_router.callback_query(F.data.startswith("share:"))
-async def share_playlist(callback: CallbackQuery, bot: Bot):
+async def share_playlist(callback: CallbackQuery, bot_info: BotInfoRegistry):
     """
     Handle a "share:" callback: resolve the playlist and replace the original message with a shareable bot link.
     
@@ -29,7 +29,7 @@ async def share_playlist(callback: CallbackQuery, bot: Bot):
     
     Parameters:
         callback (CallbackQuery): The incoming callback query that contains the "share:<playlist_name>" data and original message.
-        bot (Bot): Telegram Bot instance (used to fetch the bot username).
+        bot_info (BotInfoRegistry): Cached bot identity (provides the bot username without an API call).
     
     Returns:
         None
@@ -37,31 +37,31 @@ async def share_playlist(callback: CallbackQuery, bot: Bot):
     callback_text = get_callback_text_safe(callback)
     callback_message = get_callback_message(callback)
     
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
     user_id = get_user_id(callback)
     playlist_name = callback_text.split(":")[1]
 
-    user_db_id = ps.get_user_id(user_id)
-    playlist_id = ps.get_playlist_id_by_name(user_db_id, playlist_name)
+    user_db_id = await ps.get_user_id(user_id)
+    playlist_id = await ps.get_playlist_id_by_name(user_db_id, playlist_name)
 
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
         return await callback.answer()
 
     if playlist_id is None:
         logger.error(f"DB error while resolving playlist_id for user={user_id}, name='{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.WARN.value} Something went wrong. Please try again later.")
+        await edit_message_view(f"{EMOJIS.WARN.value} Something went wrong. Please try again later.")
         return await callback.answer()
     if playlist_id is False:
         logger.warning(f"User {user_id} tried to share non-existent playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Playlist not found.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Playlist not found.")
         return await callback.answer()
 
-    bot_username = (await bot.get_me()).username
+    bot_username = (await bot_info.get_me()).username
     link = f"https://t.me/{bot_username}?start=share__{playlist_id}"
     logger.info(f"User {user_id} shared playlist {playlist_name}'")
-    await edit_text_message(f"{EMOJIS.LINK.value} Share this link:\n`{link}`")
+    await edit_message_view(f"{EMOJIS.LINK.value} Share this link:\n`{link}`")
 
     await callback.answer()
\ No newline at end of file
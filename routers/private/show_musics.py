@@ -1,27 +1,51 @@
 from aiogram import Router, F
-from aiogram.types import InputMediaAudio,CallbackQuery,InputMediaPhoto
+from aiogram.types import InputMediaAudio,CallbackQuery,InputMediaPhoto,Message
 import services.playlist_service as ps
+from config import app_config
+from keyboards.inline import get_next_page_keyboard
 from utils.logging import get_logger
 from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
     get_callback_text_safe,
     get_callback_message,
-    get_edit_text_message,
     get_edit_caption_message,
     get_edit_media_message
 )
+from utils.edits import get_edit_view, edit_view, forget_view
 
 logger = get_logger(__name__)
 
 show_musics_router = Router()
 
+
+async def send_playlist_page(message: Message, page: ps.PlaylistPage, first_index: int):
+    """
+    Send one page of a playlist's tracks as audio media groups (up to 10 each), captioned with their index in the
+    whole playlist, followed by a "Next page" button when more tracks follow.
+    
+    Parameters:
+        message (Message): Message of the chat to send the page to.
+        page (ps.PlaylistPage): The page to send, from get_playlist_page.
+        first_index (int): Zero-based index of the page's first track in the playlist.
+    """
+    for i in range(0, len(page.tracks), 10):
+        batch = page.tracks[i:i + 10]
+        media = [InputMediaAudio(media=file_id,caption=f"Index: {first_index + i + j}") for j,file_id in enumerate(batch)]
+        await message.answer_media_group(media) # type: ignore
+    if page.has_more and page.last_position is not None:
+        next_index = first_index + len(page.tracks)
+        await message.answer(
+            f"{EMOJIS.LIST.value} Tracks {first_index}-{next_index - 1} of '{page.name}'",
+            reply_markup=get_next_page_keyboard(page.id, page.last_position, next_index)
+        )
+
 @show_musics_router.callback_query(F.data.startswith("show:"))
 async def show_playlist(callback: CallbackQuery):
     """
-    Show a user's playlist identified in the callback data and stream its tracks as media groups.
+    Show a user's playlist identified in the callback data and send the first page of its tracks as media groups.
     
-    Fetches the database user id and the playlist tracks by parsing the playlist name from the callback data (expected format "show:<playlist_name>"). If the user or tracks cannot be resolved, edits the invoking message to display an error. If the playlist exists, optionally updates the message photo/caption with the playlist cover and sends the playlist tracks in batches (up to 10) as audio media groups, then acknowledges the callback.
+    Resolves the database user id, then fetches the playlist name, cover, track count and first PLAYLIST_PAGE_SIZE tracks via get_playlist_page, parsing the playlist name from the callback data (expected format "show:<playlist_name>"). If the user or tracks cannot be resolved, edits the invoking message to display an error. If the playlist exists, optionally updates the message photo/caption with the playlist cover and sends the page (see send_playlist_page; later pages come from its "Next page" button), then acknowledges the callback.
     
     Parameters:
         callback (CallbackQuery): The incoming callback query that triggered showing the playlist; its data must contain the playlist name.
@@ -30,43 +54,73 @@ async def show_playlist(callback: CallbackQuery):
     user_id = get_user_id(callback)
     callback_message = get_callback_message(callback)
 
-    edit_text_message = get_edit_text_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
     edit_caption_message = get_edit_caption_message(callback_message)
     edit_photo_message = get_edit_media_message(callback_message)
 
     playlist_name = callback_text.split(":")[1]
 
-    user_db_id = ps.get_user_id(user_id)
-    tracks = ps.get_tracks(playlist_name, user_db_id)
-    playlist_id = ps.get_playlist_id_by_name(user_db_id,playlist_name)
-    
+    user_db_id = await ps.get_user_id(user_id)
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
         return await callback.answer()
 
-    if tracks is None:
+    playlist = await ps.get_playlist_page(user_id=user_db_id, playlist_name=playlist_name, limit=app_config.PLAYLIST_PAGE_SIZE, with_count=True)
+    if playlist is None:
         logger.error(f"Database error while fetching tracks for playlist '{playlist_name}' for user {user_id}")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Error retrieving playlist '{playlist_name}'. Please try again.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Error retrieving playlist '{playlist_name}'. Please try again.")
         return await callback.answer()
-    elif not tracks:
+    elif not playlist or not playlist.tracks:
         logger.warning(f"User {user_id} tried to show non-existent or empty playlist '{playlist_name}'")
-        await edit_text_message(f"{EMOJIS.FAIL.value} Playlist '{playlist_name}' is empty.")
+        await edit_message_view(f"{EMOJIS.FAIL.value} Playlist '{playlist_name}' is empty.")
         return await callback.answer()
     
     logger.info(f"User {user_id} is viewing playlist '{playlist_name}'")
 
-    playlist_cover_file_id = ps.get_cover_image_by_playlist_id(playlist_id)
-    if playlist_cover_file_id:
-        await edit_photo_message(media=InputMediaPhoto(media=playlist_cover_file_id))
-        await edit_caption_message(caption=f"{EMOJIS.HEADPHONE.value} Playlist '{playlist_name}' with {len(tracks)} tracks")
+    if playlist.cover_file_id:
+        await edit_photo_message(media=InputMediaPhoto(media=playlist.cover_file_id))
+        await edit_caption_message(caption=f"{EMOJIS.HEADPHONE.value} Playlist '{playlist_name}' with {playlist.track_count} tracks")
+        forget_view(callback_message)
     else:
-        await edit_text_message(f"{EMOJIS.HEADPHONE.value} Playlist '{playlist_name}' with {len(tracks)} tracks")
+        await edit_message_view(f"{EMOJIS.HEADPHONE.value} Playlist '{playlist_name}' with {playlist.track_count} tracks")
+
+    await send_playlist_page(callback_message, playlist, 0) # type: ignore
+    await callback.answer()
 
-    for i in range(0, len(tracks), 10):
-        batch = tracks[i:i + 10]
-        media = [InputMediaAudio(media=file_id,caption=f"Index: {index}") for index,file_id in enumerate(batch)]
-        await callback_message.answer_media_group(media) # type: ignore
+
+@show_musics_router.callback_query(F.data.startswith("page:"))
+async def show_next_page(callback: CallbackQuery):
+    """
+    Send the next page of a playlist listing when its "Next page" button is pressed.
     
+    The callback data (`page:<playlist_id>:<after_position>:<next_index>`, see get_next_page_keyboard) says where
+    the page starts, so only that page is read. The button is removed from the previous page once it was used.
+    Playlists are read by id like share links, so pages of a shared playlist work for the recipient too.
+    
+    Parameters:
+        callback (CallbackQuery): The incoming callback query of the "Next page" button.
+    """
+    callback_text = get_callback_text_safe(callback)
+    callback_message = get_callback_message(callback)
+    user_id = get_user_id(callback)
+
+    try:
+        _, playlist_id, after_position, next_index = callback_text.split(":")
+        playlist_id, after_position, next_index = int(playlist_id), int(after_position), int(next_index)
+    except ValueError:
+        logger.warning(f"User {user_id} sent malformed page callback '{callback_text}'")
+        return await callback.answer()
+
+    page = await ps.get_playlist_page(playlist_id=playlist_id, after_position=after_position, limit=app_config.PLAYLIST_PAGE_SIZE)
+    if page is None:
+        logger.error(f"Database error while fetching page after position {after_position} of playlist_id={playlist_id} for user {user_id}")
+        return await callback.answer(f"{EMOJIS.FAIL.value} Error retrieving playlist. Please try again.")
+    elif not page or not page.tracks:
+        return await callback.answer(f"{EMOJIS.FAIL.value} No more tracks in this playlist.")
+
+    logger.info(f"User {user_id} is viewing playlist_id={playlist_id} from track {next_index}")
+    await edit_view(callback_message, reply_markup=None)
+    await send_playlist_page(callback_message, page, next_index) # type: ignore
     await callback.answer()
 
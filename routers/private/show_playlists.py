@@ -7,10 +7,9 @@ from utils.messages import EMOJIS
 from utils.typing import (
     get_user_id,
     get_callback_text_safe,
-    get_callback_message,
-    get_edit_markup_message,
-    get_edit_text_message
+    get_callback_message
 )
+from utils.edits import get_edit_view
 
 logger = get_logger(__name__)
 
@@ -29,13 +28,13 @@ async def show_all_playlists(message: Message):
     - If playlists are retrieved, sends a "Your playlists" message with a playlist-list inline keyboard.
     """
     user_id = get_user_id(message)
-    user_db_id = ps.get_user_id(user_id)
+    user_db_id = await ps.get_user_id(user_id)
     
     if user_db_id is None:
         logger.error(f"Cannot resolve DB user id for telegram_id={user_id}")
         return await message.answer(f"{EMOJIS.FAIL.value} Internal error. Please try /start and retry.")
 
-    playlists = ps.get_playlists(user_db_id)
+    playlists = await ps.get_playlists(user_db_id)
     if playlists is None:
         logger.error(f"Failed to fetch playlists for user_id={user_id} (db_id={user_db_id})")
         return await message.answer(f"{EMOJIS.WARN.value} Something went wrong. Please try again.")
@@ -56,11 +55,13 @@ async def show_playlist_action_kb(callback: CallbackQuery):
 
     playlist_name = callback_text.split(":")[1]
 
-    edit_text_message = get_edit_text_message(callback_message)
-    edit_markup_message = get_edit_markup_message(callback_message)
+    edit_message_view = get_edit_view(callback_message)
 
-    await edit_text_message(f"{EMOJIS.PEN.value} Select action for playlist '{playlist_name}':")
-    await edit_markup_message(reply_markup=get_playlist_actions_keyboard(playlist_name))
+    # Text and keyboard in one edit, skipped if the message already shows them
+    await edit_message_view(
+        f"{EMOJIS.PEN.value} Select action for playlist '{playlist_name}':",
+        reply_markup=get_playlist_actions_keyboard(playlist_name)
+    )
 
     await callback.answer()
 
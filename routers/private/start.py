@@ -1,8 +1,10 @@
 from aiogram import Router, F
-from aiogram.types import Message, InputMediaAudio
+from aiogram.types import Message
 import re
 from keyboards.reply import get_main_menu
 import services.playlist_service as ps
+from config import app_config
+from routers.private.show_musics import send_playlist_page
 from utils.logging import get_logger
 from utils.messages import EMOJIS
 from utils.typing import get_user_id, get_message_text_safe
@@ -17,13 +19,13 @@ async def cmd_start(message: Message):
     """
     Handle the /start command and deep-link share links; register the user and reply with the main menu or shared playlist media.
     
-    If the incoming message is exactly "/start", sends a welcome message with the main menu. If the message contains a deep-link payload of the form "/start share__<playlist_id>", validates the playlist id, retrieves playlist metadata and tracks from the playlist service, sends a short informational message (and cover image if available), and streams tracks to the user in media groups (batches up to 10). For malformed or unknown payloads it replies with an appropriate warning and the main menu.
+    If the incoming message is exactly "/start", sends a welcome message with the main menu. If the message contains a deep-link payload of the form "/start share__<playlist_id>", validates the playlist id, retrieves playlist metadata and the first page of tracks from the playlist service, sends a short informational message (and cover image if available), and sends the page as media groups (batches up to 10) with a "Next page" button for the rest (see send_playlist_page). For malformed or unknown payloads it replies with an appropriate warning and the main menu.
     
     Parameters:
         message (aiogram.types.Message): Incoming Telegram message to process and use for replies.
     """
     user_id = get_user_id(message)
-    ps.add_user(user_id)
+    await ps.add_user(user_id)
     
     logger.info(f"User {user_id} started the bot")
     message_text = get_message_text_safe(message)
@@ -47,32 +49,27 @@ async def cmd_start(message: Message):
             logger.warning(f"User with '{user_id}' start bot with invalid link, playlist_id was not int.\nStart link: {message_text}")
             return await message.answer(f"{EMOJIS.FAIL.value} Thought it was playlist link but got invalid playlist link. Choose an option to interact with bot:", reply_markup=get_main_menu())
 
-        playlist_name = ps.get_playlist_name_by_id(playlist_id)
-        if playlist_name is None:
+        playlist = await ps.get_playlist_page(playlist_id=playlist_id, limit=app_config.PLAYLIST_PAGE_SIZE)
+        if playlist is None:
             logger.error(f"Can't get playlist name for playlist_id={playlist_id}")
             return await message.answer(f"{EMOJIS.FAIL.value} Can't retrieve playlist name from database, try again!")
-        elif playlist_name is False:
+        elif playlist is False:
             logger.error(f"User with user_id={user_id} tried to start bot with unknown playlist_id ({playlist_id}.)")
             return await message.answer(f"{EMOJIS.FAIL.value} Invalid share link, requested playlist does not exist.")
         
-        tracks = ps.get_tracks_by_playlist_id(playlist_id)
-        if not tracks:
+        if not playlist.tracks:
             logger.warning(f"User with id {user_id} start bot with share link but playlist was empty.\nShare link: {message_text}")
             return await message.answer(f"{EMOJIS.FAIL.value} Playlist is empty or not found.")
 
         escaped_name = re.sub(
             pattern=r'([*_`\[\]])',
             repl=r'\\\1', 
-            string=playlist_name)
+            string=playlist.name)
         await message.answer(f"{EMOJIS.HEADPHONE.value} **{escaped_name}** Playlist shared with you:")
-        cover = ps.get_cover_image_by_playlist_id(playlist_id)
-        if cover:
-            await message.answer_photo(cover, caption=f"{EMOJIS.MUSIC.value} Playlist Cover")
+        if playlist.cover_file_id:
+            await message.answer_photo(playlist.cover_file_id, caption=f"{EMOJIS.MUSIC.value} Playlist Cover")
 
-        for i in range(0, len(tracks), 10):
-            batch = tracks[i:i+10]
-            media = [InputMediaAudio(media=file_id) for file_id in batch]
-            await message.answer_media_group(media) # type: ignore
+        await send_playlist_page(message, playlist, 0)
     else:
         logger.warning(f"User with '{user_id}' start bot with invalid link, not started with 'share__'.\nStart link: {message_text}")
         return await message.answer(f"{EMOJIS.WARN.value} Unknown start link, so ... Welcome to Playlist Bot! Choose an option:", reply_markup=get_main_menu())
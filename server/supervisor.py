@@ -0,0 +1,282 @@
+import asyncio
+import multiprocessing
+import queue
+import secrets
+from typing import Any, Dict
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from config import app_config
+from utils.logging import get_logger, stop_logging
+from server.webhook import register_webhook, serve
+from services.metrics import metrics_view, worker_metrics_file, MetricsFileWriter
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Spawned (not forked) workers start from a clean interpreter: no inherited event loop, sockets or SQLite handles
+_mp = multiprocessing.get_context("spawn")
+
+# Update fields that carry the acting user in `from`, checked in order
+_USER_FIELDS = (
+    "message", "edited_message", "callback_query", "inline_query", "chosen_inline_result",
+    "shipping_query", "pre_checkout_query", "poll_answer", "my_chat_member", "chat_member", "chat_join_request",
+    "message_reaction", "business_message", "edited_business_message", "purchased_paid_media",
+)
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """
+    Return the id updates are sharded by: the Telegram id of the user who caused the update.
+
+    Falls back to the chat id (channel posts, anonymous reactions, ...) and to 0 for updates without either.
+    """
+    for name in _USER_FIELDS:
+        event = update.get(name)
+        if event is None:
+            continue
+        user = event.get("from") or event.get("user")
+        if user:
+            return int(user["id"])
+        chat = event.get("chat")
+        if chat:
+            return int(chat["id"])
+    for event in update.values():
+        if isinstance(event, dict) and isinstance(event.get("chat"), dict):
+            return int(event["chat"]["id"])
+    return 0
+
+
+class Supervisor:
+    """
+    Spread updates over worker processes, always sending the updates of one user to the same worker.
+
+    Each worker runs the full router stack of bot.py with its own event loop, so in-memory per-user state (FSM,
+    add-track sessions, caches) stays consistent and a user's updates are handled in the order they arrived.
+    Workers that exit unexpectedly are restarted on the same queue.
+    """
+
+    def __init__(self, workers: int):
+        """
+        Parameters:
+            workers (int): Number of worker processes (at least 1).
+        """
+        self.workers = max(1, workers)
+        self.queues = [_mp.Queue() for _ in range(self.workers)]
+        self.processes: list[multiprocessing.process.BaseProcess | None] = [None] * self.workers
+        self.dispatched = [0] * self.workers
+        self.restarts = 0
+        self._stopping = False
+
+    def _spawn(self, index: int) -> None:
+        process = _mp.Process(
+            target=worker_main,
+            args=(index, self.workers, self.queues[index]),
+            name=f"bot-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def start(self) -> None:
+        """
+        Start every worker process.
+        """
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def dispatch(self, update: Dict[str, Any]) -> int:
+        """
+        Queue a raw update for the worker owning its user and return that worker's index.
+        """
+        index = shard_key(update) % self.workers
+        self.queues[index].put(update)
+        self.dispatched[index] += 1
+        return index
+
+    async def monitor(self, interval: float = 1.0) -> None:
+        """
+        Restart workers that died, checking every `interval` seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.error(f"Worker {index} exited with code {process.exitcode}, restarting it")
+                    self.restarts += 1
+                    self._spawn(index)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return per-worker dispatched counts and approximate queue depths, and the number of restarts.
+        """
+        depths = []
+        for worker_queue in self.queues:
+            try:
+                depths.append(worker_queue.qsize())
+            except NotImplementedError:
+                depths.append(-1)
+        return {"dispatched": list(self.dispatched), "queued": depths, "restarts": self.restarts}
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """
+        Ask workers to finish their queued updates and exit; terminate the ones still running after `timeout`.
+        """
+        self._stopping = True
+        timeout = app_config.WEBHOOK_SHUTDOWN_TIMEOUT if timeout is None else timeout
+        for worker_queue in self.queues:
+            worker_queue.put(None)
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop in {timeout}s, terminating it")
+                process.terminate()
+
+
+async def _poll_into(supervisor: Supervisor, dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Long-poll getUpdates and hand every update to the supervisor.
+    """
+    await bot.delete_webhook()
+    allowed_updates = dispatcher.resolve_used_update_types()
+    offset = None
+    backoff = 1.0
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except Exception:
+            logger.error(f"Failed to fetch updates, retrying in {backoff:.0f}s", exc_info=True)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+        backoff = 1.0
+        for update in updates:
+            supervisor.dispatch(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+            offset = update.update_id + 1
+
+
+def create_ingress_app(supervisor: Supervisor) -> web.Application:
+    """
+    Build the webhook application of the supervisor: check the secret token, queue the update, answer 200.
+
+    METRICS_PATH only serves the metrics of this process; workers write theirs to METRICS_FILE (see _run_worker).
+    """
+    async def handle(request: web.Request) -> web.Response:
+        if app_config.WEBHOOK_SECRET and not secrets.compare_digest(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), app_config.WEBHOOK_SECRET
+        ):
+            return web.Response(body="Unauthorized", status=401)
+        supervisor.dispatch(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(app_config.WEBHOOK_PATH, handle)
+    if app_config.METRICS_PATH:
+        app.router.add_get(app_config.METRICS_PATH, metrics_view)
+    return app
+
+
+async def run_supervisor(dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Run the ingress of the multi-process mode until cancelled.
+
+    Starts WORKER_PROCESSES workers, then receives updates by polling or webhook (BOT_MODE) and routes each one
+    to the worker that owns its user. Workers are stopped when this coroutine ends.
+
+    Parameters:
+        dispatcher (Dispatcher): The ingress process' dispatcher, used for the list of handled update types.
+        bot (Bot): Bot used to receive updates.
+    """
+    supervisor = Supervisor(app_config.WORKER_PROCESSES)
+    supervisor.start()
+    monitor = asyncio.create_task(supervisor.monitor())
+    try:
+        if app_config.BOT_MODE == "webhook":
+            await serve(create_ingress_app(supervisor), on_listening=lambda: register_webhook(dispatcher, bot))
+        else:
+            await _poll_into(supervisor, dispatcher, bot)
+    finally:
+        monitor.cancel()
+        await supervisor.stop()
+        logger.info(f"Supervisor stopped: {supervisor.stats()}")
+
+
+def worker_main(index: int, workers: int, updates: Any) -> None:
+    """
+    Entry point of a worker process: handle the updates arriving on `updates` until a None sentinel.
+    """
+    try:
+        asyncio.run(_run_worker(index, workers, updates))
+    finally:
+        # multiprocessing does not run atexit handlers in the worker
+        stop_logging()
+
+
+async def _run_worker(index: int, workers: int, updates: Any) -> None:
+    # Imported here so the bot, its dispatcher and all routers are built inside the worker process
+    import bot as app
+    from database.db import pool
+    from database.executor import db_executor
+    from database.slow_queries import slow_query_log, log_report_on_signal
+    from services.outbound import outbound, TokenBucket
+    from services.sessions import add_track_sessions
+
+    # Every worker writes its own file, labelled with its index
+    metrics.const_labels["worker"] = str(index)
+    metrics_file = MetricsFileWriter(worker_metrics_file(app_config.METRICS_FILE, index), app_config.METRICS_FILE_INTERVAL) if app_config.METRICS_FILE else None
+    # Workers share Telegram's global limit
+    outbound.global_bucket = TokenBucket(app_config.OUTBOUND_GLOBAL_RATE / workers, max(1.0, app_config.OUTBOUND_GLOBAL_BURST / workers))
+    if slow_query_log.enabled:
+        # SIGUSR1 sent to a worker's pid logs its report
+        log_report_on_signal(asyncio.get_running_loop())
+    dp = app.create_dispatcher(app.bot_info)
+    await app.bot_info.refresh()
+    app.bot_info.start()
+    if metrics_file is not None:
+        metrics_file.start()
+    # Startup and shutdown hooks get the same arguments as in polling mode
+    workflow_data = {"dispatcher": dp, "bots": [app.bot], **dp.workflow_data}
+    await dp.emit_startup(bot=app.bot, **workflow_data)
+
+    # Tasks are created in arrival order; the dispatcher's UserOrderMiddleware keeps each user's updates in it
+    pending: set[asyncio.Task] = set()
+
+    async def handle(update: Dict[str, Any]) -> None:
+        try:
+            result = await dp.feed_raw_update(app.bot, update)
+            if isinstance(result, TelegramMethod):
+                await dp.silent_call_request(bot=app.bot, result=result)
+        except Exception:
+            logger.error(f"Worker {index} failed to handle update {update.get('update_id')}", exc_info=True)
+
+    logger.info(f"Worker {index} ready")
+    try:
+        while True:
+            try:
+                update = await asyncio.to_thread(updates.get)
+            except (EOFError, OSError, queue.Empty):
+                break
+            if update is None:
+                break
+            task = asyncio.create_task(handle(update))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(list(pending))
+    finally:
+        await add_track_sessions.stop()
+        # Also closes the FSM storage, writing pending state changes
+        await dp.emit_shutdown(bot=app.bot, **workflow_data)
+        await app.bot_info.stop()
+        await outbound.stop()
+        if metrics_file is not None:
+            await metrics_file.stop()
+        await app.bot.session.close()
+        db_executor.shutdown()
+        if slow_query_log.enabled:
+            slow_query_log.log_report()
+        pool.close()
+        logger.info(f"Worker {index} stopped")
@@ -0,0 +1,142 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from config import app_config
+from services.metrics import metrics_view
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackgroundRequestHandler(SimpleRequestHandler):
+    """
+    Webhook request handler that answers Telegram with 200 right away and processes updates in the background.
+
+    Every update gets its task as its request arrives, so updates reach the dispatcher in arrival order; how many
+    run at once, and in which order per user, is up to the dispatcher's UserOrderMiddleware. The secret token
+    sent by Telegram in `X-Telegram-Bot-Api-Secret-Token` is checked by SimpleRequestHandler (401 on mismatch).
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: str | None = None, **data: Any):
+        """
+        Parameters:
+            dispatcher (Dispatcher): Dispatcher that handles the updates.
+            bot (Bot): Bot the webhook belongs to.
+            secret_token (str | None): Expected secret token; None or empty disables the check.
+        """
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token or None, **data)
+        self.handled = 0
+        self.failed = 0
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        except Exception:
+            self.failed += 1
+            logger.error(f"Failed to handle update {update.get('update_id')}", exc_info=True)
+        else:
+            self.handled += 1
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return updates accepted but not finished yet, handled and failed so far.
+        """
+        return {
+            "pending": len(self._background_feed_update_tasks),
+            "handled": self.handled,
+            "failed": self.failed,
+        }
+
+    async def close(self) -> None:
+        """
+        Give updates that are still being handled a chance to finish, then close the bot session.
+        """
+        pending = list(self._background_feed_update_tasks)
+        if pending:
+            logger.info(f"Waiting for {len(pending)} webhook updates to finish")
+            await asyncio.wait(pending, timeout=app_config.WEBHOOK_SHUTDOWN_TIMEOUT)
+        await super().close()
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, **data: Any) -> tuple[web.Application, BackgroundRequestHandler]:
+    """
+    Build the aiohttp application serving the webhook endpoint at WEBHOOK_PATH.
+
+    Dispatcher startup/shutdown hooks run with the application's lifecycle. Metrics are served at METRICS_PATH
+    unless it is empty.
+
+    Parameters:
+        dispatcher (Dispatcher): Dispatcher that handles the updates.
+        bot (Bot): Bot the webhook belongs to.
+        **data: Extra keyword arguments passed to the handlers.
+
+    Returns:
+        tuple[web.Application, BackgroundRequestHandler]: The application and its request handler.
+    """
+    app = web.Application()
+    handler = BackgroundRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=app_config.WEBHOOK_SECRET,
+        **data
+    )
+    handler.register(app, path=app_config.WEBHOOK_PATH)
+    if app_config.METRICS_PATH:
+        app.router.add_get(app_config.METRICS_PATH, metrics_view)
+    setup_application(app, dispatcher, bot=bot, **data)
+    return app, handler
+
+
+async def register_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Register WEBHOOK_BASE_URL + WEBHOOK_PATH with Telegram, together with the secret token and the update types
+    the dispatcher actually handles. Does nothing when WEBHOOK_BASE_URL is empty (webhook set up externally).
+    """
+    if not app_config.WEBHOOK_BASE_URL:
+        return
+    running = app_config.MAX_RUNNING_UPDATES
+    # 0 means no limit on running updates, so Telegram may open as many connections as it allows (100)
+    max_connections = min(100, running) if running and running > 0 else 100
+    await bot.set_webhook(
+        url=app_config.WEBHOOK_BASE_URL.rstrip("/") + app_config.WEBHOOK_PATH,
+        secret_token=app_config.WEBHOOK_SECRET or None,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=max_connections
+    )
+    logger.info("Webhook registered with Telegram")
+
+
+async def serve(app: web.Application, on_listening: Callable[[], Awaitable[None]] | None = None) -> None:
+    """
+    Serve an aiohttp application on WEBHOOK_HOST:WEBHOOK_PORT until cancelled.
+
+    Parameters:
+        app (web.Application): Application to serve.
+        on_listening (Callable | None): Awaited once the server accepts connections (e.g. register_webhook).
+    """
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, app_config.WEBHOOK_HOST, app_config.WEBHOOK_PORT)
+        await site.start()
+        logger.info(f"Webhook server listening on {app_config.WEBHOOK_HOST}:{app_config.WEBHOOK_PORT}{app_config.WEBHOOK_PATH}")
+        if on_listening is not None:
+            await on_listening()
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Serve updates through a webhook on WEBHOOK_HOST:WEBHOOK_PORT until cancelled, registering it with Telegram
+    first (see register_webhook).
+
+    Parameters:
+        dispatcher (Dispatcher): Dispatcher that handles the updates.
+        bot (Bot): Bot the webhook belongs to.
+    """
+    app, _ = create_webhook_app(dispatcher, bot)
+    await serve(app, on_listening=lambda: register_webhook(dispatcher, bot))
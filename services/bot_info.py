@@ -0,0 +1,105 @@
+import asyncio
+import time
+from aiogram import Bot
+from aiogram.types import User, BotCommand, ChatAdministratorRights
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BotInfoRegistry:
+    """
+    Cached, periodically refreshed facts about the bot itself that rarely change.
+
+    Holds the bot's identity (getMe), its command list (getMyCommands) and the default administrator rights it asks
+    for in groups and channels (getMyDefaultAdministratorRights). Handlers receive the registry through the
+    dispatcher's workflow data (`bot_info`) and read these values without any Telegram API call.
+    """
+
+    def __init__(self, bot: Bot, refresh_interval: float = 3600):
+        """
+        Parameters:
+            bot (Bot): Bot used to query the Telegram API.
+            refresh_interval (float): Seconds between background refreshes.
+        """
+        self.bot = bot
+        self.refresh_interval = refresh_interval
+        self.me: User | None = None
+        self.commands: list[BotCommand] = []
+        self.group_admin_rights: ChatAdministratorRights | None = None
+        self.channel_admin_rights: ChatAdministratorRights | None = None
+        self.refreshed_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def username(self) -> str | None:
+        """
+        The bot's @username without the @, or None before the first successful refresh.
+        """
+        return self.me.username if self.me else None
+
+    async def get_me(self) -> User:
+        """
+        Return the cached bot identity, fetching it only if no refresh has succeeded yet.
+        """
+        if self.me is None:
+            self.me = await self.bot.get_me()
+        return self.me
+
+    async def refresh(self) -> bool:
+        """
+        Fetch every cached fact concurrently from the Telegram API.
+
+        A fact whose request fails keeps its previous value, so a temporary API error never empties the registry.
+
+        Returns:
+            bool: True if every request succeeded, False otherwise.
+        """
+        me, commands, group_rights, channel_rights = await asyncio.gather(
+            self.bot.get_me(),
+            self.bot.get_my_commands(),
+            self.bot.get_my_default_administrator_rights(for_channels=False),
+            self.bot.get_my_default_administrator_rights(for_channels=True),
+            return_exceptions=True
+        )
+        results = {"me": me, "commands": commands, "group_admin_rights": group_rights, "channel_admin_rights": channel_rights}
+        failed = []
+        for name, result in results.items():
+            if isinstance(result, BaseException):
+                failed.append(name)
+                logger.error(f"Failed to refresh bot {name}: {result!r}")
+            else:
+                setattr(self, name, result)
+        if failed:
+            return False
+        self.refreshed_at = time.monotonic()
+        logger.debug("Refreshed bot info for @%s", self.username)
+        return True
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.error("Unexpected error while refreshing bot info", exc_info=True)
+
+    def start(self) -> None:
+        """
+        Start refreshing the registry every `refresh_interval` seconds in the background.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_periodically(), name="bot-info-refresh")
+
+    async def stop(self) -> None:
+        """
+        Stop the background refresh task.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
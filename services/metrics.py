@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+from aiohttp import web
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from utils.logging import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+handler_seconds = metrics.histogram(
+    "bot_handler_seconds",
+    "Time from an update's turn to the end of its handler (filters, handler, its queries and API calls)",
+    ("router", "handler", "result")
+)
+api_request_seconds = metrics.histogram(
+    "bot_api_request_seconds",
+    "Bot API request latency per attempt, after outbound pacing",
+    ("method", "result")
+)
+
+# Key of the per-update slot the handler probe writes the matched handler into
+_HANDLER_SLOT = "metrics_handler"
+
+
+@lru_cache(maxsize=None)
+def _handler_labels(callback: Callable[..., Any]) -> tuple[str, str]:
+    # Each router lives in its own module under routers/, named like the module
+    return callback.__module__.rsplit(".", 1)[-1], getattr(callback, "__name__", repr(callback))
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Dispatcher outer middleware timing every update into `bot_handler_seconds`, labelled with the router and
+    handler that took it ("unhandled" when none did) and whether it raised.
+
+    The outer middleware only sees the update; the handler is reported back by an inner middleware installed on
+    every event observer of the dispatcher (inner middlewares of the dispatcher run for the handlers of all
+    included routers). Installed after UserOrderMiddleware, the time excludes the wait for the user's turn.
+    """
+
+    def install(self, dispatcher: Dispatcher) -> None:
+        """
+        Register the outer update middleware and the handler probe on `dispatcher`.
+        """
+        dispatcher.update.outer_middleware(self)
+        for name, observer in dispatcher.observers.items():
+            if name not in ("update", "error"):
+                observer.middleware(self._probe)
+
+    @staticmethod
+    async def _probe(
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        slot = data.get(_HANDLER_SLOT)
+        if slot is not None:
+            slot[0] = data["handler"].callback
+        return await handler(event, data)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        slot: list = [None]
+        data[_HANDLER_SLOT] = slot
+        result = "ok"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            result = "error"
+            raise
+        finally:
+            router, name = ("", "unhandled") if slot[0] is None else _handler_labels(slot[0])
+            handler_seconds.observe((router, name, result), time.perf_counter() - started)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware timing every Bot API request into `bot_api_request_seconds` by method.
+
+    Registered after OutboundMiddleware it runs inside the outbound scheduler, so it times each attempt sent to
+    Telegram (flood-control retries included) and not the time a request waited for its turn.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        result = "ok"
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            result = "error"
+            raise
+        finally:
+            api_request_seconds.observe((method.__api_method__, result), time.perf_counter() - started)
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    """
+    aiohttp handler serving the metrics in the Prometheus text format.
+    """
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+
+def worker_metrics_file(path: str, index: int) -> str:
+    """
+    Return the metrics file of worker `index` for the METRICS_FILE `path`: `name.prom` becomes `name-worker<index>.prom`.
+    """
+    file = Path(path)
+    return str(file.with_name(f"{file.stem}-worker{index}{file.suffix}"))
+
+
+class MetricsFileWriter:
+    """
+    Write the metrics to a file every `interval` seconds, e.g. for node_exporter's textfile collector.
+
+    The file is replaced atomically (written next to it, then renamed), so readers never see half of it.
+    """
+
+    def __init__(self, path: str, interval: float = 15.0):
+        """
+        Parameters:
+            path (str): File the metrics are written to.
+            interval (float): Seconds between two writes.
+        """
+        self.path = path
+        self.interval = max(0.1, interval)
+        self._task: asyncio.Task | None = None
+
+    def write(self) -> None:
+        """
+        Write the current metrics to the file now.
+        """
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(metrics.render())
+        os.replace(temporary, self.path)
+
+    async def _write_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError:
+                logger.error(f"Failed to write metrics to {self.path}", exc_info=True)
+
+    def start(self) -> None:
+        """
+        Start writing the file in the background.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write_periodically(), name="metrics-file")
+
+    async def stop(self) -> None:
+        """
+        Stop the background task and write the file one last time.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            self.write()
+        except OSError:
+            logger.error(f"Failed to write metrics to {self.path}", exc_info=True)
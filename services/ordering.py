@@ -0,0 +1,179 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+
+class _Turn:
+    """
+    One place in a user's line: a single update, or consecutive messages of one album, which run together.
+    """
+
+    __slots__ = ("group", "prev", "done", "members")
+
+    def __init__(self, group: str | None, prev: asyncio.Future | None, done: asyncio.Future):
+        self.group = group
+        # Resolves when every earlier update of the user finished
+        self.prev = prev
+        self.done = done
+        self.members = 1
+
+
+class _Line:
+    __slots__ = ("last", "depth")
+
+    def __init__(self):
+        self.last: _Turn | None = None
+        # Updates of the user waiting or running
+        self.depth = 0
+
+
+class UserOrderMiddleware(BaseMiddleware):
+    """
+    Outer update middleware running each user's updates one after another, in arrival order, while updates of
+    different users run in parallel.
+
+    Every user with pending updates has a line of turns; an update starts when the turns before it finished, so
+    handlers of one user never interleave (FSM transitions, session counters, replies keep their order). Messages
+    of one forwarded album are a single turn: they start together once everything before the album finished,
+    because the handler of the first message waits for the others (see add_track.collect_album), and later
+    updates wait for the whole album. Updates without a user or chat are not ordered. Lines are dropped as soon
+    as they are empty, so memory follows the number of users with pending updates.
+
+    With `max_running`, at most that many handlers run at the same time. A slot is only taken once an update's
+    turn came, so one user's queued updates never hold slots other users could use.
+
+    Must be registered on `dp.update.outer_middleware`, and updates must be fed in arrival order (polling,
+    webhook and supervisor workers all start one task per update in that order): an update's turn is taken
+    when the middleware is entered.
+    """
+
+    def __init__(self, max_running: int | None = None):
+        """
+        Parameters:
+            max_running (int | None): Max updates handled at the same time; None for no limit.
+        """
+        self.max_running = max_running
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+        self._lines: dict[Hashable, _Line] = {}
+        self.running = 0
+        self.waiting = 0
+        self.max_depth = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @staticmethod
+    def _key(data: Dict[str, Any]) -> Hashable | None:
+        user = data.get("event_from_user")
+        if user is not None:
+            return user.id
+        chat = data.get("event_chat")
+        return None if chat is None else chat.id
+
+    def _take_turn(self, key: Hashable, event: TelegramObject) -> tuple[_Line, _Turn]:
+        group = None
+        if isinstance(event, Update):
+            group = getattr(event.event, "media_group_id", None)
+        line = self._lines.get(key)
+        if line is None:
+            line = self._lines[key] = _Line()
+        turn = line.last
+        if turn is not None and group is not None and turn.group == group and not turn.done.done():
+            turn.members += 1
+        else:
+            turn = _Turn(group, turn.done if turn is not None else None, asyncio.get_running_loop().create_future())
+            line.last = turn
+        line.depth += 1
+        self.max_depth = max(self.max_depth, line.depth)
+        return line, turn
+
+    def _leave(self, key: Hashable, line: _Line, turn: _Turn) -> None:
+        line.depth -= 1
+        turn.members -= 1
+        if turn.members:
+            return
+        if turn.prev is not None and not turn.prev.done():
+            # Left before its turn came (cancelled): successors still wait for the updates before it
+            turn.prev.add_done_callback(lambda _: self._finish(key, line, turn))
+        else:
+            self._finish(key, line, turn)
+
+    def _finish(self, key: Hashable, line: _Line, turn: _Turn) -> None:
+        if not turn.done.done():
+            turn.done.set_result(None)
+        if line.last is turn and self._lines.get(key) is line:
+            del self._lines[key]
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # A semaphore is bound to one event loop; benchmarks run the same dispatcher in several loops
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_running)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not self.max_running:
+            self.running += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.running -= 1
+        async with self._get_slots():
+            self.running += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.running -= 1
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        key = self._key(data)
+        if key is None:
+            return await self._run(handler, event, data)
+        line, turn = self._take_turn(key, event)
+        try:
+            if turn.prev is not None and not turn.prev.done():
+                self.waiting += 1
+                started = time.monotonic()
+                try:
+                    # asyncio.wait, unlike awaiting the future, does not cancel it if this update is cancelled
+                    await asyncio.wait([turn.prev])
+                finally:
+                    self.waiting -= 1
+                    waited = time.monotonic() - started
+                    self.waited += 1
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+            return await self._run(handler, event, data)
+        finally:
+            self._leave(key, line, turn)
+
+    def depth(self, key: Hashable) -> int:
+        """
+        Return how many updates of `key` (a user or chat id) are waiting or running.
+        """
+        line = self._lines.get(key)
+        return 0 if line is None else line.depth
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return users with pending updates, updates running and waiting for their turn, the deepest line seen,
+        and how long updates waited for their turn.
+        """
+        return {
+            "users": len(self._lines),
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_depth": self.max_depth,
+            "waited": self.waited,
+            "wait_avg_ms": self.wait_total / self.waited * 1000 if self.waited else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+        }
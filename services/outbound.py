@@ -0,0 +1,343 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod, SendMediaGroup, SendAudio
+from aiogram.methods.base import TelegramType
+from config import app_config
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Send priority, lower values are sent first within a chat and across chats.
+    """
+    INTERACTIVE = 0
+    BULK = 10
+
+
+# Requests that stream playlist content; everything else is a reply the user is waiting for
+BULK_METHODS = (SendMediaGroup, SendAudio)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and gains `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float = 1, now: float | None = None) -> float:
+        """
+        Return how many seconds to wait until `cost` tokens are available (0 if they are available now).
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def consume(self, cost: float = 1, now: float | None = None) -> None:
+        """
+        Take `cost` tokens; the balance may go negative, which delays the following sends.
+        """
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= cost
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass(order=True)
+class OutboundJob:
+    priority: int
+    seq: int
+    chat_id: Hashable = field(compare=False)
+    call: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    cost: float = field(compare=False, default=1)
+    retries: int = field(compare=False, default=0)
+
+
+class ChatLane:
+    """
+    Pending jobs of one chat (a heap ordered by priority, then submission order) and the chat's rate limit state.
+    """
+    __slots__ = ("jobs", "bucket", "paused_until", "scheduled")
+
+    def __init__(self, bucket: TokenBucket):
+        self.jobs: list[OutboundJob] = []
+        self.bucket = bucket
+        self.paused_until = 0.0
+        # True while the lane waits in the ready queue / on a timer or while one of its jobs is being sent
+        self.scheduled = False
+
+
+class OutboundScheduler:
+    """
+    Central scheduler for outgoing Telegram requests with per-chat and global rate limits.
+
+    Every chat has a token bucket (Telegram allows about one message per second per chat, with short bursts)
+    and all chats share a global bucket (about 30 messages per second). A chat's jobs are sent one at a time in
+    priority order, so interactive replies overtake queued bulk media while the order within a priority is kept.
+    A TelegramRetryAfter pauses the chat for `retry_after` seconds and the job is retried, up to `max_retries`.
+
+    Workers are started lazily on the running event loop; call `stop()` on shutdown.
+    """
+
+    def __init__(
+        self,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3,
+        global_rate: float = 30.0,
+        global_burst: float = 30,
+        workers: int = 8,
+        max_retries: int = 5
+    ):
+        """
+        Parameters:
+            chat_rate (float): Requests per second allowed per chat.
+            chat_burst (float): Requests a chat may send back-to-back after being idle.
+            global_rate (float): Requests per second allowed across all chats.
+            global_burst (float): Requests that may be sent back-to-back across all chats.
+            workers (int): Requests in flight at the same time.
+            max_retries (int): Retries after TelegramRetryAfter before the error is returned to the caller.
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self._lanes: dict[Hashable, ChatLane] = {}
+        self._prune_at = 1024
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ready: asyncio.PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.queued = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or the previous loop is gone (asyncio.run called again): start over on this loop
+            self._loop = loop
+            self._ready = asyncio.PriorityQueue()
+            self._lanes.clear()
+            self.queued = 0
+            self._tasks = [loop.create_task(self._worker(), name=f"outbound-{n}") for n in range(self.workers)]
+        return loop
+
+    def submit(
+        self,
+        chat_id: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.INTERACTIVE,
+        cost: float = 1
+    ) -> asyncio.Future:
+        """
+        Queue `call` to be sent to `chat_id` and return a future for its result.
+
+        Parameters:
+            chat_id (Hashable): Target chat, used for the per-chat rate limit and ordering.
+            call (Callable[[], Awaitable]): Performs the request; called once per attempt.
+            priority (Priority): Lower values are sent first.
+            cost (float): Tokens the request takes from the chat and global buckets.
+
+        Returns:
+            asyncio.Future: Resolves to the result of `call()` or to its exception.
+        """
+        loop = self._ensure_started()
+        job = OutboundJob(int(priority), next(self._seq), chat_id, call, loop.create_future(), cost)
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            if len(self._lanes) >= self._prune_at:
+                self._prune()
+            lane = self._lanes[chat_id] = ChatLane(TokenBucket(self.chat_rate, self.chat_burst))
+        heapq.heappush(lane.jobs, job)
+        self.queued += 1
+        if not lane.scheduled:
+            self._schedule(chat_id, lane)
+        return job.future
+
+    async def send(
+        self,
+        chat_id: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.INTERACTIVE,
+        cost: float = 1
+    ) -> Any:
+        """
+        Queue `call` like `submit` and wait for its result.
+        """
+        return await self.submit(chat_id, call, priority, cost)
+
+    def _schedule(self, chat_id: Hashable, lane: ChatLane) -> None:
+        """
+        Put the lane into the ready queue as soon as its chat may send its head job.
+        """
+        lane.scheduled = True
+        head = lane.jobs[0]
+        now = time.monotonic()
+        wait = max(lane.bucket.delay(head.cost, now), lane.paused_until - now)
+        entry = (head.priority, head.seq, chat_id)
+        if wait > 0:
+            self._loop.call_later(wait, self._ready.put_nowait, entry)
+        else:
+            self._ready.put_nowait(entry)
+
+    def _prune(self) -> None:
+        """
+        Forget idle chats whose state equals a fresh lane (bucket refilled, no pause), keeping memory bounded.
+        """
+        now = time.monotonic()
+        for chat_id in [
+            chat_id for chat_id, lane in self._lanes.items()
+            if not lane.scheduled and not lane.jobs and lane.paused_until <= now and lane.bucket.is_full(now)
+        ]:
+            del self._lanes[chat_id]
+        self._prune_at = max(1024, 2 * len(self._lanes))
+
+    async def _wait_global(self) -> None:
+        while (wait := self.global_bucket.delay()) > 0:
+            await asyncio.sleep(wait)
+
+    async def _worker(self) -> None:
+        while True:
+            # Pick a job only once the global limit allows a send, so the most urgent ready job at that moment wins
+            await self._wait_global()
+            entry = await self._ready.get()
+            if self.global_bucket.delay() > 0:
+                # Another worker used the capacity while this one waited for a job; give the job back
+                self._ready.put_nowait(entry)
+                continue
+            chat_id = entry[2]
+            lane = self._lanes[chat_id]
+            job = heapq.heappop(lane.jobs)
+            self.queued -= 1
+            try:
+                if not job.future.done():
+                    await self._send(lane, job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception:
+                logger.error(f"Unexpected error while sending to chat {chat_id}", exc_info=True)
+            finally:
+                lane.scheduled = False
+                if lane.jobs:
+                    self._schedule(chat_id, lane)
+
+    async def _send(self, lane: ChatLane, job: OutboundJob) -> None:
+        self.global_bucket.consume(job.cost)
+        lane.bucket.consume(job.cost)
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            lane.paused_until = time.monotonic() + e.retry_after
+            job.retries += 1
+            self.retries += 1
+            if job.retries > self.max_retries:
+                logger.error(f"Giving up on request to chat {job.chat_id} after {self.max_retries} flood waits")
+                self.failed += 1
+                job.future.set_exception(e)
+                return
+            logger.warning(f"Flood control in chat {job.chat_id}, pausing it for {e.retry_after}s (attempt {job.retries})")
+            heapq.heappush(lane.jobs, job)
+            self.queued += 1
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return queue depth (total and per priority), number of tracked/paused chats and send counters.
+        """
+        now = time.monotonic()
+        by_priority = {priority.name.lower(): 0 for priority in Priority}
+        for lane in self._lanes.values():
+            for job in lane.jobs:
+                by_priority[Priority(job.priority).name.lower()] += 1
+        return {
+            "queued": self.queued,
+            **{f"queued_{name}": count for name, count in by_priority.items()},
+            "chats": len(self._lanes),
+            "paused_chats": sum(lane.paused_until > now for lane in self._lanes.values()),
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and cancel every request still queued.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for lane in self._lanes.values():
+            for job in lane.jobs:
+                job.future.cancel()
+            lane.jobs.clear()
+        self._lanes.clear()
+        self.queued = 0
+        self._loop = None
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that routes every chat-bound API request through an OutboundScheduler.
+
+    Requests without a `chat_id` (getUpdates, answerCallbackQuery, getMe, ...) are sent directly. Media streaming
+    methods (BULK_METHODS) get Priority.BULK, everything else Priority.INTERACTIVE.
+    """
+
+    def __init__(self, scheduler: OutboundScheduler):
+        self.scheduler = scheduler
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        priority = Priority.BULK if isinstance(method, BULK_METHODS) else Priority.INTERACTIVE
+        return await self.scheduler.send(chat_id, partial(make_request, bot, method), priority)
+
+
+outbound = OutboundScheduler(
+    chat_rate=app_config.OUTBOUND_CHAT_RATE,
+    chat_burst=app_config.OUTBOUND_CHAT_BURST,
+    global_rate=app_config.OUTBOUND_GLOBAL_RATE,
+    global_burst=app_config.OUTBOUND_GLOBAL_BURST,
+    workers=app_config.OUTBOUND_WORKERS,
+    max_retries=app_config.OUTBOUND_MAX_RETRIES
+)
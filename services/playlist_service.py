@@ -1,32 +1,87 @@
 import sqlite3
+from dataclasses import dataclass
 from utils.logging import get_logger
-from database.db import sqlite_db_path
-from os.path import join as path_join
+from utils.cache import LRUCache
+from config import app_config
+from database.executor import db_read, db_write
 
 logger = get_logger(__name__)
 
-def add_user(telegram_id:int) -> None :
+# Every function below receives a pooled `conn` from @db_read/@db_write and is called without it:
+# `await get_tracks(playlist_name, user_id)` runs the query on the database executor, off the event loop.
+
+user_id_cache = LRUCache(max_size=app_config.USER_ID_CACHE_SIZE, ttl=app_config.USER_ID_CACHE_TTL)
+# user_id -> {playlist name: playlist id}, entries are dropped by invalidate_playlist_ids on create/rename/delete
+playlist_id_cache = LRUCache(max_size=app_config.PLAYLIST_ID_CACHE_USERS)
+_playlist_mutations = 0
+# Distance between the positions of consecutive tracks; leaves room to move a track between two others
+TRACK_POSITION_GAP = 1024
+
+@dataclass
+class PlaylistPage:
     """
-    Add a user record for the given Telegram ID.
+    One page of a playlist's tracks in playlist order, and where the next page starts.
+    """
+    id: int
+    name: str
+    cover_file_id: str | None
+    tracks: list[str]
+    # Stored position of the last track on the page; the next page is the tracks after it
+    last_position: int | None
+    has_more: bool
+    # Number of tracks in the playlist, only counted when asked for (first page)
+    track_count: int | None = None
+
+@db_write
+def insert_user(conn, telegram_id:int) -> int | None :
+    """
+    Add a user record for the given Telegram ID and return its internal database id.
     
-    If a user with the same Telegram ID already exists, the operation is a no-op (uses INSERT OR IGNORE).
-    Errors are logged and not propagated.
+    If a user with the same Telegram ID already exists, the insert is a no-op (uses INSERT OR IGNORE) and the
+    existing id is returned. Errors are logged and not propagated.
     
     Parameters:
         telegram_id (int): Telegram user's numeric ID.
+    
+    Returns:
+        int | None: The user's database id, or None if a database error occurred.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("INSERT OR IGNORE INTO users (telegram_id) VALUES (?)", (telegram_id,))
+        cur= conn.cursor()
+        cur.execute("INSERT OR IGNORE INTO users (telegram_id) VALUES (?)", (telegram_id,))
+        cur.execute("SELECT id FROM users WHERE telegram_id=?", (telegram_id,))
+        res = cur.fetchone()
     except sqlite3.Error:
         logger.error(f"Failed to add {telegram_id} to users table",exc_info=True)
+        return None
     else:
-        logger.debug(f"{telegram_id} user added successfully")
+        logger.debug("%s user added successfully", telegram_id)
+        return res[0] if res else None
 
-def get_user_id(telegram_id):
+async def add_user(telegram_id:int) -> int | None :
     """
-    Return the internal database user ID for a given Telegram ID.
+    Make sure a user record exists for the given Telegram ID and cache its internal id.
+    
+    Returning users already in `user_id_cache` cost no database query at all.
+    
+    Parameters:
+        telegram_id (int): Telegram user's numeric ID.
+    
+    Returns:
+        int | None: The user's database id, or None if a database error occurred.
+    """
+    user_id = user_id_cache.get(telegram_id)
+    if user_id is not None:
+        return user_id
+    user_id = await insert_user(telegram_id)
+    if user_id is not None:
+        user_id_cache.set(telegram_id, user_id)
+    return user_id
+
+@db_read
+def lookup_user_id(conn, telegram_id):
+    """
+    Return the internal database user ID for a given Telegram ID, always querying the database.
     
     Queries the users table for a row with the provided Telegram ID and returns its database id.
     
@@ -37,20 +92,41 @@ def get_user_id(telegram_id):
         int | None: The user's database id if found; None if no matching user exists or a database error occurs.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT id FROM users WHERE telegram_id=?", (telegram_id,))
-            res = cur.fetchone()
+        cur= conn.cursor()
+        cur.execute("SELECT id FROM users WHERE telegram_id=?", (telegram_id,))
+        res = cur.fetchone()
     except sqlite3.Error:
         logger.error(f"Failed to get id of user with Telegram ID = {telegram_id}")
         return None
     else:
-        logger.debug(f"Successfully get id of user with Telegram ID = {telegram_id}")
+        logger.debug("Successfully get id of user with Telegram ID = %s", telegram_id)
         return res[0] if res else None
 
-def create_playlist(user_id, name):
+async def get_user_id(telegram_id):
     """
-    Create a new playlist for the given user.
+    Return the internal database user ID for a given Telegram ID.
+    
+    The mapping never changes once a user exists, so it is served from `user_id_cache` when possible and only
+    looked up in the database (then cached) on a miss. Unknown users are not cached.
+    
+    Parameters:
+        telegram_id (int): Telegram user identifier to look up.
+    
+    Returns:
+        int | None: The user's database id if found; None if no matching user exists or a database error occurs.
+    """
+    user_id = user_id_cache.get(telegram_id)
+    if user_id is not None:
+        return user_id
+    user_id = await lookup_user_id(telegram_id)
+    if user_id is not None:
+        user_id_cache.set(telegram_id, user_id)
+    return user_id
+
+@db_write
+def insert_playlist(conn, user_id, name):
+    """
+    Insert a new playlist row for the given user.
     
     Parameters:
         user_id (int): Internal user ID owning the playlist.
@@ -62,11 +138,10 @@ def create_playlist(user_id, name):
         None if a database error occurred while creating the playlist.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("INSERT INTO playlists (user_id, name) VALUES (?, ?)", (user_id, name))
+        cur= conn.cursor()
+        cur.execute("INSERT INTO playlists (user_id, name) VALUES (?, ?)", (user_id, name))
     except sqlite3.IntegrityError:
-        logger.debug(f"{name} playlist already exists for user_id = {user_id}")
+        logger.debug("%s playlist already exists for user_id = %s", name, user_id)
         return False
     except sqlite3.Error:
         logger.error(f"Failed to create a {name} playlist for user_id = {user_id}",exc_info=True)
@@ -74,42 +149,135 @@ def create_playlist(user_id, name):
     else:
         return True
 
-def add_track(playlist_name, user_id, file_id):
+async def create_playlist(user_id, name):
+    """
+    Create a new playlist for the given user and drop any cached entry for its name.
+    
+    Parameters:
+        user_id (int): Internal user ID owning the playlist.
+        name (str): Playlist name to create.
+    
+    Returns:
+        True if the playlist was created.
+        False if a playlist with the same name already exists for that user.
+        None if a database error occurred while creating the playlist.
+    """
+    result = await insert_playlist(user_id, name)
+    invalidate_playlist_ids(user_id, name)
+    return result
+
+@db_write
+def insert_track(conn, playlist_id, file_id):
+    """
+    Insert a track (by file_id) at the end of the playlist with the given id.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value identifying the playlist.
+        file_id (str): File identifier for the track (e.g., Telegram file_id).
+    
+    Returns:
+        bool | None: True if the track was added, False if the track already exists (integrity constraint),
+                     or None if a database error occurred.
+    """
+    try:
+        cur= conn.cursor()
+        cur.execute("""
+            INSERT INTO tracks (playlist_id, file_id, position)
+            VALUES (?, ?, (SELECT COALESCE(MAX(position), 0) + ? FROM tracks WHERE playlist_id=?))
+        """, (playlist_id, file_id, TRACK_POSITION_GAP, playlist_id))
+    except sqlite3.IntegrityError:
+        logger.info(f"Track with file_id={file_id} already exists in playlist_id={playlist_id}")
+        return False
+    except sqlite3.Error:
+        logger.error(f"Failed to add track with file_id = {file_id} to playlist_id = {playlist_id}",exc_info=True)
+        return None
+    else:
+        logger.debug("Successfully add track with file_id = %s to playlist_id = %s", file_id, playlist_id)
+        return True
+
+async def add_track(playlist_name, user_id, file_id, playlist_id=None):
     """
     Add a track (by file_id) to the named playlist for a specific user.
     
-    Looks up the playlist ID for the given user and playlist name, then inserts a new track record.
+    Resolves the playlist ID for the given user and playlist name (through the playlist id cache) unless the
+    caller already knows it, then inserts a new track record.
     Parameters:
         playlist_name (str): Playlist name scoped to the provided user_id.
         user_id (int): Internal user identifier.
         file_id (str): File identifier for the track (e.g., Telegram file_id).
+        playlist_id (int | None): Already resolved id of the playlist, skips the lookup when given.
     
     Returns:
         bool | None: True if the track was added, False if the track already exists (integrity constraint),
                      or None if a database error occurred.
     """
-    playlist_id = get_playlist_id_by_name(user_id,playlist_name)
+    if playlist_id is None:
+        playlist_id = await get_playlist_id_by_name(user_id,playlist_name)
     if playlist_id is None:
         logger.error(f"DB error resolving playlist_id for user_id={user_id}, name='{playlist_name}'")
         return None
     if playlist_id is False:
         logger.warning(f"Playlist '{playlist_name}' not found for user_id={user_id}")
         return False
+    return await insert_track(playlist_id, file_id)
+
+@db_write
+def insert_tracks(conn, playlist_id, file_ids):
+    """
+    Append several tracks to the playlist with the given id in one transaction.
+    
+    Rows are inserted with a single executemany in the given order; file ids already in the playlist (or repeated
+    in `file_ids`) are skipped.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value identifying the playlist.
+        file_ids (list[str]): File identifiers of the tracks, in the order they should be appended.
+    
+    Returns:
+        tuple[int, int] | None: Number of added tracks and number of skipped duplicates, or None if a database
+                                error occurred (nothing is inserted then).
+    """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("INSERT INTO tracks (playlist_id, file_id) VALUES (?, ?)", (playlist_id, file_id))
-    except sqlite3.IntegrityError:
-        logger.info(f"Track with file_id={file_id} already exists for {playlist_name} playlist for user_id={user_id}")
-        return False
+        changes_before = conn.total_changes
+        cur= conn.cursor()
+        cur.executemany("""
+            INSERT OR IGNORE INTO tracks (playlist_id, file_id, position)
+            VALUES (?, ?, (SELECT COALESCE(MAX(position), 0) + ? FROM tracks WHERE playlist_id=?))
+        """, ((playlist_id, file_id, TRACK_POSITION_GAP, playlist_id) for file_id in file_ids))
+        added = conn.total_changes - changes_before
     except sqlite3.Error:
-        logger.error(f"Failed to add track with file_id = {file_id} to playlist {playlist_name} for user_id = {user_id}",exc_info=True)
+        logger.error(f"Failed to add {len(file_ids)} tracks to playlist_id = {playlist_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully add track with file_id = {file_id} to playlist {playlist_name} for user_id = {user_id}")
-        return True
+        logger.debug("Successfully add %s of %s tracks to playlist_id = %s", added, len(file_ids), playlist_id)
+        return added, len(file_ids) - added
+
+async def add_tracks(playlist_name, user_id, file_ids, playlist_id=None):
+    """
+    Add several tracks (by file_id) to the named playlist for a specific user in one transaction.
+    
+    Parameters:
+        playlist_name (str): Playlist name scoped to the provided user_id.
+        user_id (int): Internal user identifier.
+        file_ids (list[str]): File identifiers of the tracks, in the order they should be appended.
+        playlist_id (int | None): Already resolved id of the playlist, skips the lookup when given.
+    
+    Returns:
+        tuple[int, int] | None | False: Number of added tracks and number of skipped duplicates, False if the
+                                        playlist does not exist, or None if a database error occurred.
+    """
+    if playlist_id is None:
+        playlist_id = await get_playlist_id_by_name(user_id,playlist_name)
+    if playlist_id is None:
+        logger.error(f"DB error resolving playlist_id for user_id={user_id}, name='{playlist_name}'")
+        return None
+    if playlist_id is False:
+        logger.warning(f"Playlist '{playlist_name}' not found for user_id={user_id}")
+        return False
+    return await insert_tracks(playlist_id, list(file_ids))
 
-def get_playlists(user_id):
+@db_read
+def get_playlists(conn, user_id):
     """
     Return the list of playlist names for the given internal user ID.
     
@@ -120,22 +288,23 @@ def get_playlists(user_id):
         list[str] | None: List of playlist names on success, or None if a database error occurs.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT name FROM playlists WHERE user_id=?", (user_id,))
+        cur= conn.cursor()
+        cur.execute("SELECT name FROM playlists WHERE user_id=?", (user_id,))
+        playlists = [row[0] for row in cur.fetchall()]
     except sqlite3.Error:
         logger.error(f"Failed to get playlists for user_id = {user_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get playlists for user_id = {user_id}")
-        return [row[0] for row in cur.fetchall()]
+        logger.debug("Successfully get playlists for user_id = %s", user_id)
+        return playlists
 
-def get_tracks(playlist_name, user_id):
+@db_read
+def get_tracks(conn, playlist_name, user_id):
     """
     Return the list of track file IDs for a user's playlist.
     
-    Retrieves all `file_id` values for tracks in the playlist with the exact name `playlist_name`
-    that belongs to the user identified by `user_id`. Returns None if a database error occurs.
+    Retrieves all `file_id` values, in playlist order, for tracks in the playlist with the exact name
+    `playlist_name` that belongs to the user identified by `user_id`. Returns None if a database error occurs.
     
     Parameters:
         playlist_name (str): Exact name of the playlist to query.
@@ -145,23 +314,25 @@ def get_tracks(playlist_name, user_id):
         list[str] | None: List of track `file_id` strings on success, or None on error.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("""
-                SELECT t.file_id FROM tracks t
-                JOIN playlists p ON p.id = t.playlist_id
-                WHERE p.name=? AND p.user_id=?
-            """, (playlist_name, user_id))
+        cur= conn.cursor()
+        cur.execute("""
+            SELECT t.file_id FROM tracks t
+            JOIN playlists p ON p.id = t.playlist_id
+            WHERE p.name=? AND p.user_id=?
+            ORDER BY t.position
+        """, (playlist_name, user_id))
+        tracks = [row[0] for row in cur.fetchall()]
     except sqlite3.Error:
         logger.error(f"Failed to get tracks from {playlist_name} playlist for user_id = {user_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get tracks from {playlist_name} playlist for user_id = {user_id}")
-        return [row[0] for row in cur.fetchall()]
+        logger.debug("Successfully get tracks from %s playlist for user_id = %s", playlist_name, user_id)
+        return tracks
 
-def get_playlist_id_by_name(user_id, name):
+@db_read
+def lookup_playlist_id(conn, user_id, name):
     """
-    Return the playlist ID for a given user and playlist name.
+    Return the playlist ID for a given user and playlist name, always querying the database.
     
     Parameters:
         user_id (int): Internal user ID.
@@ -173,18 +344,63 @@ def get_playlist_id_by_name(user_id, name):
         None: If a database error occurs.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT id FROM playlists WHERE user_id=? AND name=?", (user_id, name))
-            res = cur.fetchone()
+        cur= conn.cursor()
+        cur.execute("SELECT id FROM playlists WHERE user_id=? AND name=?", (user_id, name))
+        res = cur.fetchone()
     except sqlite3.Error:
         logger.error(f"Failed to get playlist ID for {name} playlist from user_id = {user_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get playlist ID for {name} playlist from user_id = {user_id}")
+        logger.debug("Successfully get playlist ID for %s playlist from user_id = %s", name, user_id)
         return res[0] if res else False
+
+async def get_playlist_id_by_name(user_id, name):
+    """
+    Return the playlist ID for a given user and playlist name.
+    
+    Served from the per-user `playlist_id_cache` when possible. On a miss the id is looked up in the database and
+    cached, unless a playlist mutation finished while the lookup was running (the result may already be stale).
+    Missing playlists are not cached.
+    
+    Parameters:
+        user_id (int): Internal user ID.
+        name (str): Playlist name.
     
-def get_playlist_name_by_id(playlist_id:int):
+    Returns:
+        int: The playlist ID if found.
+        False: If no playlist with the given name exists for the user.
+        None: If a database error occurs.
+    """
+    global _playlist_mutations
+    cached = playlist_id_cache.get(user_id)
+    if cached is not None and name in cached:
+        return cached[name]
+    mutations_before = _playlist_mutations
+    playlist_id = await lookup_playlist_id(user_id, name)
+    if playlist_id and mutations_before == _playlist_mutations:
+        ids = playlist_id_cache.get(user_id)
+        if ids is None:
+            ids = {}
+            playlist_id_cache.set(user_id, ids)
+        ids[name] = playlist_id
+    return playlist_id
+
+def invalidate_playlist_ids(user_id, *names):
+    """
+    Drop cached playlist ids of `names` for the given user after a create/rename/delete.
+    
+    Also marks a playlist mutation so lookups that started before it do not cache their (possibly stale) result.
+    """
+    global _playlist_mutations
+    _playlist_mutations += 1
+    cached = playlist_id_cache.get(user_id)
+    if cached is None:
+        return
+    for name in names:
+        cached.pop(name, None)
+    
+@db_read
+def get_playlist_name_by_id(conn, playlist_id:int):
     """
     Return the playlist's name for a given playlist primary key id.
     
@@ -197,22 +413,22 @@ def get_playlist_name_by_id(playlist_id:int):
         None: If a database error occurs while querying.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT name FROM playlists WHERE id=?", (playlist_id,))
-            res = cur.fetchone()
+        cur= conn.cursor()
+        cur.execute("SELECT name FROM playlists WHERE id=?", (playlist_id,))
+        res = cur.fetchone()
     except sqlite3.Error:
         logger.error(f"Failed to get playlist Name for id={playlist_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get playlist Name for id={playlist_id}")
+        logger.debug("Successfully get playlist Name for id=%s", playlist_id)
         return res[0] if res else False
 
-def get_tracks_by_playlist_id(playlist_id):
+@db_read
+def get_tracks_by_playlist_id(conn, playlist_id):
     """
     Return a list of track file IDs for the given playlist ID.
     
-    Retrieves all `file_id` values from the `tracks` table for the playlist with the provided `playlist_id`.
+    Retrieves all `file_id` values from the `tracks` table, in playlist order, for the playlist with the provided `playlist_id`.
     Returns an empty list when the playlist has no tracks. Returns `None` if a database error occurs.
     Parameters:
         playlist_id (int): The playlists.id value identifying the playlist.
@@ -221,17 +437,82 @@ def get_tracks_by_playlist_id(playlist_id):
         list[str] | None: List of track file IDs, or None on database error.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT file_id FROM tracks WHERE playlist_id=?", (playlist_id,))
+        cur= conn.cursor()
+        cur.execute("SELECT file_id FROM tracks WHERE playlist_id=? ORDER BY position", (playlist_id,))
+        tracks = [row[0] for row in cur.fetchall()]
     except sqlite3.Error:
         logger.error(f"Failed to get tracks from playlist_id = {playlist_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get tracks from playlist_id = {playlist_id}")
-        return [row[0] for row in cur.fetchall()]
+        logger.debug("Successfully get tracks from playlist_id = %s", playlist_id)
+        return tracks
+
+@db_read
+def get_playlist_page(conn, playlist_id=None, user_id=None, playlist_name=None, after_position=None, limit=10, with_count=False):
+    """
+    Return a playlist and one page of its tracks, using keyset pagination on the track position.
+    
+    The page holds up to `limit` tracks whose position comes after `after_position`, read through the
+    (playlist_id, position, file_id) index, so a page costs the same however large the playlist is and however
+    far into it the page is. The playlist is selected by `playlist_id` (share links, next pages) or by `user_id`
+    and `playlist_name` (the owner's view).
+    
+    Parameters:
+        playlist_id (int | None): The playlists.id value identifying the playlist.
+        user_id (int | None): Internal user ID owning the playlist, used with `playlist_name`.
+        playlist_name (str | None): Exact name of the playlist, used with `user_id`.
+        after_position (int | None): Position of the last track already shown; None for the first page.
+        limit (int): Maximum number of tracks on the page.
+        with_count (bool): Also count the playlist's tracks (an index-only count, meant for the first page).
+    
+    Returns:
+        PlaylistPage: The playlist with the page of tracks (empty past the end or for an empty playlist).
+        False: If no matching playlist exists.
+        None: If a database error occurs.
+    """
+    if playlist_id is not None:
+        where, params = "id=?", (playlist_id,)
+    else:
+        where, params = "user_id=? AND name=?", (user_id, playlist_name)
+    try:
+        cur= conn.cursor()
+        cur.execute(f"SELECT id, name, cover_file_id FROM playlists WHERE {where}", params)
+        playlist = cur.fetchone()
+        if playlist is None:
+            logger.debug("No playlist for playlist_id = %s, user_id = %s, name = %s", playlist_id, user_id, playlist_name)
+            return False
+        if after_position is None:
+            cur.execute(
+                "SELECT position, file_id FROM tracks WHERE playlist_id=? ORDER BY position LIMIT ?",
+                (playlist[0], limit + 1)
+            )
+        else:
+            cur.execute(
+                "SELECT position, file_id FROM tracks WHERE playlist_id=? AND position>? ORDER BY position LIMIT ?",
+                (playlist[0], after_position, limit + 1)
+            )
+        rows = cur.fetchall()
+        track_count = None
+        if with_count:
+            cur.execute("SELECT COUNT(*) FROM tracks WHERE playlist_id=?", (playlist[0],))
+            track_count = cur.fetchone()[0]
+    except sqlite3.Error:
+        logger.error(f"Failed to get playlist page for playlist_id = {playlist_id}, user_id = {user_id}, name = {playlist_name}, after position {after_position}",exc_info=True)
+        return None
+    page = rows[:limit]
+    logger.debug("Successfully get %s tracks of playlist_id = %s after position %s", len(page), playlist[0], after_position)
+    return PlaylistPage(
+        id=playlist[0],
+        name=playlist[1],
+        cover_file_id=playlist[2],
+        tracks=[row[1] for row in page],
+        last_position=page[-1][0] if page else after_position,
+        has_more=len(rows) > limit,
+        track_count=track_count
+    )
 
-def set_cover_image(user_id, playlist_name, file_id):
+@db_write
+def set_cover_image(conn, user_id, playlist_name, file_id):
     """
     Set the cover image for a user's playlist.
     
@@ -246,17 +527,17 @@ def set_cover_image(user_id, playlist_name, file_id):
         bool: True if the update completed successfully, False if a database error occurred.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("UPDATE playlists SET cover_file_id=? WHERE user_id=? AND name=?", (file_id, user_id, playlist_name))
+        cur= conn.cursor()
+        cur.execute("UPDATE playlists SET cover_file_id=? WHERE user_id=? AND name=?", (file_id, user_id, playlist_name))
     except sqlite3.Error:
         logger.error(f"Failed to set cover with file_id = {file_id} in {playlist_name} for user_id = {user_id}",exc_info=True)
         return False
     else:
-        logger.debug(f"Successfully set cover with file_id = {file_id} in {playlist_name} for user_id = {user_id}")
+        logger.debug("Successfully set cover with file_id = %s in %s for user_id = %s", file_id, playlist_name, user_id)
         return True
 
-def get_cover_image_by_playlist_id(playlist_id):
+@db_read
+def get_cover_image_by_playlist_id(conn, playlist_id):
     """
     Return the cover image file_id for a playlist.
     
@@ -269,19 +550,89 @@ def get_cover_image_by_playlist_id(playlist_id):
         str | None: Cover image file_id or None when not found or on error.
     """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT cover_file_id FROM playlists WHERE id=?", (playlist_id,))
-            res = cur.fetchone()
+        cur= conn.cursor()
+        cur.execute("SELECT cover_file_id FROM playlists WHERE id=?", (playlist_id,))
+        res = cur.fetchone()
     except sqlite3.Error:
         logger.error(f"Failed to get cover image file_id for playlist_id = {playlist_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get cover image file_id for playlist_id = {playlist_id}")
+        logger.debug("Successfully get cover image file_id for playlist_id = %s", playlist_id)
         return res[0] if res else None
 
 
-def remove_track_by_index(user_id, playlist_name, index):
+@db_read
+def get_track_positions(conn, playlist_name, user_id):
+    """
+    Return the stored positions of a user's playlist tracks, in playlist order.
+    
+    The position of a track stays the same when other tracks are added or removed, so it identifies the
+    track a user picked from a listing even if the playlist changed in the meantime.
+    
+    Parameters:
+        playlist_name (str): Exact name of the playlist to query.
+        user_id (int): Internal user ID owning the playlist.
+    
+    Returns:
+        list[int] | None: Track positions on success, or None on error.
+    """
+    try:
+        cur= conn.cursor()
+        cur.execute("""
+            SELECT t.position FROM tracks t
+            JOIN playlists p ON p.id = t.playlist_id
+            WHERE p.name=? AND p.user_id=?
+            ORDER BY t.position
+        """, (playlist_name, user_id))
+        positions = [row[0] for row in cur.fetchall()]
+    except sqlite3.Error:
+        logger.error(f"Failed to get track positions from {playlist_name} playlist for user_id = {user_id}",exc_info=True)
+        return None
+    else:
+        logger.debug("Successfully get track positions from %s playlist for user_id = %s", playlist_name, user_id)
+        return positions
+
+@db_write
+def delete_track_at(conn, playlist_id, index, position=None):
+    """
+    Remove a track from the playlist with the given id in a single DELETE statement.
+    
+    When `position` is given the track stored at that position is removed through the (playlist_id, position)
+    index; otherwise the track at the zero-based `index` in playlist order is removed.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value identifying the playlist.
+        index (int): The zero-based index of the track to remove (used for logging when `position` is given).
+        position (int | None): Stored position of the track, as returned by get_track_positions.
+    
+    Returns:
+        bool or None: True if the track was successfully removed, False if the track does not exist, or None on database error.
+    """
+    if position is None and index < 0:
+        # SQLite treats a negative OFFSET as 0, which would remove the first track
+        logger.debug("No track #%s in tracks table for playlist_id = %s", index, playlist_id)
+        return False
+    try:
+        cur= conn.cursor()
+        if position is not None:
+            cur.execute("DELETE FROM tracks WHERE playlist_id=? AND position=?", (playlist_id, position))
+        else:
+            cur.execute("""
+                DELETE FROM tracks WHERE id = (
+                    SELECT id FROM tracks WHERE playlist_id=? ORDER BY position LIMIT 1 OFFSET ?
+                )
+            """, (playlist_id, index))
+        removed = cur.rowcount > 0
+    except sqlite3.Error:
+        logger.error(f"Failed to remove track #{index} from tracks table for playlist_id = {playlist_id}",exc_info=True)
+        return None
+    if not removed:
+        logger.debug("No track #%s (position=%s) in tracks table for playlist_id = %s", index, position, playlist_id)
+        return False
+    logger.debug("Successfully delete track #%s (position=%s) from playlist_id = %s", index, position, playlist_id)
+    return True
+
+async def remove_track_by_index(user_id, playlist_name, index, playlist_id=None, position=None):
     """
     Remove a track from a user's playlist by its zero-based index.
     
@@ -289,75 +640,186 @@ def remove_track_by_index(user_id, playlist_name, index):
         user_id (int): The internal user ID.
         playlist_name (str): The name of the playlist.
         index (int): The zero-based index of the track to remove.
+        playlist_id (int | None): Already resolved id of the playlist, skips the lookup when given.
+        position (int | None): Stored position of the track; when given it is removed instead of whatever
+                               track currently sits at `index`.
     
     Returns:
         bool or None: True if the track was successfully removed, False if the playlist or track does not exist, or None on database error.
     """
-    playlist_id = get_playlist_id_by_name(user_id,playlist_name)
+    if playlist_id is None:
+        playlist_id = await get_playlist_id_by_name(user_id,playlist_name)
     if not playlist_id:
         return False
+    return await delete_track_at(playlist_id, index, position)
+
+def _renumber_positions(cur, playlist_id):
+    """
+    Spread the positions of a playlist's tracks TRACK_POSITION_GAP apart again, keeping their order.
+    """
+    cur.execute("SELECT id FROM tracks WHERE playlist_id=? ORDER BY position", (playlist_id,))
+    ids = [row[0] for row in cur.fetchall()]
+    cur.executemany(
+        "UPDATE tracks SET position=? WHERE id=?",
+        (((n + 1) * TRACK_POSITION_GAP, track_id) for n, track_id in enumerate(ids))
+    )
+    logger.info(f"Renumbered positions of {len(ids)} tracks in playlist_id = {playlist_id}")
+
+@db_write
+def move_track_to(conn, playlist_id, from_index, to_index):
+    """
+    Move the track at `from_index` so that it ends up at `to_index` (both zero-based) in the playlist.
+    
+    Only the moved track gets a new position, halfway between its new neighbours. The whole playlist is
+    renumbered only when those neighbours have no free position left between them.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value identifying the playlist.
+        from_index (int): Current zero-based index of the track.
+        to_index (int): Zero-based index the track should have after the move.
+    
+    Returns:
+        bool or None: True if the track was moved, False if either index is out of range, or None on database error.
+    """
+    if from_index < 0 or to_index < 0:
+        # SQLite treats a negative OFFSET as 0, which would move the first track
+        logger.debug("Cannot move track #%s to #%s in playlist_id = %s", from_index, to_index, playlist_id)
+        return False
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("SELECT id FROM tracks WHERE playlist_id=? ORDER BY id LIMIT 1 OFFSET ?", (playlist_id, index))
-            track = cur.fetchone()
+        cur= conn.cursor()
+        cur.execute("SELECT id FROM tracks WHERE playlist_id=? ORDER BY position LIMIT 1 OFFSET ?", (playlist_id, from_index))
+        track = cur.fetchone()
+        if not track:
+            logger.debug("Cannot move track #%s to #%s in playlist_id = %s", from_index, to_index, playlist_id)
+            return False
+        for attempt in range(2):
+            # Neighbours of the new slot among the other tracks: the ones at to_index - 1 and to_index
+            cur.execute("""
+                SELECT position FROM tracks WHERE playlist_id=? AND id<>?
+                ORDER BY position LIMIT ? OFFSET ?
+            """, (playlist_id, track[0], 2 if to_index else 1, max(to_index - 1, 0)))
+            neighbours = [row[0] for row in cur.fetchall()]
+            if to_index == 0:
+                position = neighbours[0] - TRACK_POSITION_GAP if neighbours else TRACK_POSITION_GAP
+            elif not neighbours:
+                logger.debug("Cannot move track #%s to #%s in playlist_id = %s", from_index, to_index, playlist_id)
+                return False
+            elif len(neighbours) == 1:
+                position = neighbours[0] + TRACK_POSITION_GAP
+            elif neighbours[1] - neighbours[0] > 1:
+                position = (neighbours[0] + neighbours[1]) // 2
+            elif attempt == 0:
+                _renumber_positions(cur, playlist_id)
+                continue
+            else:
+                raise sqlite3.DatabaseError(f"No free position between {neighbours} after renumbering")
+            break
+        cur.execute("UPDATE tracks SET position=? WHERE id=?", (position, track[0]))
     except sqlite3.Error:
-        logger.error(f"Failed to get track_id from tracks table for playlist_id = {playlist_id}",exc_info=True)
+        logger.error(f"Failed to move track #{from_index} to #{to_index} in playlist_id = {playlist_id}",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully get track_id from tracks table for playlist_id = {playlist_id}")
-    if not track:
+        logger.debug("Successfully move track #%s to #%s (position=%s) in playlist_id = %s", from_index, to_index, position, playlist_id)
+        return True
+
+async def move_track(user_id, playlist_name, from_index, to_index, playlist_id=None):
+    """
+    Move a track of a user's playlist from one zero-based index to another.
+    
+    Parameters:
+        user_id (int): The internal user ID.
+        playlist_name (str): The name of the playlist.
+        from_index (int): Current zero-based index of the track.
+        to_index (int): Zero-based index the track should have after the move.
+        playlist_id (int | None): Already resolved id of the playlist, skips the lookup when given.
+    
+    Returns:
+        bool or None: True if the track was moved, False if the playlist or either index does not exist, or None on database error.
+    """
+    if playlist_id is None:
+        playlist_id = await get_playlist_id_by_name(user_id,playlist_name)
+    if not playlist_id:
         return False
-    track_id = track[0]
+    return await move_track_to(playlist_id, from_index, to_index)
+
+@db_write
+def delete_playlist_by_id(conn, playlist_id):
+    """
+    Delete the playlist with the given id and all tracks contained in it.
+    
+    Parameters:
+        playlist_id (int): The playlists.id value identifying the playlist.
+    
+    Returns:
+        True if the playlist and its tracks were deleted.
+        None if a database error occurred during deletion.
+    """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("DELETE FROM tracks WHERE id=?", (track_id,))
+        cur= conn.cursor()
+        cur.execute("DELETE FROM tracks WHERE playlist_id=?", (playlist_id,))
+        cur.execute("DELETE FROM playlists WHERE id=?", (playlist_id,))
     except sqlite3.Error:
-        logger.error(f"Failed to delete track_id = {track_id} from tracks table",exc_info=True)
+        logger.error(f"Failed to remove tracks from playlist_id = {playlist_id}.",exc_info=True)
         return None
     else:
-        logger.debug(f"Successfully delete track_id = {track_id} from tracks table")
-        
-    return True
+        logger.debug("Successfully remove tracks from playlist_id = %s.", playlist_id)
+        return True
 
-def delete_playlist(user_id, playlist_name):
+async def delete_playlist(user_id, playlist_name, playlist_id=None):
     """
     Delete a user's playlist and all tracks contained in it.
     
     Given a user_id and playlist_name, removes all tracks referencing the playlist and then deletes the playlist row.
+    The cached id of the playlist name is dropped afterwards.
     
     Parameters:
         user_id (int): Internal user ID owning the playlist.
         playlist_name (str): Name of the playlist to delete.
+        playlist_id (int | None): Already resolved id of the playlist, skips the lookup when given.
     
     Returns:
         True if the playlist and its tracks were deleted.
         False if the playlist was not found for the given user.
         None if a database error occurred during deletion.
     """
-    playlist_id = get_playlist_id_by_name(user_id, playlist_name)
+    if playlist_id is None:
+        playlist_id = await get_playlist_id_by_name(user_id, playlist_name)
     if playlist_id is None:
         return None
     if playlist_id is False:
         return False
+    result = await delete_playlist_by_id(playlist_id)
+    invalidate_playlist_ids(user_id, playlist_name)
+    return result
+
+@db_write
+def update_playlist_name(conn, user_id, old_name, new_name):
+    """
+    Set a playlist's name from `old_name` to `new_name` for the given internal `user_id`.
+    
+    Parameters:
+        user_id (int): Internal user ID owning the playlist.
+        old_name (str): Current playlist name.
+        new_name (str): Desired new playlist name.
+    
+    Returns:
+        bool | None: True if the update succeeded; None if a database error occurred.
+    """
     try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("DELETE FROM tracks WHERE playlist_id=?", (playlist_id,))
-            cur.execute("DELETE FROM playlists WHERE id=?", (playlist_id,))
+        cur= conn.cursor()
+        cur.execute("UPDATE playlists SET name=? WHERE user_id=? AND name=?", (new_name, user_id, old_name))
     except sqlite3.Error:
-        logger.error(f"Failed to remove tracks from {playlist_name} playlist.",exc_info=True)
-        return None
+        logger.error(f"Failed to rename {old_name} playlist to {new_name} for user_id = {user_id}",exc_info=True)
     else:
-        logger.debug(f"Successfully remove tracks from {playlist_name} playlist.")
+        logger.debug("Successfully rename %s playlist to %s for user_id = %s", old_name, new_name, user_id) 
         return True
 
-def rename_playlist(user_id, old_name, new_name):
+async def rename_playlist(user_id, old_name, new_name):
     """
     Rename a user's playlist.
     
-    Attempts to set a playlist's name from `old_name` to `new_name` for the given internal `user_id`.
+    Attempts to set a playlist's name from `old_name` to `new_name` for the given internal `user_id`, then drops
+    the cached ids of both names.
     
     Parameters:
         user_id (int): Internal user ID owning the playlist.
@@ -367,12 +829,6 @@ def rename_playlist(user_id, old_name, new_name):
     Returns:
         bool | None: True if the update succeeded; None if a database error occurred.
     """
-    try:
-        with sqlite3.connect(sqlite_db_path) as conn:
-            cur= conn.cursor()
-            cur.execute("UPDATE playlists SET name=? WHERE user_id=? AND name=?", (new_name, user_id, old_name))
-    except sqlite3.Error:
-        logger.error(f"Failed to rename {old_name} playlist to {new_name} for user_id = {user_id}",exc_info=True)
-    else:
-        logger.debug(f"Successfully rename {old_name} playlist to {new_name} for user_id = {user_id}") 
-        return True
+    result = await update_playlist_name(user_id, old_name, new_name)
+    invalidate_playlist_ids(user_id, old_name, new_name)
+    return result
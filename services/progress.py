@@ -0,0 +1,94 @@
+import asyncio
+import time
+from typing import Callable
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProgressMessage:
+    """
+    One status message kept up to date by editing it in place, at most once per `interval` seconds.
+
+    `update()` only records that the status changed. The first call sends the message; later changes are edited
+    into it once the interval since the previous edit passed, by a single background task, so a burst of changes
+    costs one edit showing the latest status. `render()` is called right before every send or edit and returns the
+    current text.
+    """
+
+    def __init__(self, bot: Bot, chat_id: int, render: Callable[[], str], interval: float = 2.0):
+        """
+        Parameters:
+            bot (Bot): Bot sending and editing the message.
+            chat_id (int): Chat the message is sent to.
+            render (Callable[[], str]): Returns the current status text.
+            interval (float): Minimum seconds between two edits.
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.render = render
+        self.interval = interval
+        self.message_id: int | None = None
+        self._text = ""
+        self._last_edit = 0.0
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+        # Set by finish() to cut the wait of the pending edit short
+        self._now = asyncio.Event()
+        self.edits = 0
+
+    async def update(self) -> None:
+        """
+        Show the current status: sends the message the first time, otherwise schedules a throttled edit.
+        """
+        if self.message_id is None:
+            text = self.render()
+            try:
+                message = await self.bot.send_message(self.chat_id, text)
+            except Exception:
+                logger.error(f"Failed to send progress message to chat {self.chat_id}", exc_info=True)
+                return
+            self._text = text
+            self.message_id = message.message_id
+            self._last_edit = time.monotonic()
+            return
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._edit_later(), name=f"progress-{self.chat_id}")
+
+    async def _edit_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._now.wait(), timeout=max(0.0, self._last_edit + self.interval - time.monotonic()))
+        except asyncio.TimeoutError:
+            pass
+        await self._edit()
+
+    async def _edit(self) -> None:
+        if not self._dirty or self.message_id is None:
+            return
+        self._dirty = False
+        text = self.render()
+        if text == self._text:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            self._text = text
+            self.edits += 1
+        except TelegramBadRequest as e:
+            # E.g. the user deleted the message; the next change tries again
+            logger.warning(f"Could not edit progress message in chat {self.chat_id}: {e}")
+        except Exception:
+            logger.error(f"Failed to edit progress message in chat {self.chat_id}", exc_info=True)
+
+    async def finish(self) -> None:
+        """
+        Edit the latest status in right away, skipping the throttle. Call it once, when the status is final.
+        """
+        self._now.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._edit()
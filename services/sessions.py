@@ -0,0 +1,189 @@
+import asyncio
+import math
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from config import app_config
+from utils.logging import get_logger
+from utils.timer_wheel import TimerWheel
+from services.progress import ProgressMessage
+
+logger = get_logger(__name__)
+
+
+class AddTrackSession:
+    """
+    An "add tracks" session: the playlist forwarded audio files go to, until `deadline` (time.monotonic), and
+    what happened to the files forwarded so far.
+    """
+
+    __slots__ = ("playlist_name", "playlist_db_id", "deadline", "tracks_added", "duplicates", "failed", "progress")
+
+    def __init__(self, playlist_name: str, playlist_db_id: int, deadline: float):
+        self.playlist_name = playlist_name
+        self.playlist_db_id = playlist_db_id
+        self.deadline = deadline
+        self.tracks_added = 0
+        self.duplicates = 0
+        self.failed = 0
+        # Status message edited in place when ADD_TRACK_REPLIES is "progress" (see services.progress)
+        self.progress: ProgressMessage | None = None
+
+
+# Called with the user id and the session when a session ends by itself (window closed or evicted)
+SessionEndCallback = Callable[[int, AddTrackSession], Awaitable[None]]
+
+
+class SessionStore:
+    """
+    Bounded store of add-track sessions keyed by Telegram user id, ending sessions when their window closes.
+
+    A session's deadline is `ttl` seconds after it was started or last extended (monotonic clock, immune to
+    wall-clock changes). Sessions are watched by a hashed timer wheel (see TimerWheel) with a resolution of `tick`
+    seconds, so hundreds of thousands of pending sessions cost one driver task. The wheel holds only user ids; the
+    deadline is the session's own. When a deadline passes, the session is removed and `on_end(user_id, session)`
+    runs in a task, e.g. to clear the user's state and send a summary.
+
+    At most `max_size` sessions are kept: starting one more evicts the least recently used session, which ends
+    through `on_end` like an expired one.
+    """
+
+    def __init__(self, ttl: float = 60, max_size: int = 100_000, tick: float = 1.0, on_end: SessionEndCallback | None = None):
+        """
+        Parameters:
+            ttl (float): Seconds a session stays active after it was started or extended.
+            max_size (int): Maximum number of sessions kept (at least 1).
+            tick (float): Resolution of session deadlines in seconds.
+            on_end (SessionEndCallback | None): Awaited when a session ends by itself; can be set later.
+        """
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.on_end = on_end
+        # One wheel revolution covers a whole window, so every deadline is due the first time its slot comes up
+        self._wheel = TimerWheel(
+            self._expire, self._deadline, tick=tick, slots=max(16, math.ceil(ttl / max(tick, 0.001)) + 1)
+        )
+        self._sessions: OrderedDict[int, AddTrackSession] = OrderedDict()
+        self._ending: set[asyncio.Task] = set()
+        self.started = 0
+        self.extended = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def start(self, user_id: int, playlist_name: str, playlist_db_id: int) -> AddTrackSession:
+        """
+        Start (or restart) the session of `user_id` for a playlist and return it.
+        """
+        session = AddTrackSession(playlist_name, playlist_db_id, time.monotonic() + self.ttl)
+        previous = self._sessions.get(user_id)
+        if previous is None:
+            self._wheel.schedule(user_id, session.deadline)
+        else:
+            self._wheel.reschedule(user_id, previous.deadline, session.deadline)
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        self.started += 1
+        while len(self._sessions) > self.max_size:
+            evicted_user, evicted = self._sessions.popitem(last=False)
+            self._wheel.cancel(evicted_user, evicted.deadline)
+            self.evicted += 1
+            logger.debug("Evicted add-track session of user %s, store is full", evicted_user)
+            self._notify_end(evicted_user, evicted)
+        return session
+
+    def get(self, user_id: int) -> AddTrackSession | None:
+        """
+        Return the active session of `user_id`, or None if there is none.
+
+        A session stays active until the timer wheel ends it, at most one tick after its deadline.
+        """
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions.move_to_end(user_id)
+        return session
+
+    def extend(self, user_id: int) -> bool:
+        """
+        Move the deadline of the session of `user_id` to `ttl` seconds from now. Returns False if it has none.
+        """
+        session = self._sessions.get(user_id)
+        if session is None:
+            return False
+        deadline = time.monotonic() + self.ttl
+        self._wheel.reschedule(user_id, session.deadline, deadline)
+        session.deadline = deadline
+        self.extended += 1
+        return True
+
+    def end(self, user_id: int) -> AddTrackSession | None:
+        """
+        Remove the session of `user_id` without calling `on_end` and return it, or None if there was none.
+        """
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self._wheel.cancel(user_id, session.deadline)
+        return session
+
+    def _deadline(self, user_id: int) -> float | None:
+        session = self._sessions.get(user_id)
+        return None if session is None else session.deadline
+
+    def _expire(self, user_id: int) -> None:
+        session = self._sessions.get(user_id)
+        if session is None:
+            return
+        del self._sessions[user_id]
+        self.expired += 1
+        self._notify_end(user_id, session)
+
+    def _notify_end(self, user_id: int, session: AddTrackSession) -> None:
+        if self.on_end is None:
+            return
+        task = asyncio.get_running_loop().create_task(self.on_end(user_id, session), name=f"session-end-{user_id}")
+        self._ending.add(task)
+        task.add_done_callback(self._ended)
+
+    def _ended(self, task: asyncio.Task) -> None:
+        self._ending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to end add-track session", exc_info=task.exception())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return the number of sessions, the started/extended/expired/evicted counters, pending timers and the
+        approximate memory used.
+
+        Memory counts the store's dict and the session objects; playlist names are counted once per session.
+        """
+        sessions_bytes = sum(
+            sys.getsizeof(session) + sys.getsizeof(session.playlist_name) for session in self._sessions.values()
+        )
+        return {
+            "size": len(self._sessions),
+            "max_size": self.max_size,
+            "started": self.started,
+            "extended": self.extended,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "timers": len(self._wheel),
+            "approx_bytes": sys.getsizeof(self._sessions) + sessions_bytes,
+        }
+
+    async def stop(self) -> None:
+        """
+        Stop the timer wheel and wait for sessions that are ending. Active sessions are kept without a summary.
+        """
+        await self._wheel.stop()
+        if self._ending:
+            await asyncio.wait(list(self._ending), timeout=5)
+
+
+add_track_sessions = SessionStore(
+    ttl=app_config.ADD_TRACK_TIME_WINDOW,
+    max_size=app_config.ADD_TRACK_MAX_SESSIONS,
+    tick=app_config.ADD_TRACK_TIMER_TICK
+)
@@ -0,0 +1,118 @@
+from typing import Any, Awaitable, Callable
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InaccessibleMessage, InlineKeyboardMarkup
+from config import app_config
+from utils.cache import LRUCache
+
+# (chat id, message id) -> (hash of the text, hash of the inline keyboard) the message was last edited to
+rendered_views = LRUCache(max_size=app_config.EDIT_CACHE_SIZE, ttl=app_config.EDIT_CACHE_TTL)
+
+edit_counters = {"edits": 0, "merged": 0, "skipped": 0, "not_modified": 0}
+
+# Stands for a message text that is not known (not edited through edit_view, or forgotten)
+_UNKNOWN = object()
+
+
+def _markup_hash(markup: InlineKeyboardMarkup | None) -> int:
+    # Telegram echoes a keyboard back without empty rows and client-side fields like row_width, so only what it
+    # keeps is hashed; a keyboard of empty rows is no keyboard at all
+    if markup is None:
+        return hash(None)
+    rows = tuple(
+        tuple(button.model_dump_json(exclude_none=True) for button in row)
+        for row in markup.inline_keyboard if row
+    )
+    return hash(rows or None)
+
+
+def _text_hash(text: str) -> int:
+    return hash(text)
+
+
+async def edit_view(message: Message | InaccessibleMessage, text: str | None = None, reply_markup: InlineKeyboardMarkup | None = None) -> bool:
+    """
+    Bring a bot message to the given text and inline keyboard with as few Bot API calls as possible.
+
+    The text and keyboard each message was last edited to are remembered (as hashes, in a bounded LRU cache keyed
+    by chat and message id), so an edit to what the message already shows is skipped instead of being rejected by
+    Telegram with "message is not modified". A new text and keyboard go out in one editMessageText call, an
+    unchanged text with a new keyboard as editMessageReplyMarkup.
+
+    Like Message.edit_text, a text edit replaces the keyboard with `reply_markup` (None removes it); with `text`
+    None only the keyboard is edited and the text is kept.
+
+    Parameters:
+        message (Message | InaccessibleMessage): The bot message to edit, usually the callback's message.
+        text (str | None): New text, or None to keep the text.
+        reply_markup (InlineKeyboardMarkup | None): Inline keyboard the message should have.
+
+    Returns:
+        bool: True if Telegram was called, False if the edit was skipped or not needed.
+
+    Raises:
+        AssertionError: If `message` is not an instance of Message.
+    """
+    assert isinstance(message, Message), "Expected Message"
+    key = (message.chat.id, message.message_id)
+    # The callback's copy of the message carries its current keyboard: a cached view with another one is stale
+    shown_markup = _markup_hash(message.reply_markup)
+    cached = rendered_views.get(key)
+    if cached is not None and cached[1] != shown_markup:
+        cached = None
+    shown_text = cached[0] if cached is not None else _UNKNOWN
+
+    new_markup = _markup_hash(reply_markup)
+    new_text = shown_text if text is None else _text_hash(text)
+    if new_text == shown_text and new_markup == shown_markup:
+        edit_counters["skipped"] += 1
+        return False
+
+    try:
+        if new_text != shown_text:
+            await message.edit_text(text, reply_markup=reply_markup)
+            if reply_markup is not None:
+                edit_counters["merged"] += 1
+        else:
+            await message.edit_reply_markup(reply_markup=reply_markup)
+        edit_counters["edits"] += 1
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            raise
+        edit_counters["not_modified"] += 1
+    # A text of unknown (uncached) current value can't be recorded after a markup-only edit
+    if new_text is not _UNKNOWN:
+        rendered_views.set(key, (new_text, new_markup))
+    return True
+
+
+def get_edit_view(message: Message | InaccessibleMessage) -> Callable[..., Awaitable[bool]]:
+    """
+    Return an edit function for `message` taking `text` and `reply_markup`, like Message.edit_text, that skips
+    and merges edits (see edit_view).
+
+    Raises:
+        AssertionError: If `message` is not an instance of Message.
+    """
+    assert isinstance(message, Message), "Expected Message"
+
+    async def edit(text: str | None = None, reply_markup: InlineKeyboardMarkup | None = None) -> bool:
+        return await edit_view(message, text, reply_markup)
+
+    return edit
+
+
+def forget_view(message: Message | InaccessibleMessage) -> None:
+    """
+    Drop what is remembered about `message`; call it after editing the message other than through edit_view
+    (e.g. its media or caption).
+    """
+    if isinstance(message, Message):
+        rendered_views.pop((message.chat.id, message.message_id))
+
+
+def edit_stats() -> dict[str, Any]:
+    """
+    Return edit counters (edits sent, text and keyboard merged into one call, skipped as unchanged, rejected by
+    Telegram as not modified) and the view cache stats.
+    """
+    return {**edit_counters, "cache": rendered_views.stats()}
@@ -1,6 +1,12 @@
+import atexit
+import json
 import logging
-from config import app_config
+import queue
 import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from config import app_config
 
 class EmojiFormatter(logging.Formatter):
     level_emojis = {
@@ -11,51 +17,224 @@ class EmojiFormatter(logging.Formatter):
         logging.CRITICAL: "🔥",
     }
 
-    def format(self, record):
+    def formatMessage(self, record):
         """
-        Format a log record by prepending an emoji corresponding to its log level.
-        
-        The emoji is added to the beginning of the log message, and the original message is restored after formatting to prevent side effects.
-        
+        Format a log record with an emoji corresponding to its log level prepended to the message.
+
+        logging.Formatter.format() renders the message once into `record.message` before calling this; the record
+        itself is not changed, so other handlers see the plain message.
+
         Returns:
-            str: The formatted log message with an emoji prefix.
+            str: The formatted log line with an emoji before the message.
         """
-        emoji = self.level_emojis.get(record.levelno, "")
-        original_msg = record.getMessage()
-        record.msg = f"{emoji} {original_msg}"
-        formatted = super().format(record)
-        record.msg = original_msg  # Restore original message
-        return formatted
+        values = record.__dict__.copy()
+        values["message"] = f"{self.level_emojis.get(record.levelno, '')} {record.message}"
+        return self._style._fmt % values
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line, for log collectors.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "file": record.filename,
+            "line": record.lineno,
+            "process": record.process,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def create_formatter(log_format:str) -> logging.Formatter:
+    """
+    Return the formatter of a LOG_FORMAT value: "json" or "text" (anything else).
+    """
+    if log_format == "json":
+        return JsonFormatter()
+    return EmojiFormatter(
+        "%(asctime)s - %(levelname)s "
+        "in %(filename)s at line %(lineno)d: "
+        "%(message)s"
+    )
+
+class _PipelineHandler(QueueHandler):
+    """
+    Handler of every logger: puts records on the pipeline's queue without formatting or blocking.
+    """
+
+    def __init__(self, pipeline:"LogPipeline"):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        # %-style arguments are rendered now, they might change before the writer gets to them; the timestamp,
+        # emoji and traceback are formatted by the writer thread
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        pipeline = self.pipeline
+        if not pipeline.running:
+            pipeline.write(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with pipeline.lock:
+                pipeline.dropped += 1
+
+class _PipelineListener(QueueListener):
+    def __init__(self, pipeline:"LogPipeline"):
+        super().__init__(pipeline.queue, *pipeline.outputs, respect_handler_level=True)
+        self.pipeline = pipeline
+
+    def handle(self, record):
+        self.pipeline.report_dropped()
+        super().handle(record)
+
+    def enqueue_sentinel(self):
+        # Waits for room instead of failing when the queue is full, the writer is draining it
+        self.queue.put(self._sentinel)
+
+class LogPipeline:
+    """
+    Logging through one background writer thread shared by every logger.
+
+    Loggers only put records on a bounded queue; the writer thread formats them and writes them to the output
+    handlers (console, LOG_FILE), so logging never waits for a terminal or a disk on the event loop. When the
+    queue is full records are dropped instead, and how many is logged once there is room again. Before start()
+    and after stop() records are written directly.
+    """
+
+    def __init__(self, outputs:list[logging.Handler], queue_size:int=10000):
+        """
+        Parameters:
+            outputs (list[logging.Handler]): Handlers the writer thread passes every record to.
+            queue_size (int): Records waiting for the writer at most; 0 means unbounded.
+        """
+        self.outputs = outputs
+        self.queue = queue.Queue(max(0, queue_size))
+        self.handler = _PipelineHandler(self)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self._reported = 0
+        self._listener = _PipelineListener(self)
+
+    @property
+    def running(self) -> bool:
+        return self._listener._thread is not None
+
+    def start(self) -> None:
+        """
+        Start the writer thread.
+        """
+        with self.lock:
+            if not self.running:
+                self._listener.start()
+
+    def stop(self) -> None:
+        """
+        Write every queued record, stop the writer thread and flush the outputs.
+        """
+        with self.lock:
+            if not self.running:
+                return
+        self._listener.stop()
+        # Records put on the queue while the writer was stopping
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not self._listener._sentinel:
+                self.write(record)
+        self.report_dropped()
+        for output in self.outputs:
+            output.flush()
+
+    def write(self, record:logging.LogRecord) -> None:
+        """
+        Pass `record` to the output handlers on the calling thread.
+        """
+        for output in self.outputs:
+            if record.levelno >= output.level:
+                output.handle(record)
+
+    def report_dropped(self) -> None:
+        """
+        Log how many records were dropped since the last report, if any.
+        """
+        if self.dropped == self._reported:
+            return
+        with self.lock:
+            dropped = self.dropped - self._reported
+            self._reported = self.dropped
+        if dropped:
+            self.write(logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f"{dropped} log records were dropped, the log queue (LOG_QUEUE_SIZE) was full", None, None
+            ))
+
+_pipeline:LogPipeline|None = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline() -> LogPipeline:
+    """
+    Return the process-wide log pipeline, creating and starting it on first use.
+
+    Its outputs are standard output and LOG_FILE when set, formatted as LOG_FORMAT says. It is stopped (queued
+    records written) at interpreter exit, or earlier by stop_logging().
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            formatter = create_formatter(app_config.LOG_FORMAT)
+            outputs = [logging.StreamHandler(sys.stdout)]
+            log_file= app_config.LOG_FILE
+            if log_file:
+                outputs.append(logging.FileHandler(log_file, encoding="utf-8"))
+            for output in outputs:
+                output.setFormatter(formatter)
+            _pipeline = LogPipeline(outputs, app_config.LOG_QUEUE_SIZE)
+            _pipeline.start()
+            atexit.register(_pipeline.stop)
+    return _pipeline
+
+def stop_logging() -> None:
+    """
+    Write the queued log records and stop the background writer; later records are written directly.
+
+    Needed where atexit handlers do not run, e.g. at the end of a multiprocessing worker.
+    """
+    if _pipeline is not None:
+        _pipeline.stop()
 
 def get_logger(logger_name:str):
     """
-    Create and configure a logger with emoji-enhanced log messages.
-    
-    The logger uses the log level specified in the application configuration, outputs to standard output, and formats messages with timestamps, log level, filename, line number, and an emoji corresponding to the log level.
-    
+    Create and configure a logger writing through the shared background log pipeline.
+
+    The logger uses the log level specified in the application configuration. Its records go to standard output
+    (and LOG_FILE when set) from the pipeline's writer thread, as text with timestamps, log level, filename, line
+    number and an emoji corresponding to the log level, or as JSON lines when LOG_FORMAT is "json".
+
     Parameters:
         logger_name (str): The name of the logger to retrieve or create.
-    
+
     Returns:
         logging.Logger: The configured logger instance.
     """
     logger = logging.getLogger(logger_name)
     logger.setLevel(app_config.LOG_LEVEL)
     logger.handlers.clear()
-
-    console_handler = logging.StreamHandler(sys.stdout)
-    formatter = EmojiFormatter(
-        "%(asctime)s - %(levelname)s "
-        "in %(filename)s at line %(lineno)d: "
-        "%(message)s"
-    )
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    log_file= app_config.LOG_FILE
-    if log_file:
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    logger.addHandler(get_pipeline().handler)
 
     return logger
@@ -0,0 +1,172 @@
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Iterable
+
+# Latency bucket upper bounds in seconds, from half a millisecond to half a minute
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[tuple[str, Any]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram: a count per bucket, the total count and the sum of observed values.
+
+    Observing costs one binary search over the bucket bounds and two additions, so it can sit on every handler,
+    query and API call.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # counts[i] counts values in (bounds[i - 1], bounds[i]], the last one everything above bounds[-1]
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the `q` quantile (0-1) by linear interpolation inside its bucket, like Prometheus'
+        histogram_quantile. Values above the last bound are reported as the last bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class HistogramFamily:
+    """
+    Histograms of one metric, one per combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children: dict[tuple, Histogram] = {}
+
+    def observe(self, labels: tuple, seconds: float) -> None:
+        """
+        Record one value for the label values `labels`, given in the order of `label_names`.
+        """
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = Histogram(self.buckets)
+        child.observe(seconds)
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of latency histograms and gauges, rendered in the Prometheus text format.
+
+    Histograms are observed directly by the instrumented code; gauges are read from a callback at render time
+    (e.g. queue depths that the components already track in their stats()).
+    """
+
+    def __init__(self, const_labels: dict[str, str] | None = None):
+        """
+        Parameters:
+            const_labels (dict[str, str] | None): Labels added to every exported sample (e.g. the worker index).
+        """
+        self.const_labels = dict(const_labels or {})
+        self.histograms: dict[str, HistogramFamily] = {}
+        self.gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...], buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> HistogramFamily:
+        """
+        Return the histogram family `name`, creating it on first use.
+        """
+        family = self.histograms.get(name)
+        if family is None:
+            family = self.histograms[name] = HistogramFamily(name, documentation, label_names, buckets)
+        return family
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> None:
+        """
+        Export `read()` as the gauge `name`, replacing a previous callback of the same name.
+        """
+        self.gauges[name] = (documentation, read)
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        const = tuple(self.const_labels.items())
+        lines = []
+        for family in self.histograms.values():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} histogram")
+            for labels, child in list(family.children.items()):
+                pairs = const + tuple(zip(family.label_names, labels))
+                cumulative = 0
+                for bound, bucket_count in zip((*child.bounds, math.inf), child.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{family.name}_bucket{_format_labels(pairs + (('le', _format_number(bound)),))} {cumulative}")
+                lines.append(f"{family.name}_sum{_format_labels(pairs)} {_format_number(child.sum)}")
+                lines.append(f"{family.name}_count{_format_labels(pairs)} {child.count}")
+        for name, (documentation, read) in self.gauges.items():
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(const)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name: str) -> dict[tuple, dict[str, float]]:
+        """
+        Return count, average and estimated p50/p90/p99 (in milliseconds) per label values of histogram `name`.
+        """
+        family = self.histograms.get(name)
+        if family is None:
+            return {}
+        return {
+            labels: {
+                "count": child.count,
+                "avg_ms": child.sum / child.count * 1000 if child.count else 0.0,
+                "p50_ms": child.quantile(0.5) * 1000,
+                "p90_ms": child.quantile(0.9) * 1000,
+                "p99_ms": child.quantile(0.99) * 1000,
+            }
+            for labels, child in list(family.children.items())
+        }
+
+    def reset(self) -> None:
+        """
+        Drop every recorded value, keeping the metric definitions.
+        """
+        for family in self.histograms.values():
+            family.children.clear()
+
+
+metrics = MetricsRegistry()
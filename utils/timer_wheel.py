@@ -0,0 +1,139 @@
+import asyncio
+import math
+import time
+from typing import Any, Callable, Hashable
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: any number of pending deadlines driven by a single asyncio task.
+
+    Time is cut into ticks of `tick` seconds and a timer's key is stored in slot `deadline_tick % slots`. The
+    driver wakes once per tick and only looks at that tick's slot, firing the timers that are due. The wheel costs
+    one sleeping task however many timers are pending, instead of one `asyncio.sleep` task per timer, and timers
+    fire at most one tick late.
+
+    The wheel keeps keys only, in one set per slot: deadlines stay with their owner, which passes them to
+    `schedule`, `reschedule` and `cancel` (the slot is found from the deadline, so these are O(1) set operations)
+    and answers `deadline_of(key)` when the key's slot comes up. A key that is not due yet (more than a revolution
+    away) goes to its next slot, and one whose deadline is None is dropped. `callback(key)` is called synchronously
+    on the event loop when a timer fires and should hand longer work to a task. The driver starts with the first
+    scheduled timer, on the running loop.
+    """
+
+    def __init__(self, callback: Callable[[Hashable], Any], deadline_of: Callable[[Hashable], float | None],
+                 tick: float = 1.0, slots: int = 512):
+        """
+        Parameters:
+            callback (Callable[[Hashable], Any]): Called with the key of every timer that fires.
+            deadline_of (Callable[[Hashable], float | None]): Returns the current deadline of a key (time.monotonic),
+                or None if its timer was cancelled.
+            tick (float): Resolution of the wheel in seconds.
+            slots (int): Number of slots; a wheel revolution lasts `tick * slots` seconds. Timers further away
+                than one revolution are looked at once per revolution until they are due.
+        """
+        self.callback = callback
+        self.deadline_of = deadline_of
+        self.tick = max(0.001, tick)
+        self.slots = max(1, slots)
+        self._buckets: list[set[Hashable]] = [set() for _ in range(self.slots)]
+        # Last tick the driver processed
+        self._cursor = 0
+        self._task: asyncio.Task | None = None
+        self.fired = 0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            if not self._cursor:
+                self._cursor = math.floor(time.monotonic() / self.tick)
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="timer-wheel")
+
+    def _slot(self, deadline: float) -> int:
+        # Never into a tick the driver already processed, or the timer would wait a whole revolution
+        return max(math.ceil(deadline / self.tick), self._cursor + 1) % self.slots
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """
+        Fire `callback(key)` once `deadline_of(key)` has passed; `deadline` (time.monotonic) is its current value.
+        """
+        self._ensure_started()
+        self._buckets[self._slot(deadline)].add(key)
+
+    def reschedule(self, key: Hashable, old_deadline: float, deadline: float) -> None:
+        """
+        Move the timer of `key` from `old_deadline`, the deadline it was scheduled with, to `deadline`.
+        """
+        self.cancel(key, old_deadline)
+        self.schedule(key, deadline)
+
+    def cancel(self, key: Hashable, deadline: float) -> bool:
+        """
+        Cancel the timer of `key` scheduled with `deadline`. Returns False if it was not pending.
+        """
+        bucket = self._buckets[self._slot(deadline)]
+        if key not in bucket:
+            return False
+        bucket.remove(key)
+        return True
+
+    def __len__(self) -> int:
+        """
+        Number of pending timers.
+        """
+        return sum(len(bucket) for bucket in self._buckets)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, (self._cursor + 1) * self.tick - time.monotonic()))
+            # Catch up on every tick that passed, e.g. after the loop was blocked for a while
+            now_tick = math.floor(time.monotonic() / self.tick)
+            while self._cursor < now_tick:
+                self._cursor += 1
+                self._advance(self._cursor)
+
+    def _advance(self, tick: int) -> None:
+        slot = tick % self.slots
+        bucket = self._buckets[slot]
+        if not bucket:
+            return
+        # A new set rather than emptying this one, which would keep the table of a large burst allocated
+        self._buckets[slot] = set()
+        tick_end = tick * self.tick
+        due = []
+        for key in bucket:
+            deadline = self.deadline_of(key)
+            if deadline is None:
+                continue
+            if deadline <= tick_end:
+                due.append(key)
+            else:
+                self._buckets[self._slot(deadline)].add(key)
+        for key in due:
+            self.fired += 1
+            try:
+                self.callback(key)
+            except Exception:
+                logger.error(f"Timer callback failed for {key!r}", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return pending and fired timer counts and the wheel geometry.
+        """
+        return {"pending": len(self), "fired": self.fired, "tick": self.tick, "slots": self.slots}
+
+    async def stop(self) -> None:
+        """
+        Stop the driver task. Pending timers are kept; the next `schedule` restarts the driver, which first
+        catches up on the ticks missed meanwhile.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None